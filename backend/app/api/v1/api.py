@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import tracking, notifications, colis, history, news
+from .endpoints import tracking, notifications, colis, history, news, metrics
 
 api_router = APIRouter(prefix="/api/v1")
 
@@ -32,3 +32,9 @@ api_router.include_router(
     prefix="/news",
     tags=["news"]
 )
+
+api_router.include_router(
+    metrics.router,
+    prefix="/metrics",
+    tags=["metrics"]
+)
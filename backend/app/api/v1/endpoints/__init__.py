@@ -1,3 +1,3 @@
-from . import notifications, tracking, colis, history, news
+from . import notifications, tracking, colis, history, news, metrics
 
-__all__ = ["notifications", "tracking", "colis", "history", "news"]
+__all__ = ["notifications", "tracking", "colis", "history", "news", "metrics"]
@@ -3,8 +3,10 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from ....models.colis import ColisCreate, ColisUpdate, ColisOut, ColisFilter, ColisSearchResponse
-from ....services.colis_service import ColisService
+from ....services.colis_service import ColisService, invalidate_colis_cache
+from ....services.search import total_pages
 from ....database import get_db
+from ..projection import sparse_colis_search
 import os
 
 router = APIRouter()
@@ -34,9 +36,8 @@ async def list_colis(
     """
     colis_service = ColisService(db)
     try:
-        colis, _ = colis_service.search_colis(
-            ColisFilter(page=1, page_size=100))
-        return colis
+        return colis_service.search_colis(
+            ColisFilter(page=1, page_size=100, count="none")).items
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -95,6 +96,7 @@ async def delete_colis(
         deleted = colis_service.delete_colis(colis_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Colis not found")
+        await invalidate_colis_cache(colis_id)
         return {"success": True}
     except HTTPException:
         raise
@@ -105,21 +107,30 @@ async def delete_colis(
 @router.post("/search", response_model=ColisSearchResponse)
 async def search_colis(
     filters: ColisFilter,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    fields: str | None = None
 ):
     """
     Search and filter colis records
+
+    ``fields`` limits every item to the given paths, e.g. ``id,status``.
     """
     colis_service = ColisService(db)
     try:
-        colis, total = colis_service.search_colis(filters)
-        return {
+        colis, total, next_cursor, estimated = colis_service.search_colis(filters)
+        return sparse_colis_search({
             "items": colis,
             "total": total,
             "page": filters.page,
             "page_size": filters.page_size,
-            "total_pages": (total + filters.page_size - 1) // filters.page_size
-        }
+            "total_pages": total_pages(total, filters.page_size),
+            "next_cursor": next_cursor,
+            "total_is_estimate": estimated
+        }, fields)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+from typing import Dict, Any
+
+from ....services.fedex_service import coalescer_stats
+from ....services.tracking_cache import get_tracking_cache
+from ....services.colis_service import colis_cache_stats
+from ....services.location_service import location_cache_stats
+from ....services.upstream_guard import upstream_guard_stats
+from ....services.rate_limiter import rate_limiter_stats
+from ....services.retry_policy import retry_policy_stats
+from ....services.tracking_poller import tracking_poller_stats
+from ....services.scheduler_leader import scheduler_stats
+from ....services.auth import require_role
+from ....models.user import UserDB, UserRole
+
+router = APIRouter()
+
+
+@router.get("/", response_model=Dict[str, Any])
+async def get_metrics(current_user: UserDB = Depends(require_role(UserRole.admin))):
+    """
+    Get runtime metrics of the FedEx tracking pipeline (admins only: they
+    name the FedEx accounts)
+    """
+    return {
+        "success": True,
+        "data": {
+            "coalescer": coalescer_stats(),
+            "upstream": upstream_guard_stats(),
+            "rate_limits": rate_limiter_stats(),
+            "retries": retry_policy_stats(),
+            "poller": tracking_poller_stats(),
+            "scheduler": scheduler_stats(),
+            "l1_cache": {
+                "tracking": get_tracking_cache().local.stats(),
+                "colis": colis_cache_stats(),
+                "locations": location_cache_stats(),
+            },
+        }
+    }
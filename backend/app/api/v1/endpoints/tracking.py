@@ -9,14 +9,21 @@ from ....models.tracking import (
 )
 from ....services.tracking_service import TrackingService
 from ....database import get_db
+from ....config import settings
 from ....services.colis_service import ColisService
-from ....services.fedex_service import FedExService
+from ....services.search import total_pages
+from ....services.fedex_service import get_fedex_service
+from ....services.tracking_cache import get_tracking_cache
+from ....services.upstream_guard import UpstreamUnavailable
+from ....services.tracking_jobs import get_job_store
+from ..projection import sparse_tracking, sparse_tracking_list, tracking_include
 from ....services.tracking_history_service import TrackingHistoryService
 from ....services.auth import oauth2_scheme, get_current_user
 from datetime import datetime
 import logging
 import io
 import csv
+import json
 from ....models.colis import ColisCreate
 from PIL import Image
 from reportlab.lib.pagesizes import letter
@@ -75,7 +82,7 @@ async def create_package(
             )
 
         # Track the newly created package
-        fedex_service = FedExService(account)
+        fedex_service = get_fedex_service(account)
         response = await fedex_service.track_package(colis.id)
 
         # Add metadata about the identifier used
@@ -123,23 +130,49 @@ async def create_package(
         )
 
 
+# Declared before "/{identifier}", which would otherwise capture "stats"
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_tracking_stats(
+    db: Session = Depends(get_db),
+    account: str | None = None
+):
+    """
+    Get tracking statistics
+    """
+    tracking_service = TrackingService(db=db, account=account)
+    try:
+        stats = tracking_service.get_tracking_stats()
+        return {
+            "success": True,
+            "data": stats
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{identifier}", response_model=TrackingResponse)
 async def track_package(
     identifier: str,
     request: Request,
     db: Session = Depends(get_db),
     token: str | None = Depends(oauth2_scheme),
-    account: str | None = None
+    account: str | None = None,
+    include_raw: bool = False,
+    fields: str | None = None
 ):
     """
     Track a single package by any identifier (FedEx ID, reference, TCN, or barcode)
+
+    The FedEx payload is returned in ``metadata.raw_response`` only when
+    ``include_raw`` is set; such requests always go to FedEx. ``fields``
+    limits ``data`` to the given paths, e.g. ``status,events[-1]``.
     """
     try:
         colis_service = ColisService(db)
-        fedex_service = FedExService(account)
+        fedex_service = get_fedex_service(account)
 
         # Try to find the colis using any identifier type
-        colis = colis_service.get_colis_by_identifier(identifier)
+        colis = colis_service.get_colis_ref(identifier)
 
         if not colis:
             # If colis not found, try to create it with the identifier as FedEx ID
@@ -174,8 +207,27 @@ async def track_package(
         # Use the real FedEx ID from the found colis to track via FedExService
         fedex_id = colis.id
 
-        # Track via FedEx
-        response = await fedex_service.track_package(fedex_id)
+        # Serve from the cache when possible, otherwise track via FedEx. A
+        # stale entry is returned right away and refreshed in the background.
+        cache = get_tracking_cache()
+        cache_account = account or "default"
+        cached = None if include_raw else await cache.lookup(fedex_id, cache_account)
+        if cached is not None:
+            response = cached.response
+            response.metadata["cache_age"] = round(cached.age, 3)
+            response.metadata["stale"] = cached.stale
+            if cached.stale:
+                cache.refresh_in_background(
+                    fedex_id, cache_account,
+                    lambda: fedex_service.track_package(fedex_id))
+        else:
+            if include_raw:
+                # Bypass the coalescer, whose shared responses never carry the
+                # payload, and the cache, which must not serve it to others
+                response = (await fedex_service.track_packages([fedex_id], include_raw=True))[0]
+            else:
+                response = await fedex_service.track_package(fedex_id)
+                await cache.set(fedex_id, cache_account, response)
 
         # Add metadata about the identifier used
         if response.metadata:
@@ -207,8 +259,10 @@ async def track_package(
             except Exception:
                 pass
 
-        return response
+        return sparse_tracking(response, fields)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error tracking package {identifier}: {str(e)}")
         return TrackingResponse(
@@ -243,16 +297,144 @@ async def update_tracking(
 async def track_multiple_packages(
     tracking_numbers: List[str],
     db: Session = Depends(get_db),
-    account: str | None = None
+    account: str | None = None,
+    fields: str | None = None
 ):
     """
     Track multiple packages (max 40)
     """
     tracking_service = TrackingService(db=db, account=account)
-    response = await tracking_service.track_multiple_packages(tracking_numbers)
+    try:
+        response = await tracking_service.track_multiple_packages(tracking_numbers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not response:
         raise HTTPException(status_code=400, detail="Failed to track packages")
-    return response
+    return sparse_tracking_list(response, fields)
+
+
+@router.post("/batch/stream")
+async def stream_multiple_packages(
+    tracking_numbers: List[str],
+    db: Session = Depends(get_db),
+    account: str | None = None,
+    fields: str | None = None
+):
+    """
+    Track multiple packages (max 40), streaming results as NDJSON
+
+    Each line is ``{"index": <position in the request>, "result": <TrackingResponse>}``
+    and is sent as soon as its result is available.
+    """
+    if len(tracking_numbers) > settings.TRACKING_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.TRACKING_BATCH_MAX_ITEMS} tracking numbers per batch")
+    include = tracking_include(fields)
+    tracking_service = TrackingService(db=db, account=account)
+
+    async def lines():
+        async for index, response in tracking_service.iter_multiple_packages(tracking_numbers):
+            result = response.model_dump_json(include=include)
+            yield f'{{"index":{index},"result":{result}}}\n'
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _csv_tracking_numbers(content: bytes) -> List[str]:
+    """Read tracking numbers from a ``tracking_number`` column, or the first one."""
+    rows = [row for row in csv.reader(io.StringIO(content.decode("utf-8-sig"))) if row]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "tracking_number" in header:
+        column = header.index("tracking_number")
+        rows = rows[1:]
+    else:
+        column = 0
+        if not rows[0][0].strip().isdigit():
+            rows = rows[1:]
+    return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+
+async def _create_job(tracking_numbers: List[str], account: str | None) -> Dict[str, Any]:
+    try:
+        return await get_job_store().create(tracking_numbers, account=account)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating tracking job: {e}")
+        raise HTTPException(status_code=503, detail="Tracking jobs are unavailable")
+
+
+async def _get_job(job_id: str) -> Dict[str, Any]:
+    try:
+        job = await get_job_store().get(job_id)
+    except Exception as e:
+        logger.error(f"Error reading tracking job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail="Tracking jobs are unavailable")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tracking job not found")
+    return job
+
+
+@router.post("/jobs", response_model=Dict[str, Any], status_code=202)
+async def create_tracking_job(tracking_numbers: List[str], account: str | None = None):
+    """
+    Queue a bulk tracking job processed in the background
+    """
+    return await _create_job(tracking_numbers, account)
+
+
+@router.post("/jobs/csv", response_model=Dict[str, Any], status_code=202)
+async def create_tracking_job_from_csv(
+    file: UploadFile = File(...),
+    account: str | None = None
+):
+    """
+    Queue a bulk tracking job from a CSV file
+    """
+    try:
+        tracking_numbers = _csv_tracking_numbers(await file.read())
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    return await _create_job(tracking_numbers, account)
+
+
+@router.get("/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_tracking_job(job_id: str, page: int = 1, page_size: int = 100):
+    """
+    Get the progress of a bulk tracking job with a page of its results
+
+    Only results that are already available are listed; each carries its
+    position in the job.
+    """
+    if page < 1 or not 1 <= page_size <= 1000:
+        raise HTTPException(status_code=400, detail="Invalid pagination parameters")
+    job = await _get_job(job_id)
+    job["page"] = page
+    job["page_size"] = page_size
+    job["total_pages"] = (job["total"] + page_size - 1) // page_size
+    job["items"] = await get_job_store().results(
+        job_id, job, offset=(page - 1) * page_size, limit=page_size)
+    return job
+
+
+@router.get("/jobs/{job_id}/results")
+async def stream_tracking_job_results(job_id: str):
+    """
+    Stream the available results of a bulk tracking job as NDJSON
+    """
+    job = await _get_job(job_id)
+    store = get_job_store()
+    step = job["chunk_size"] * 10
+
+    async def lines():
+        for offset in range(0, job["total"], step):
+            for item in await store.results(job_id, job, offset=offset, limit=step):
+                yield json.dumps(item, separators=(",", ":")) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.post("/email", response_model=TrackingResponse)
@@ -262,7 +444,7 @@ async def track_by_email(
     account: str | None = None
 ):
     """Track a package and send the result via email."""
-    fedex_service = FedExService(account)
+    fedex_service = get_fedex_service(account)
     response = await fedex_service.track_package(request.tracking_number)
     if response.success:
         status = response.data.status if response.data else ""
@@ -286,34 +468,19 @@ async def search_trackings(
     """
     tracking_service = TrackingService(db=db, account=account)
     try:
-        results, total_count = tracking_service.search_trackings(filters)
+        results, total_count, next_cursor, estimated = tracking_service.search_trackings(filters)
         return {
             "success": True,
             "data": results,
             "total": total_count,
             "page": filters.page,
             "page_size": filters.page_size,
-            "total_pages": (total_count + filters.page_size - 1) // filters.page_size
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/stats", response_model=Dict[str, Any])
-async def get_tracking_stats(
-    db: Session = Depends(get_db),
-    account: str | None = None
-):
-    """
-    Get tracking statistics
-    """
-    tracking_service = TrackingService(db=db, account=account)
-    try:
-        stats = tracking_service.get_tracking_stats()
-        return {
-            "success": True,
-            "data": stats
+            "total_pages": total_pages(total_count, filters.page_size),
+            "next_cursor": next_cursor,
+            "total_is_estimate": estimated
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -421,7 +588,7 @@ async def decode_barcode(file: UploadFile = File(...)):
 async def get_proof_of_delivery(identifier: str, db: Session = Depends(get_db)):
     """Return the proof-of-delivery PDF for a package."""
     colis_service = ColisService(db)
-    fedex_service = FedExService()
+    fedex_service = get_fedex_service()
 
     colis = colis_service.get_colis_by_identifier(identifier)
     tracking_number = colis.id if colis else identifier
@@ -431,6 +598,10 @@ async def get_proof_of_delivery(identifier: str, db: Session = Depends(get_db)):
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, detail="Proof of delivery not found")
+    except UpstreamUnavailable as e:
+        logger.warning(f"FedEx unavailable for proof of {identifier}: {e}")
+        raise HTTPException(
+            status_code=503, detail="FedEx service temporarily unavailable")
     except httpx.HTTPStatusError as e:
         logger.error(f"FedEx error for {identifier}: {e}")
         raise HTTPException(status_code=e.response.status_code,
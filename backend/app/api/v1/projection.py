@@ -0,0 +1,91 @@
+import re
+from typing import Any, Dict, List
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+
+from ...models.colis import ColisSearchResponse
+from ...models.tracking import TrackingResponse
+
+# One path segment: a field name followed by optional [index] or [*] selectors
+_SEGMENT = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)((?:\[(?:-?\d+|\*)\])*)$")
+_INDEX = re.compile(r"\[(-?\d+|\*)\]")
+
+# Envelope fields that are always returned around the projected part
+_TRACKING_ENVELOPE = {'success': True, 'error': True, 'metadata': True}
+_COLIS_ENVELOPE = {
+    'total': True, 'page': True, 'page_size': True, 'total_pages': True,
+    'next_cursor': True, 'total_is_estimate': True,
+}
+
+_tracking_list = TypeAdapter(List[TrackingResponse])
+
+
+def parse_fields(fields: str) -> Dict[Any, Any]:
+    """Turn ``status,events[-1],delivery_details.estimated_delivery`` into a
+    pydantic ``include`` tree.
+
+    List items are selected with ``[index]`` (negative indices count from
+    the end) or ``[*]`` for every item.
+    """
+    tree: Dict[Any, Any] = {}
+    for path in fields.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        keys: List[Any] = []
+        for segment in path.split('.'):
+            match = _SEGMENT.match(segment)
+            if match is None:
+                raise HTTPException(status_code=400, detail=f"Invalid field path: {path}")
+            keys.append(match.group(1))
+            for index in _INDEX.findall(match.group(2)):
+                keys.append('__all__' if index == '*' else int(index))
+
+        node = tree
+        for key in keys[:-1]:
+            child = node.get(key)
+            if child is True:
+                # A parent path already selects everything below
+                break
+            node = node.setdefault(key, {})
+        else:
+            node[keys[-1]] = True
+    if not tree:
+        raise HTTPException(status_code=400, detail="No fields requested")
+    return tree
+
+
+def _json(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
+
+
+def tracking_include(fields: str | None) -> Dict[Any, Any] | None:
+    """Return the ``include`` tree of a tracking response, or None for every field."""
+    if not fields:
+        return None
+    return dict(_TRACKING_ENVELOPE, data=parse_fields(fields))
+
+
+def sparse_tracking(response: TrackingResponse, fields: str | None) -> TrackingResponse | Response:
+    """Serialize only the requested ``data`` paths of a tracking response."""
+    if not fields:
+        return response
+    return _json(response.model_dump_json(include=tracking_include(fields)))
+
+
+def sparse_tracking_list(
+    responses: List[TrackingResponse], fields: str | None
+) -> List[TrackingResponse] | Response:
+    if not fields:
+        return responses
+    include = {'__all__': tracking_include(fields)}
+    return _json(_tracking_list.dump_json(responses, include=include))
+
+
+def sparse_colis_search(result: Dict[str, Any], fields: str | None) -> Dict[str, Any] | Response:
+    """Serialize only the requested paths of every colis in a search result."""
+    if not fields:
+        return result
+    include = dict(_COLIS_ENVELOPE, items={'__all__': parse_fields(fields)})
+    return _json(ColisSearchResponse.model_validate(result).model_dump_json(include=include))
@@ -59,6 +59,124 @@ class Settings(BaseSettings):
     FEDEX_ACCOUNT_NUMBER: str
     FEDEX_WEBHOOK_SECRET: str | None = os.environ.get("FEDEX_WEBHOOK_SECRET")
 
+    # FedEx HTTP connection pool
+    FEDEX_HTTP_MAX_CONNECTIONS: int = 100
+    FEDEX_HTTP_MAX_KEEPALIVE: int = 20
+    FEDEX_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    FEDEX_HTTP_TIMEOUT: float = 10.0
+    FEDEX_HTTP_CONNECT_TIMEOUT: float = 5.0
+    # HTTP/2 requires the optional ``h2`` package (``pip install httpx[http2]``)
+    FEDEX_HTTP2: bool = False
+    # Refresh the FedEx OAuth token this many seconds before it expires
+    FEDEX_TOKEN_REFRESH_MARGIN: int = 300
+    # Maximum tracking numbers sent in one FedEx track request
+    FEDEX_TRACK_BATCH_SIZE: int = 30
+    # Seconds to wait for more single lookups before sending a merged request
+    FEDEX_COALESCE_WINDOW: float = 0.005
+    # Maximum number of per-account FedEx services kept ready in memory
+    FEDEX_SERVICE_REGISTRY_SIZE: int = 32
+
+    # Tracking response cache TTLs in seconds, chosen by package status
+    TRACKING_CACHE_TTL_DELIVERED: int = 86400
+    TRACKING_CACHE_TTL_IN_TRANSIT: int = 300
+    TRACKING_CACHE_TTL_EXCEPTION: int = 60
+    # Seconds past the TTL during which a stale response is served while it
+    # is refreshed in the background
+    TRACKING_CACHE_MAX_STALE: int = 900
+    TRACKING_REFRESH_LOCK_SECONDS: int = 30
+    # In-process (L1) caches in front of Redis and the colis lookups
+    TRACKING_L1_MAX_ENTRIES: int = 10000
+    TRACKING_L1_MAX_BYTES: int = 64 * 1024 * 1024
+    TRACKING_L1_TTL: int = 60
+    COLIS_L1_MAX_ENTRIES: int = 50000
+    COLIS_L1_TTL: int = 600
+    # Seconds to wait before re-subscribing to the invalidation channel
+    CACHE_INVALIDATION_RETRY_SECONDS: float = 5.0
+
+    # In-process cache of interned location ids (they never change)
+    LOCATION_CACHE_MAX_ENTRIES: int = 50000
+    LOCATION_CACHE_TTL: int = 24 * 3600
+
+    # Adaptive concurrency limit for FedEx calls (AIMD)
+    FEDEX_GUARD_INITIAL_LIMIT: int = 20
+    FEDEX_GUARD_MIN_LIMIT: int = 2
+    FEDEX_GUARD_MAX_LIMIT: int = 100
+    # Responses slower than this many seconds shrink the limit
+    FEDEX_GUARD_LATENCY_THRESHOLD: float = 2.0
+    FEDEX_GUARD_BACKOFF: float = 0.7
+    # Calls allowed to wait for a slot before new ones are rejected
+    FEDEX_GUARD_MAX_QUEUE: int = 200
+    # Consecutive failures that open the circuit, and seconds before a probe
+    FEDEX_BREAKER_FAILURE_THRESHOLD: int = 5
+    FEDEX_BREAKER_RESET_TIMEOUT: float = 30.0
+    # Overall deadline in seconds for one FedEx call, queueing included
+    FEDEX_CALL_DEADLINE: float = 10.0
+
+    # Per-account FedEx quotas shared by every worker through Redis
+    FEDEX_RATE_LIMIT_ENABLED: bool = True
+    # Sustained requests per second and burst size for tracking calls
+    FEDEX_TRACK_RATE: float = 100.0
+    FEDEX_TRACK_BURST: int = 200
+    # Same for proof-of-delivery downloads
+    FEDEX_PROOF_RATE: float = 5.0
+    FEDEX_PROOF_BURST: int = 10
+
+    # Retries of idempotent FedEx reads (capped exponential backoff with jitter)
+    FEDEX_RETRY_MAX_ATTEMPTS: int = 3
+    FEDEX_RETRY_BASE_DELAY: float = 0.2
+    FEDEX_RETRY_MAX_DELAY: float = 2.0
+    # Overall deadline in seconds for a FedEx read, retries included
+    FEDEX_REQUEST_DEADLINE: float = 15.0
+    # Send a second request when the first has not answered after the p95 latency
+    FEDEX_HEDGE_ENABLED: bool = False
+    FEDEX_HEDGE_MIN_DELAY: float = 0.5
+    FEDEX_HEDGE_MIN_SAMPLES: int = 20
+
+    # Batch tracking: size limit, numbers per FedEx call (unset: as many as
+    # FEDEX_TRACK_BATCH_SIZE), concurrent calls and how long each call may take
+    TRACKING_BATCH_MAX_ITEMS: int = 40
+    TRACKING_BATCH_CHUNK_SIZE: int | None = None
+    TRACKING_BATCH_CONCURRENCY: int = 4
+    TRACKING_BATCH_ITEM_TIMEOUT: float = 20.0
+
+    # Bulk tracking jobs: size limit, result retention in seconds, chunk lease
+    # used to resume abandoned work, and background workers per process
+    TRACKING_JOB_MAX_ITEMS: int = 100000
+    TRACKING_JOB_TTL: int = 7 * 24 * 3600
+    TRACKING_JOB_LEASE_SECONDS: int = 120
+    TRACKING_JOB_WORKERS: int = 2
+    TRACKING_JOB_POLL_SECONDS: float = 1.0
+
+    # Searches with count=estimate count exactly up to this many rows where
+    # the database has no planner estimate (everything but PostgreSQL)
+    SEARCH_COUNT_ESTIMATE_CAP: int = 10000
+
+    # Background polling of undelivered trackings: how often it runs and how
+    # many tracking numbers it may send to FedEx per run
+    TRACKING_POLL_ENABLED: bool = True
+    TRACKING_POLL_TICK_SECONDS: int = 60
+    TRACKING_POLL_BUDGET: int = 300
+    # Polling intervals in seconds: near the ETA, after an exception, while
+    # moving, on long-haul legs without recent scans, and after a failed poll
+    TRACKING_POLL_NEAR_ETA: int = 900
+    TRACKING_POLL_EXCEPTION: int = 1800
+    TRACKING_POLL_ACTIVE: int = 3600
+    TRACKING_POLL_LONG_HAUL: int = 6 * 3600
+    TRACKING_POLL_RETRY: int = 900
+    # Hours around the ETA that count as near, and hours without a scan
+    # after which a leg counts as long-haul
+    TRACKING_POLL_ETA_WINDOW_HOURS: int = 24
+    TRACKING_POLL_LONG_HAUL_HOURS: int = 24
+
+    # Only the worker holding this Redis lease runs the scheduled jobs; it is
+    # renewed every third of its TTL and taken over by another worker once
+    # it expires
+    SCHEDULER_LEADER_KEY: str = "scheduler:leader"
+    SCHEDULER_LEADER_TTL_SECONDS: int = 30
+    # Each job also takes a run lease for its interval, minus this many
+    # seconds of timer jitter, so a failover cannot run it twice in a row
+    SCHEDULER_JOB_LEASE_GRACE: float = 2.0
+
     # How long to retain tracking history in days
     HISTORY_RETENTION_DAYS: int = int(
         os.environ.get("HISTORY_RETENTION_DAYS", 30))
@@ -1,11 +1,16 @@
 from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 from .models.database import Base
+from .services.search import rebuild_ngram_index
 from .config import settings
 
 
 def init_db():
     engine = create_engine(settings.DATABASE_URL)
     Base.metadata.create_all(bind=engine)
+    # Substring search outside PostgreSQL needs n-grams of existing rows
+    with Session(engine) as db:
+        rebuild_ngram_index(db)
 
 
 if __name__ == "__main__":
@@ -9,6 +9,15 @@ import redis.asyncio as redis
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from .services.tracking_history_service import TrackingHistoryService
+from .services.fedex_service import open_http_clients, close_http_clients
+from .services.cache_invalidation import (
+    start_invalidation_listener, stop_invalidation_listener
+)
+from .services.tracking_jobs import start_job_workers, stop_job_workers
+from .services.tracking_poller import poll_due_trackings
+from .services.scheduler_leader import (
+    add_leader_job, start_leader_election, stop_leader_election
+)
 from .database import SessionLocal
 from .config import settings
 from .routers import auth, google_auth
@@ -40,11 +49,26 @@ async def lifespan(app: FastAPI):
         settings.REDIS_URL, encoding="utf8", decode_responses=True
     )
     await FastAPILimiter.init(redis_client)
-    scheduler.add_job(purge_old_history, "interval", days=1)
+    await open_http_clients()
+    await start_invalidation_listener()
+    await start_job_workers()
+    # Every worker schedules the jobs; only the elected leader runs them
+    await start_leader_election()
+    add_leader_job(scheduler, purge_old_history, seconds=24 * 3600)
+    if settings.TRACKING_POLL_ENABLED:
+        add_leader_job(
+            scheduler, poll_due_trackings,
+            seconds=settings.TRACKING_POLL_TICK_SECONDS,
+            max_instances=1, coalesce=True,
+        )
     scheduler.start()
     yield
     await FastAPILimiter.close()
+    await stop_job_workers()
     scheduler.shutdown()
+    await stop_leader_election()
+    await stop_invalidation_listener()
+    await close_http_clients()
 
 
 app = FastAPI(
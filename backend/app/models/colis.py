@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 
@@ -45,11 +45,17 @@ class ColisFilter(BaseModel):
     code_barre: Optional[str] = None
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=10, ge=1, le=100)
+    # Opaque ``next_cursor`` of the previous page; takes precedence over ``page``
+    cursor: Optional[str] = None
+    # ``estimate`` and ``none`` trade an exact total for speed
+    count: Literal["exact", "estimate", "none"] = "exact"
 
 
 class ColisSearchResponse(BaseModel):
     items: List[ColisOut]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
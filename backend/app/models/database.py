@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    DDL,
     Column,
     String,
     Boolean,
@@ -7,7 +8,10 @@ from sqlalchemy import (
     Enum as SQLEnum,
     ForeignKey,
     Float,
+    Index,
     Integer,
+    UniqueConstraint,
+    event,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
@@ -36,6 +40,8 @@ class NotificationDB(Base):
 
 class ColisDB(Base):
     __tablename__ = "colis"
+    # Stable sort key of keyset pagination
+    __table_args__ = (Index("ix_colis_created_at_id", "created_at", "id"),)
 
     id = Column(String, primary_key=True, index=True)
     reference = Column(String, unique=True, index=True)
@@ -62,6 +68,13 @@ class ColisDB(Base):
 
 class LocationDB(Base):
     __tablename__ = "locations"
+    # One row per place; see LocationService
+    __table_args__ = (
+        UniqueConstraint(
+            "city", "state", "country", "postal_code",
+            name="uq_locations_natural_key",
+        ),
+    )
 
     id = Column(String, primary_key=True, index=True)
     city = Column(String)
@@ -75,12 +88,20 @@ class LocationDB(Base):
 
 class TrackingEventDB(Base):
     __tablename__ = "tracking_events"
+    # Natural key of a scan event, so re-ingesting FedEx data adds no duplicates
+    __table_args__ = (
+        UniqueConstraint(
+            "tracking_id", "timestamp", "event_type", "location_id",
+            name="uq_tracking_events_natural_key",
+        ),
+    )
 
     id = Column(String, primary_key=True, index=True)
     colis_id = Column(String, ForeignKey("colis.id"))
     tracking_id = Column(String, ForeignKey("trackings.id"), nullable=True)
     status = Column(String)
     description = Column(String)
+    event_type = Column(String)
     timestamp = Column(DateTime(timezone=True))
     location_id = Column(String, ForeignKey("locations.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -126,6 +147,11 @@ class DeliveryDetailsDB(Base):
 
 class TrackingDB(Base):
     __tablename__ = "trackings"
+    __table_args__ = (
+        # Stable sort key of keyset pagination
+        Index("ix_trackings_created_at_id", "created_at", "id"),
+        Index("ix_trackings_last_location", "last_country", "last_state", "last_city"),
+    )
 
     id = Column(String, primary_key=True, index=True,
                 default=lambda: str(uuid.uuid4()))
@@ -136,6 +162,18 @@ class TrackingDB(Base):
     )
     package_type = Column(SQLEnum(PackageType), default=PackageType.UNKNOWN)
     meta_data = Column(JSON, default=dict)
+    # Last known state, copied from the events and details on every ingest so
+    # that searches filter on this table alone
+    last_event_at = Column(DateTime(timezone=True), index=True)
+    last_city = Column(String)
+    last_state = Column(String)
+    last_country = Column(String)
+    last_postal_code = Column(String)
+    estimated_delivery = Column(DateTime(timezone=True), index=True)
+    customer_name = Column(String, index=True)
+    # When the tracking poller asks FedEx next; NULL means as soon as
+    # possible, delivered trackings are never polled
+    next_poll_at = Column(DateTime(timezone=True), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -151,6 +189,15 @@ class TrackingDB(Base):
     )
 
 
+class TrackingStatsDB(Base):
+    """Number of trackings per status and carrier, kept up to date on ingest."""
+    __tablename__ = "tracking_stats"
+
+    status = Column(String, primary_key=True)
+    carrier = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
 class TrackedShipmentDB(Base):
     __tablename__ = "tracked_shipments"
 
@@ -162,3 +209,38 @@ class TrackedShipmentDB(Base):
     note = Column(String, nullable=True)
     pinned = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SearchNgramDB(Base):
+    """Trigrams of searchable identifiers, for substring search on databases
+    without pg_trgm. Maintained by ``services/search.py``."""
+    __tablename__ = "search_ngrams"
+    __table_args__ = (Index("ix_search_ngrams_lookup", "entity", "field", "gram"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)
+    field = Column(String, nullable=False)
+    gram = Column(String, nullable=False)
+    row_id = Column(String, nullable=False, index=True)
+
+
+# Substring search on PostgreSQL: ILIKE '%term%' is served by trigram indexes
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+for _column in (
+    ColisDB.__table__.c.reference,
+    ColisDB.__table__.c.tcn,
+    ColisDB.__table__.c.code_barre,
+    TrackingDB.__table__.c.tracking_number,
+    TrackingDB.__table__.c.customer_name,
+):
+    Index(
+        f"ix_{_column.table.name}_{_column.name}_trgm",
+        _column,
+        postgresql_using="gin",
+        postgresql_ops={_column.name: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -127,12 +127,19 @@ class TrackingFilter(BaseModel):
     tracking_number: Optional[str] = None
     status: Optional[PackageStatus] = None
     carrier: Optional[str] = None
+    customer_name: Optional[str] = None
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     location: Optional[Location] = None
+    estimated_delivery_start: Optional[datetime] = None
+    estimated_delivery_end: Optional[datetime] = None
     service_type: Optional[PackageType] = None
     is_delivered: Optional[bool] = None
     sort_by: Optional[str] = None
     sort_order: Optional[str] = "desc"
     page: Optional[int] = 1
     page_size: Optional[int] = 10
+    # Opaque ``next_cursor`` of the previous page; takes precedence over ``page``
+    cursor: Optional[str] = None
+    # ``estimate`` and ``none`` trade an exact total for speed
+    count: Literal["exact", "estimate", "none"] = "exact"
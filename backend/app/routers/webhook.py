@@ -8,6 +8,7 @@ import json
 from ..config import settings
 from ..database import get_db
 from ..services.tracking_service import TrackingService
+from ..services.tracking_cache import get_tracking_cache
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
@@ -35,6 +36,7 @@ async def fedex_webhook(request: Request, db: Session = Depends(get_db)):
         or payload.get("TrackNo")
     )
     if tracking_number:
+        await get_tracking_cache().invalidate(tracking_number)
         service = TrackingService(db)
         await service.track_single_package(tracking_number)
 
@@ -251,7 +251,7 @@ def main():
     elif command == "list":
         db = get_db_session()
         colis_service = ColisService(db)
-        colis_list, total = colis_service.search_colis(ColisFilter(
+        colis_list, total, _, _ = colis_service.search_colis(ColisFilter(
             page=1, page_size=1000))  # List up to 1000 for simplicity
         print(f"Found {total} colis:")
         for colis in colis_list:
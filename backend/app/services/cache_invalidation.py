@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, List
+
+import redis.asyncio as aioredis
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Every worker subscribes to this channel and drops the matching entries from
+# its in-process caches when another worker changes a shipment.
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_handlers: Dict[str, List[Callable[[str], None]]] = {}
+_redis: Any | None = None
+_listener: asyncio.Task | None = None
+
+
+def _client() -> Any:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def register_invalidation_handler(kind: str, handler: Callable[[str], None]) -> None:
+    """Call ``handler(key)`` whenever an invalidation of ``kind`` is received."""
+    _handlers.setdefault(kind, []).append(handler)
+
+
+def _dispatch(kind: str, key: str) -> None:
+    for handler in _handlers.get(kind, []):
+        try:
+            handler(key)
+        except Exception as e:
+            logger.error(f"Cache invalidation handler for {kind} failed: {e}")
+
+
+async def publish_invalidation(kind: str, key: str) -> None:
+    """Drop ``key`` locally right away and ask every other worker to do the same."""
+    _dispatch(kind, key)
+    try:
+        await _client().publish(INVALIDATION_CHANNEL, json.dumps({"kind": kind, "key": key}))
+    except Exception as e:
+        logger.warning(f"Unable to publish cache invalidation for {kind}:{key}: {e}")
+
+
+async def _listen() -> None:
+    while True:
+        pubsub = _client().pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                    _dispatch(data["kind"], data["key"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Ignoring malformed invalidation message: {message['data']!r}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener disconnected: {e}")
+            await asyncio.sleep(settings.CACHE_INVALIDATION_RETRY_SECONDS)
+        finally:
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass
+
+
+async def start_invalidation_listener() -> None:
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen())
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
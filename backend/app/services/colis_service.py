@@ -7,10 +7,14 @@ from pathlib import Path
 import barcode
 from barcode.writer import ImageWriter
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Tuple, Optional
+from typing import Dict, Any, Optional, NamedTuple
 from ..models.colis import ColisCreate, ColisUpdate, ColisFilter
 from ..models.database import ColisDB
 from sqlalchemy.sql import func
+from ..config import settings
+from .local_cache import LocalCache
+from .search import SearchPage, count_rows, keyset_page, substring_filter
+from .cache_invalidation import publish_invalidation, register_invalidation_handler
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,33 @@ BACKEND_DIR = Path(__file__).resolve().parents[2]
 DEFAULT_BARCODE_FOLDER = os.path.join(BACKEND_DIR, "static", "barcodes")
 
 
+class ColisRef(NamedTuple):
+    """Identifiers of a colis, cheap to cache between requests."""
+    id: str
+    reference: str
+    tcn: str
+    code_barre: str
+
+
+# Identifier -> ColisRef lookups shared by every request of this worker
+_colis_ref_cache = LocalCache(
+    max_entries=settings.COLIS_L1_MAX_ENTRIES,
+    ttl=settings.COLIS_L1_TTL,
+)
+
+
+def colis_cache_stats() -> Dict[str, float]:
+    return _colis_ref_cache.stats()
+
+
+async def invalidate_colis_cache(colis_id: str) -> None:
+    """Drop cached lookups of a colis in every worker."""
+    await publish_invalidation("colis", colis_id)
+
+
+register_invalidation_handler("colis", _colis_ref_cache.invalidate_group)
+
+
 class ColisService:
     def __init__(self, db: Session):
         self.db = db
@@ -125,6 +156,18 @@ class ColisService:
 
         return None
 
+    def get_colis_ref(self, identifier: str) -> Optional[ColisRef]:
+        """Like :meth:`get_colis_by_identifier` but served from the local cache when possible"""
+        ref = _colis_ref_cache.get(identifier)
+        if ref is not None:
+            return ref
+        colis = self.get_colis_by_identifier(identifier)
+        if not colis:
+            return None
+        ref = ColisRef(colis.id, colis.reference, colis.tcn, colis.code_barre)
+        _colis_ref_cache.set(identifier, ref, group=colis.id)
+        return ref
+
     def update_colis(self, colis_id: str, colis_update: ColisUpdate) -> Optional[ColisDB]:
         """Met à jour un colis existant"""
         try:
@@ -145,27 +188,27 @@ class ColisService:
             logger.error(f"Erreur lors de la mise à jour du colis: {str(e)}")
             raise
 
-    def search_colis(self, filters: ColisFilter) -> Tuple[List[ColisDB], int]:
-        """Recherche des colis avec filtres"""
+    def search_colis(self, filters: ColisFilter) -> SearchPage:
+        """Recherche des colis avec filtres, du plus récent au plus ancien
+
+        Lève ``ValueError`` si le curseur est invalide.
+        """
         query = self.db.query(ColisDB)
 
         if filters.status:
             query = query.filter(ColisDB.status == filters.status)
         if filters.location:
             query = query.filter(ColisDB.location == filters.location)
-        if filters.reference:
-            query = query.filter(
-                ColisDB.reference.ilike(f"%{filters.reference}%"))
-        if filters.tcn:
-            query = query.filter(ColisDB.tcn.ilike(f"%{filters.tcn}%"))
-        if filters.code_barre:
-            query = query.filter(
-                ColisDB.code_barre.ilike(f"%{filters.code_barre}%"))
-
-        total = query.count()
-        colis = query.offset((filters.page - 1) *
-                             filters.page_size).limit(filters.page_size).all()
-        return colis, total
+        for field in ('reference', 'tcn', 'code_barre'):
+            term = getattr(filters, field)
+            if term:
+                query = query.filter(substring_filter(self.db, ColisDB, field, term))
+
+        total, estimated = count_rows(self.db, query, filters.count)
+        colis, next_cursor = keyset_page(
+            query, ColisDB, 'created_at', True, filters.page_size,
+            cursor=filters.cursor, page=filters.page)
+        return SearchPage(colis, total, next_cursor, estimated)
 
     def get_colis_stats(self) -> Dict[str, Any]:
         """Récupère les statistiques des colis"""
@@ -0,0 +1,206 @@
+import json
+import logging
+from typing import Any, Dict, List
+
+from pydantic import ValidationError
+
+from ..models.tracking import ServiceType, TrackingEvent, TrackingInfo
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_EMPTY: Dict[str, Any] = {}
+
+_SERVICE_TYPES: Dict[str, ServiceType] = {member.value: member for member in ServiceType}
+
+# FedEx ``dateAndTimes`` types mapped to KeyDates fields
+_KEY_DATE_FIELDS = {
+    'ACTUAL_DELIVERY': 'actual_delivery',
+    'ACTUAL_PICKUP': 'actual_pickup',
+    'SHIP': 'ship',
+    'ACTUAL_TENDER': 'actual_tender',
+    'ANTICIPATED_TENDER': 'anticipated_tender',
+}
+
+_TRACKING_URL = "https://www.fedex.com/tracking?tracknumbers="
+
+_validate = TrackingInfo.model_validate
+_validate_event = TrackingEvent.model_validate
+
+
+def loads(content: bytes | str) -> Dict[str, Any]:
+    """Decode a FedEx response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _location(data: Dict[str, Any] | None) -> Dict[str, Any]:
+    data = data or _EMPTY
+    latitude = data.get('latitude')
+    longitude = data.get('longitude')
+    if latitude is None or longitude is None:
+        coords = data.get('coordinates') or _EMPTY
+        latitude = coords.get('latitude')
+        longitude = coords.get('longitude')
+
+    coordinates = None
+    if latitude is not None and longitude is not None:
+        coordinates = {'latitude': latitude, 'longitude': longitude}
+
+    return {
+        # FedEx sends null for some address fields it does not know
+        'city': data.get('city') or '',
+        'state': data.get('stateOrProvinceCode') or '',
+        'country': data.get('countryCode') or '',
+        'postal_code': data.get('postalCode') or '',
+        'coordinates': coordinates,
+    }
+
+
+def _events(scan_events: List[Dict[str, Any]] | None) -> List[Dict[str, Any]]:
+    events = []
+    for event in scan_events or ():
+        if not isinstance(event, dict):
+            continue
+        event_type = event.get('eventType', '')
+        exception_code = event.get('exceptionCode', '')
+        events.append({
+            'status': event_type,
+            'description': event.get('eventDescription', ''),
+            'timestamp': event.get('date', ''),
+            'location': _location(event.get('scanLocation')),
+            'event_type': event_type,
+            'event_code': exception_code,
+            'exception_code': exception_code,
+            'exception_description': event.get('exceptionDescription', ''),
+        })
+    return events
+
+
+def _valid_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    valid = []
+    for event in events:
+        try:
+            _validate_event(event)
+        except ValidationError as e:
+            logger.warning(f"Skipping malformed FedEx scan event: {e}")
+            continue
+        valid.append(event)
+    return valid
+
+
+def _package_details(details: Dict[str, Any]) -> Dict[str, Any]:
+    package = details.get('packageDetails') or _EMPTY
+    measures = package.get('weightAndDimensions') or _EMPTY
+    weight = {w.get('unit', ''): w.get('value', '') for w in measures.get('weight', ())}
+    dimensions = {
+        d.get('units', ''): {
+            'length': d.get('length', 0),
+            'width': d.get('width', 0),
+            'height': d.get('height', 0),
+        }
+        for d in measures.get('dimensions', ())
+    }
+    return {
+        'weight': weight,
+        'dimensions': dimensions,
+        'service_type': (details.get('serviceDetail') or _EMPTY).get('type', ''),
+        'signature_required': False,
+        'special_handling': [],
+        'declared_value': 0.0,
+        'customs_value': 0.0,
+        'package_count': int(package.get('count', 1)),
+        'packaging_description':
+            (package.get('packagingDescription') or _EMPTY).get('description', ''),
+    }
+
+
+def _dates(details: Dict[str, Any]) -> Dict[str, str]:
+    """Map the ``dateAndTimes`` entries to KeyDates fields, first occurrence wins."""
+    dates: Dict[str, str] = {}
+    for entry in details.get('dateAndTimes', ()):
+        field = _KEY_DATE_FIELDS.get(entry.get('type', ''))
+        if field is not None and field not in dates:
+            dates[field] = entry.get('dateTime', '')
+    return dates
+
+
+def _delivery_details(details: Dict[str, Any], dates: Dict[str, str]) -> Dict[str, Any]:
+    delivery = details.get('deliveryDetails') or _EMPTY
+    eligibility = {
+        option.get('option', ''): option.get('eligibility', '') == 'ELIGIBLE'
+        for option in delivery.get('deliveryOptionEligibilityDetails', ())
+    }
+    actual_delivery = dates.get('actual_delivery')
+    window = ((details.get('standardTransitTimeWindow') or _EMPTY).get('window') or _EMPTY)
+    return {
+        'delivery_date': actual_delivery,
+        'delivery_time': actual_delivery,
+        'delivery_location': _location(delivery.get('actualDeliveryAddress')),
+        'delivery_instructions': '',
+        'delivery_attempts': int(delivery.get('deliveryAttempts', 0)),
+        'delivery_exceptions': [],
+        'actual_delivery': actual_delivery,
+        'estimated_delivery': window.get('ends', ''),
+        'received_by_name': delivery.get('receivedByName', ''),
+        'delivery_option_eligibility': eligibility,
+    }
+
+
+def _commercial_info(details: Dict[str, Any]) -> Dict[str, Any]:
+    number_info = details.get('trackingNumberInfo') or _EMPTY
+    additional = details.get('additionalTrackingInfo') or _EMPTY
+    identifiers = [
+        {'type': identifier.get('type', ''), 'value': value}
+        for identifier in additional.get('packageIdentifiers', ())
+        for value in identifier.get('values', ())
+    ]
+    return {
+        'tracking_number_unique_id': number_info.get('trackingNumberUniqueId', ''),
+        'package_identifiers': identifiers,
+        'service_detail': (details.get('serviceDetail') or _EMPTY).get('description', ''),
+        'available_notifications': details.get('availableNotifications', []),
+    }
+
+
+def parse_tracking_info(details: Dict[str, Any]) -> TrackingInfo:
+    """Build a :class:`TrackingInfo` from one ``trackResults`` entry.
+
+    The payload is reshaped into plain dicts and validated in a single
+    ``model_validate`` call: pydantic-core walks the whole tree natively,
+    which is faster than validating, or even ``model_construct``-ing, every
+    nested model from Python. Only when that fails are the scan events
+    validated one by one, so that a malformed event is dropped instead of
+    failing the whole shipment.
+    """
+    tracking_number = (details.get('trackingNumberInfo') or _EMPTY).get('trackingNumber', '')
+    service = details.get('serviceDetail') or _EMPTY
+    dates = _dates(details)
+    data = {
+        'tracking_number': tracking_number,
+        'status': (details.get('latestStatusDetail') or _EMPTY).get('code', 'UNKNOWN'),
+        'carrier': "FedEx",
+        'service_type': _SERVICE_TYPES.get(service.get('type') or '', ServiceType.UNKNOWN),
+        'origin': _location((details.get('shipperInformation') or _EMPTY).get('address')),
+        'destination': _location((details.get('recipientInformation') or _EMPTY).get('address')),
+        'package_details': _package_details(details),
+        'delivery_details': _delivery_details(details, dates),
+        'events': _events(details.get('scanEvents')),
+        # Only the dates FedEx sent are marked as set
+        'key_dates': dates,
+        'commercial_info': _commercial_info(details),
+        'tracking_url': _TRACKING_URL + tracking_number,
+    }
+    try:
+        return _validate(data)
+    except ValidationError:
+        events = _valid_events(data['events'])
+        if len(events) == len(data['events']):
+            raise
+        data['events'] = events
+        return _validate(data)
@@ -3,58 +3,304 @@ import httpx
 import yaml
 import logging
 import asyncio
-from typing import Dict, Any
+import time
+from typing import Awaitable, Callable, Dict, Any, List
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from importlib import resources
 from pathlib import Path
 from threading import Lock
-import redis
+import redis.asyncio as aioredis
 
 from ..config import settings
+from .tracking_coalescer import TrackingCoalescer
+from .upstream_guard import UpstreamUnavailable, get_upstream_guard
+from .rate_limiter import get_rate_limiter
+from .retry_policy import get_retry_policy
+from .fedex_parser import loads, parse_tracking_info
 from ..models.tracking import (
-    TrackingInfo, TrackingEvent, TrackingResponse, Location,
-    PackageDetails, DeliveryDetails, PackageStatus, PackageType,
-    KeyDates, CommercialInfo, ServiceType
+    TrackingResponse, Location, PackageStatus, PackageType
 )
 
 logger = logging.getLogger(__name__)
 
-# Global cache for authentication token shared across service instances
-_token_lock = Lock()
-_token_cache: dict[str, datetime | str | None] = {
-    "token": None, "expiry": None}
-
-# Redis client for cross-instance token storage
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Async Redis client for cross-instance token storage
+redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+# Token keys are suffixed with the OAuth client id so that several sets of
+# credentials can be cached side by side.
 _REDIS_TOKEN_KEY = "fedex_token"
 _REDIS_EXPIRY_KEY = "fedex_token_expiry"
 
+# Process-wide pooled HTTP clients keyed by pool name. An AsyncClient is bound
+# to the event loop that created it, so the loop is stored alongside the client
+# and a fresh client is built whenever a different loop asks for one.
+_http_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_DEFAULT_POOL = "default"
+
+
+def _http2_enabled() -> bool:
+    if not settings.FEDEX_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning(
+            "FEDEX_HTTP2 is enabled but the 'h2' package is not installed; "
+            "falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.FEDEX_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.FEDEX_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.FEDEX_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.FEDEX_HTTP_TIMEOUT,
+        connect=settings.FEDEX_HTTP_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=_http2_enabled())
+
+
+def get_http_client(pool: str = _DEFAULT_POOL) -> httpx.AsyncClient:
+    """Return the long-lived keep-alive client for ``pool``, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    entry = _http_clients.get(pool)
+    if entry is not None:
+        client_loop, client = entry
+        if client_loop is loop and not client.is_closed:
+            return client
+    client = _build_http_client()
+    _http_clients[pool] = (loop, client)
+    return client
+
+
+def release_http_client(pool: str) -> None:
+    """Drop the client for ``pool`` and close it in the background."""
+    entry = _http_clients.pop(pool, None)
+    if entry is None:
+        return
+    client_loop, client = entry
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if client_loop is loop and not client.is_closed:
+        loop.create_task(client.aclose())
+
+
+async def open_http_clients() -> None:
+    """Warm up the default pool; called from the application lifespan."""
+    get_http_client()
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client owned by the running event loop."""
+    loop = asyncio.get_running_loop()
+    entries = list(_http_clients.values())
+    _http_clients.clear()
+    for client_loop, client in entries:
+        if client_loop is loop and not client.is_closed:
+            await client.aclose()
+
+
+class FedExTokenManager:
+    """Async OAuth token cache shared by every service using the same credentials.
+
+    Only one coroutine refreshes the token at a time; concurrent callers await
+    the same in-flight refresh. Once the token enters the refresh margin it is
+    still handed out while a replacement is fetched in the background.
+    """
+
+    def __init__(self, auth_url: str, payload: Dict[str, str], headers: Dict[str, str]):
+        self.auth_url = auth_url
+        self.payload = payload
+        self.headers = headers
+        client_id = payload['client_id']
+        self._redis_token_key = f"{_REDIS_TOKEN_KEY}:{client_id}"
+        self._redis_expiry_key = f"{_REDIS_EXPIRY_KEY}:{client_id}"
+        self._token: str | None = None
+        self._expiry: datetime | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._rejected: str | None = None
+
+    def _remaining(self) -> float:
+        if not self._token or not self._expiry:
+            return 0.0
+        return (self._expiry - datetime.utcnow()).total_seconds()
+
+    async def get_token(self) -> str:
+        remaining = self._remaining()
+        if remaining > 0:
+            if remaining < settings.FEDEX_TOKEN_REFRESH_MARGIN:
+                self._start_refresh()
+            return self._token  # type: ignore[return-value]
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self, token: str) -> None:
+        """Stop handing out ``token`` after FedEx rejected it with a 401.
+
+        The copy shared through Redis is skipped as well, unless another
+        worker has already replaced it with a different token.
+        """
+        self._rejected = token
+        if self._token == token:
+            self._token = None
+            self._expiry = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._refresh())
+            task.add_done_callback(self._log_refresh_failure)
+            self._refresh_task = task
+        return task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"FedEx token refresh failed: {task.exception()}")
+
+    async def _refresh(self) -> str:
+        # Another worker may already have refreshed the token
+        token, expiry = await self._read_shared_token()
+        if token and token != self._rejected and expiry and (
+                expiry - datetime.utcnow()).total_seconds() > settings.FEDEX_TOKEN_REFRESH_MARGIN:
+            self._token, self._expiry = token, expiry
+            return token
+
+        client = get_http_client()
+        response = await get_upstream_guard().call(lambda: client.post(
+            self.auth_url, data=self.payload, headers=self.headers))
+        response.raise_for_status()
+        data = response.json()
+
+        token = data.get('access_token')
+        expires_in = int(data.get('expires_in', 3600))
+        expiry = datetime.utcnow() + timedelta(seconds=expires_in)
+        self._token, self._expiry = token, expiry
+        await self._write_shared_token(token, expiry, expires_in)
+        return token
+
+    async def _read_shared_token(self) -> tuple[str | None, datetime | None]:
+        try:
+            token = await redis_client.get(self._redis_token_key)
+            expiry = await redis_client.get(self._redis_expiry_key)
+        except Exception as e:
+            logger.warning(f"Unable to read FedEx token from Redis: {e}")
+            return None, None
+        if not token or not expiry:
+            return None, None
+        return str(token), datetime.fromisoformat(str(expiry))
+
+    async def _write_shared_token(self, token: str, expiry: datetime, expires_in: int) -> None:
+        try:
+            await redis_client.set(self._redis_token_key, token, ex=expires_in)
+            await redis_client.set(self._redis_expiry_key, expiry.isoformat(), ex=expires_in)
+        except Exception as e:
+            logger.warning(f"Unable to store FedEx token in Redis: {e}")
+
+
+# One token manager per OAuth client id: accounts sharing credentials share a
+# token, while accounts with their own credentials never evict each other.
+_token_managers: dict[str, FedExTokenManager] = {}
+
+
+def get_token_manager(auth_url: str, payload: Dict[str, str], headers: Dict[str, str]) -> FedExTokenManager:
+    """Return the token manager for the credentials in ``payload``."""
+    manager = _token_managers.get(payload['client_id'])
+    if manager is None:
+        manager = _token_managers.setdefault(
+            payload['client_id'], FedExTokenManager(auth_url, payload, headers))
+    return manager
+
+
+# Our status names plus the FedEx ``latestStatusDetail`` codes
+_STATUS_MAP = {
+    "PENDING": PackageStatus.PENDING,
+    "IN_TRANSIT": PackageStatus.IN_TRANSIT,
+    "DELIVERED": PackageStatus.DELIVERED,
+    "EXCEPTION": PackageStatus.EXCEPTION,
+    "OC": PackageStatus.PENDING,
+    "PU": PackageStatus.IN_TRANSIT,
+    "IT": PackageStatus.IN_TRANSIT,
+    "AR": PackageStatus.IN_TRANSIT,
+    "DP": PackageStatus.IN_TRANSIT,
+    "OD": PackageStatus.IN_TRANSIT,
+    "DL": PackageStatus.DELIVERED,
+    "DE": PackageStatus.EXCEPTION,
+    "SE": PackageStatus.EXCEPTION,
+}
+
+
+def normalize_package_status(status: str | None) -> PackageStatus:
+    """Map a FedEx status code or name to :class:`PackageStatus`."""
+    return _STATUS_MAP.get((status or "").upper(), PackageStatus.UNKNOWN)
+
+
+_REQUIRED_CONFIG_KEYS = ("api_url", "client_id", "client_secret", "account_number")
+
+
+@lru_cache()
+def _default_config_path() -> str:
+    try:
+        return str(resources.files('backend.app.config').joinpath('fedex.yaml'))
+    except Exception:
+        return str(Path(__file__).resolve().parents[1] / 'config' / 'fedex.yaml')
+
+
+def load_fedex_config(config_path: str | None = None) -> dict[str, Any]:
+    """Return the parsed FedEx configuration, reading the file only once per path."""
+    return _load_fedex_config(config_path or _default_config_path())
+
+
+@lru_cache()
+def _load_fedex_config(config_path: str) -> dict[str, Any]:
+    logger.info(f"Loading FedEx configuration from {config_path}")
+    with open(config_path, 'r') as file:
+        config = (yaml.safe_load(file) or {}).get('prod') or {}
+
+    missing = [key for key in _REQUIRED_CONFIG_KEYS if not config.get(key)]
+    if missing:
+        raise ValueError(
+            f"FedEx configuration is missing: {', '.join(missing)}")
+    parsed: dict[str, Any] = {
+        key: os.path.expandvars(str(config[key])) for key in _REQUIRED_CONFIG_KEYS}
+
+    # Optional per-account credentials: {account_number: {client_id, client_secret}}
+    accounts = {}
+    for account, creds in (config.get('accounts') or {}).items():
+        if not creds or not creds.get('client_id') or not creds.get('client_secret'):
+            raise ValueError(
+                f"FedEx account {account} needs client_id and client_secret")
+        accounts[str(account)] = {
+            'client_id': os.path.expandvars(str(creds['client_id'])),
+            'client_secret': os.path.expandvars(str(creds['client_secret'])),
+        }
+    parsed['accounts'] = accounts
+    return parsed
+
 
 class FedExService:
     def __init__(self, account: str | None = None, config_path: str | None = None):
         try:
-            if config_path is None:
-                try:
-                    config_path = resources.files(
-                        'backend.app.config').joinpath('fedex.yaml')
-                except Exception:
-                    config_path = Path(__file__).resolve(
-                    ).parents[1] / 'config' / 'fedex.yaml'
-
-            logger.info(f"Loading FedEx configuration from {config_path}")
-            with open(config_path, 'r') as file:
-                config = yaml.safe_load(file)['prod']
+            config = load_fedex_config(
+                str(config_path) if config_path is not None else None)
 
             self.base_url = os.getenv(
                 "FEDEX_BASE_URL", "https://apis-sandbox.fedex.com")
-            self.auth_url = os.path.expandvars(config['api_url'])
+            self.auth_url = config['api_url']
             self.cdict = {
-                'client_id': os.path.expandvars(config['client_id']),
-                'client_secret': os.path.expandvars(config['client_secret']),
-                'account_number': os.path.expandvars(config['account_number'])
+                'client_id': config['client_id'],
+                'client_secret': config['client_secret'],
+                'account_number': config['account_number']
             }
             if account:
                 self.cdict['account_number'] = account
+                self.cdict.update(config['accounts'].get(account, {}))
             self.payload = {
                 "grant_type": "client_credentials",
                 'client_id': self.cdict['client_id'],
@@ -62,61 +308,54 @@ class FedExService:
             }
             self.headers = {
                 'Content-Type': "application/x-www-form-urlencoded"}
-            self._token: str | None = None
-            self._token_expiry: datetime | None = None
+            self._token_manager = get_token_manager(
+                self.auth_url, self.payload, self.headers)
+            # Each account gets its own connection pool so that one busy
+            # account cannot exhaust the connections of another.
+            self._pool = self.cdict['account_number']
+            self._coalescer = TrackingCoalescer(
+                self.track_packages,
+                window=settings.FEDEX_COALESCE_WINDOW,
+                max_batch=settings.FEDEX_TRACK_BATCH_SIZE,
+            )
         except Exception as e:
             logger.error(f"Error initializing FedEx service: {str(e)}")
             raise
 
-    def _authenticate(self) -> None:
-        """Fetch a new OAuth token from FedEx"""
-        with httpx.Client() as client:
-            response = client.post(
-                self.auth_url, data=self.payload, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
-
-        token = data.get('access_token')
-        expires_in = int(data.get('expires_in', 3600))
-        expiry = datetime.utcnow() + timedelta(seconds=expires_in)
-
-        # Update both instance and global cache inside the lock for thread safety
-        with _token_lock:
-            _token_cache["token"] = token
-            _token_cache["expiry"] = expiry
-            self._token = token
-            self._token_expiry = expiry
-
-        # Persist token in Redis for other service instances
-        redis_client.set(_REDIS_TOKEN_KEY, token, ex=expires_in)
-        redis_client.set(_REDIS_EXPIRY_KEY, expiry.isoformat(), ex=expires_in)
-
-    def _get_auth_token(self) -> str:
-        with _token_lock:
-            token = _token_cache.get("token")
-            expiry = _token_cache.get("expiry")
-
-        if not token or not expiry or datetime.utcnow() >= expiry:
-            # Try to read token from Redis before fetching a new one
-            redis_token = redis_client.get(_REDIS_TOKEN_KEY)
-            redis_expiry = redis_client.get(_REDIS_EXPIRY_KEY)
-            if redis_token and redis_expiry:
-                redis_expiry_dt = datetime.fromisoformat(str(redis_expiry))
-                if datetime.utcnow() < redis_expiry_dt:
-                    token = str(redis_token)
-                    with _token_lock:
-                        _token_cache["token"] = token
-                        _token_cache["expiry"] = redis_expiry_dt
-                        self._token = token
-                        self._token_expiry = redis_expiry_dt
-                        expiry = redis_expiry_dt
-
-        if not token or not expiry or datetime.utcnow() >= expiry:
-            self._authenticate()
-            with _token_lock:
-                token = _token_cache.get("token")
-
-        return token  # type: ignore[return-value]
+    async def _get_auth_token(self) -> str:
+        return await self._token_manager.get_token()
+
+    async def _send(self, endpoint: str, request, deadline: float | None = None) -> httpx.Response:
+        """Send an idempotent FedEx read under the account quota, the upstream
+        guard and the retry policy of ``endpoint``, within ``deadline`` seconds
+        if given instead of the policy's deadline."""
+        async def attempt(timeout: float) -> httpx.Response:
+            expires = time.monotonic() + timeout
+            await get_rate_limiter().acquire(self._pool, endpoint, timeout=timeout)
+            return await get_upstream_guard().call(
+                request, deadline=max(0.0, expires - time.monotonic()))
+
+        return await get_retry_policy(endpoint).run(attempt, deadline)
+
+    async def _send_authorized(
+        self, endpoint: str, request: Callable[[str], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """:meth:`_send` ``request(token)`` with the current access token.
+
+        A token FedEx answers with a 401, e.g. one revoked before it expired,
+        is replaced and the request sent once more, within what is left of
+        the request deadline.
+        """
+        token = await self._get_auth_token()
+        expires = time.monotonic() + get_retry_policy(endpoint).deadline
+        response = await self._send(endpoint, lambda: request(token))
+        if response.status_code == 401:
+            logger.warning("FedEx rejected the access token; requesting a new one")
+            self._token_manager.invalidate(token)
+            token = await self._get_auth_token()
+            response = await self._send(
+                endpoint, lambda: request(token), deadline=expires - time.monotonic())
+        return response
 
     async def get_proof_of_delivery(self, tracking_number: str) -> bytes:
         """Return the proof of delivery PDF for a tracking number."""
@@ -126,20 +365,15 @@ class FedExService:
             if file_path.exists():
                 return file_path.read_bytes()
 
-            access_token = self._get_auth_token()
             url = f"{self.base_url}/track/v1/shipments/{tracking_number}/proof-of-delivery"
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Accept": "application/pdf",
-            }
-
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers)
-                if response.status_code == 404:
-                    raise FileNotFoundError(
-                        f"Proof of delivery for {tracking_number} not found")
-                response.raise_for_status()
-                pdf_bytes = response.content
+            client = get_http_client(self._pool)
+            response = await self._send_authorized("proof", lambda token: client.get(
+                url, headers={"Authorization": f"Bearer {token}", "Accept": "application/pdf"}))
+            if response.status_code == 404:
+                raise FileNotFoundError(
+                    f"Proof of delivery for {tracking_number} not found")
+            response.raise_for_status()
+            pdf_bytes = response.content
 
             file_path.parent.mkdir(parents=True, exist_ok=True)
             file_path.write_bytes(pdf_bytes)
@@ -157,13 +391,7 @@ class FedExService:
 
     def _map_fedex_status(self, fedex_status: str) -> PackageStatus:
         """Map FedEx status to our PackageStatus enum"""
-        status_map = {
-            "PENDING": PackageStatus.PENDING,
-            "IN_TRANSIT": PackageStatus.IN_TRANSIT,
-            "DELIVERED": PackageStatus.DELIVERED,
-            "EXCEPTION": PackageStatus.EXCEPTION
-        }
-        return status_map.get(fedex_status.upper(), PackageStatus.UNKNOWN)
+        return normalize_package_status(fedex_status)
 
     def _map_fedex_service_type(self, service_type: str) -> PackageType:
         """Map FedEx service type to our PackageType enum"""
@@ -192,336 +420,183 @@ class FedExService:
             } if location_data.get('coordinates') else None
         )
 
+    def _error_response(self, tracking_number: str, error_msg: str) -> TrackingResponse:
+        return TrackingResponse(
+            success=False,
+            data=None,
+            error=error_msg,
+            metadata={
+                'timestamp': datetime.now().isoformat(),
+                'tracking_number': tracking_number,
+                'account_number': self.cdict['account_number']
+            }
+        )
+
     async def track_package(self, tracking_number: str) -> TrackingResponse:
         """
         Track a package using FedEx API
+
+        Concurrent lookups are coalesced: callers asking for the same number
+        share one upstream request and distinct numbers arriving within
+        ``FEDEX_COALESCE_WINDOW`` are merged into one multi-number call.
         """
+        return await self._coalescer.load(tracking_number)
+
+    async def track_packages(
+        self, tracking_numbers: List[str], include_raw: bool = False
+    ) -> List[TrackingResponse]:
+        """
+        Track several packages with as few FedEx calls as possible.
+
+        Numbers are de-duplicated and sent in chunks of
+        ``FEDEX_TRACK_BATCH_SIZE``; one response per input number is returned
+        in input order. The FedEx payload is only kept in
+        ``metadata['raw_response']`` when ``include_raw`` is set.
+        """
+        unique = list(dict.fromkeys(tracking_numbers))
+        size = max(1, settings.FEDEX_TRACK_BATCH_SIZE)
+        chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+
+        results: Dict[str, TrackingResponse] = {}
+        for chunk_results in await asyncio.gather(
+                *(self._track_chunk(chunk, include_raw) for chunk in chunks)):
+            results.update(chunk_results)
+        return [results[number] for number in tracking_numbers]
+
+    async def _track_chunk(
+        self, tracking_numbers: List[str], include_raw: bool = False
+    ) -> Dict[str, TrackingResponse]:
+        """Send one multi-number request and map every result back to its number."""
         try:
-            logger.info(f"Tracking package: {tracking_number}")
-            access_token = self._get_auth_token()
-            if asyncio.iscoroutine(access_token):
-                access_token = await access_token
+            logger.info(f"Tracking packages: {', '.join(tracking_numbers)}")
             url = f"{self.base_url}/track/v1/trackingnumbers"
-            headers = {
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
-            }
             payload = {
-                'trackingInfo': [{
-                    'trackingNumberInfo': {
-                        'trackingNumber': tracking_number
-                    }
-                }],
+                'trackingInfo': [
+                    {'trackingNumberInfo': {'trackingNumber': number}}
+                    for number in tracking_numbers
+                ],
                 'includeDetailedScans': True
             }
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                tracking_data = response.json()
-
-            if not tracking_data.get('output', {}).get('completeTrackResults', []):
-                error_msg = "No tracking results found"
-                logger.error(error_msg)
-                return TrackingResponse(
-                    success=False,
-                    data=None,
-                    error=error_msg,
-                    metadata={
-                        'timestamp': datetime.now().isoformat(),
-                        'tracking_number': tracking_number,
-                        'account_number': self.cdict['account_number']
-                    }
-                )
-
-            # Get the first tracking result
-            track_result = tracking_data['output']['completeTrackResults'][0]['trackResults'][0]
-            logger.info("Successfully received tracking data from FedEx")
-            tracking_info = self._format_tracking_info(track_result)
-
-            return TrackingResponse(
-                success=True,
-                data=tracking_info,
-                error=None,
-                metadata={
-                    'response_time': response.elapsed.total_seconds(),
-                    'timestamp': datetime.now().isoformat(),
-                    'tracking_number': tracking_number,
-                    'raw_response': tracking_data,
-                    'account_number': self.cdict['account_number']
-                }
-            )
-
+            client = get_http_client(self._pool)
+            response = await self._send_authorized("track", lambda token: client.post(
+                url,
+                headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+                json=payload,
+            ))
+            response.raise_for_status()
+            tracking_data = loads(response.content)
+        except UpstreamUnavailable as e:
+            error_msg = f"FedEx temporarily unavailable: {str(e)}"
+            logger.warning(error_msg)
+            return {n: self._error_response(n, error_msg) for n in tracking_numbers}
         except httpx.RequestError as e:
             error_msg = f"HTTP request error while tracking package: {str(e)}"
             logger.error(error_msg)
-            return TrackingResponse(
-                success=False,
-                data=None,
-                error=error_msg,
-                metadata={
-                    'timestamp': datetime.now().isoformat(),
-                    'tracking_number': tracking_number,
-                    'account_number': self.cdict['account_number']
-                }
-            )
+            return {n: self._error_response(n, error_msg) for n in tracking_numbers}
         except httpx.HTTPStatusError as e:
             error_msg = f"FedEx API returned an error: {str(e)}"
             logger.error(error_msg)
-            return TrackingResponse(
-                success=False,
-                data=None,
-                error=error_msg,
-                metadata={
-                    'timestamp': datetime.now().isoformat(),
-                    'tracking_number': tracking_number,
-                    'account_number': self.cdict['account_number']
-                }
-            )
+            return {n: self._error_response(n, error_msg) for n in tracking_numbers}
         except Exception as e:
             error_msg = f"Error tracking package: {str(e)}"
             logger.error(error_msg)
-            return TrackingResponse(
-                success=False,
-                data=None,
-                error=error_msg,
-                metadata={
-                    'timestamp': datetime.now().isoformat(),
-                    'tracking_number': tracking_number,
-                    'account_number': self.cdict['account_number']
-                }
-            )
-
-    def _format_tracking_info(self, tracking_details: Dict[str, Any]) -> TrackingInfo:
-        try:
-            # Extract basic tracking information
-            tracking_number = tracking_details.get(
-                'trackingNumberInfo', {}).get('trackingNumber', '')
-            latest_status = tracking_details.get('latestStatusDetail', {})
-            status = latest_status.get('code', 'UNKNOWN')
-            service_detail = tracking_details.get('serviceDetail', {})
-            service_type = self._get_service_type(
-                service_detail.get('type', ''))
-
-            # Extract origin and destination
-            origin = self._extract_location(tracking_details.get(
-                'shipperInformation', {}).get('address', {}))
-            destination = self._extract_location(tracking_details.get(
-                'recipientInformation', {}).get('address', {}))
-
-            # Extract package details
-            package_details = self._extract_package_details(tracking_details)
-
-            # Extract delivery details
-            delivery_details = self._extract_delivery_details(tracking_details)
-
-            # Extract tracking events
-            events = []
-            for event in tracking_details.get('scanEvents', []):
-                try:
-                    event_location = self._extract_location(
-                        event.get('scanLocation', {}))
-                    events.append(TrackingEvent(
-                        status=event.get('eventType', ''),
-                        description=event.get('eventDescription', ''),
-                        timestamp=event.get('date', ''),
-                        location=event_location,
-                        event_type=event.get('eventType', ''),
-                        event_code=event.get('exceptionCode', ''),
-                        exception_code=event.get('exceptionCode', ''),
-                        exception_description=event.get(
-                            'exceptionDescription', '')
-                    ))
-                except Exception as e:
-                    logger.error(f"Error formatting tracking event: {str(e)}")
-                    continue
-
-            # Extract key dates
-            key_dates = self._extract_key_dates(tracking_details)
-
-            # Extract commercial info
-            commercial_info = self._extract_commercial_info(tracking_details)
-
-            return TrackingInfo(
-                tracking_number=tracking_number,
-                status=status,
-                carrier="FedEx",
-                service_type=service_type,
-                origin=origin,
-                destination=destination,
-                package_details=package_details,
-                delivery_details=delivery_details,
-                events=events,
-                key_dates=key_dates,
-                commercial_info=commercial_info,
-                tracking_url=f"https://www.fedex.com/tracking?tracknumbers={tracking_number}"
-            )
-        except Exception as e:
-            logger.error(f"Error formatting tracking info: {str(e)}")
-            raise
+            return {n: self._error_response(n, error_msg) for n in tracking_numbers}
+
+        complete_results = tracking_data.get(
+            'output', {}).get('completeTrackResults', []) or []
+        by_number: Dict[str, Dict[str, Any]] = {}
+        for entry in complete_results:
+            number = entry.get('trackingNumber') or next(
+                (r.get('trackingNumberInfo', {}).get('trackingNumber')
+                 for r in entry.get('trackResults', [])), None)
+            if number:
+                by_number.setdefault(number, entry)
+        if len(tracking_numbers) == 1 and len(complete_results) == 1:
+            # FedEx may echo a normalised number; a single result is unambiguous
+            by_number.setdefault(tracking_numbers[0], complete_results[0])
+
+        response_time = response.elapsed.total_seconds()
+        results = {}
+        for number in tracking_numbers:
+            entry = by_number.get(number)
+            raw = None
+            if include_raw:
+                raw = tracking_data if len(tracking_numbers) == 1 else {
+                    'output': {'completeTrackResults': [entry] if entry else []}}
+            results[number] = self._parse_track_result(
+                number, entry, response_time, raw)
+        return results
+
+    def _parse_track_result(
+        self,
+        tracking_number: str,
+        entry: Dict[str, Any] | None,
+        response_time: float,
+        raw: Dict[str, Any] | None = None,
+    ) -> TrackingResponse:
+        track_results = (entry or {}).get('trackResults') or []
+        if not track_results:
+            error_msg = "No tracking results found"
+            logger.error(f"{error_msg} for {tracking_number}")
+            return self._error_response(tracking_number, error_msg)
+
+        track_result = track_results[0]
+        error = track_result.get('error')
+        if error:
+            error_msg = f"FedEx could not track package: {error.get('message') or error.get('code')}"
+            logger.error(f"{error_msg} ({tracking_number})")
+            return self._error_response(tracking_number, error_msg)
 
-    def _extract_location(self, location_data: Dict[str, Any]) -> Location:
         try:
-            latitude = location_data.get('latitude')
-            longitude = location_data.get('longitude')
-
-            if (latitude is None or longitude is None) and location_data.get('coordinates'):
-                coords = location_data.get('coordinates', {})
-                latitude = coords.get('latitude')
-                longitude = coords.get('longitude')
-
-            coordinates = None
-            if latitude is not None and longitude is not None:
-                coordinates = {
-                    'latitude': latitude,
-                    'longitude': longitude
-                }
-
-            return Location(
-                city=location_data.get('city', ''),
-                state=location_data.get('stateOrProvinceCode', ''),
-                country=location_data.get('countryCode', ''),
-                postal_code=location_data.get('postalCode', ''),
-                coordinates=coordinates
-            )
+            tracking_info = parse_tracking_info(track_result)
         except Exception as e:
-            logger.error(f"Error extracting location: {str(e)}")
-            raise
-
-    def _extract_package_details(self, tracking_details: Dict[str, Any]) -> PackageDetails:
-        try:
-            package_details = tracking_details.get('packageDetails', {})
-            weight_and_dimensions = package_details.get(
-                'weightAndDimensions', {})
-
-            # Extract weight
-            weight = {}
-            for w in weight_and_dimensions.get('weight', []):
-                weight[w.get('unit', '')] = w.get('value', '')
-
-            # Extract dimensions
-            dimensions = {}
-            for d in weight_and_dimensions.get('dimensions', []):
-                dimensions[d.get('units', '')] = {
-                    'length': d.get('length', 0),
-                    'width': d.get('width', 0),
-                    'height': d.get('height', 0)
-                }
-
-            return PackageDetails(
-                weight=weight,
-                dimensions=dimensions,
-                service_type=tracking_details.get(
-                    'serviceDetail', {}).get('type', ''),
-                signature_required=False,  # Will be updated based on delivery details
-                special_handling=[],
-                declared_value=0.0,
-                customs_value=0.0,
-                package_count=int(package_details.get('count', 1)),
-                packaging_description=package_details.get(
-                    'packagingDescription', {}).get('description', '')
-            )
-        except Exception as e:
-            logger.error(f"Error extracting package details: {str(e)}")
-            raise
-
-    def _extract_delivery_details(self, tracking_details: Dict[str, Any]) -> DeliveryDetails:
-        try:
-            delivery_details = tracking_details.get('deliveryDetails', {})
-            delivery_option_eligibility = {}
-
-            # Extract delivery option eligibility
-            for option in delivery_details.get('deliveryOptionEligibilityDetails', []):
-                delivery_option_eligibility[option.get('option', '')] = option.get(
-                    'eligibility', '') == 'ELIGIBLE'
-
-            # Get actual delivery date from dateAndTimes
-            actual_delivery = None
-            for date_info in tracking_details.get('dateAndTimes', []):
-                if date_info.get('type') == 'ACTUAL_DELIVERY':
-                    actual_delivery = date_info.get('dateTime', '')
-                    break
-
-            return DeliveryDetails(
-                delivery_date=actual_delivery,
-                delivery_time=actual_delivery,
-                delivery_location=self._extract_location(
-                    delivery_details.get('actualDeliveryAddress', {})),
-                delivery_instructions='',
-                delivery_attempts=int(
-                    delivery_details.get('deliveryAttempts', 0)),
-                delivery_exceptions=[],
-                actual_delivery=actual_delivery,
-                estimated_delivery=tracking_details.get(
-                    'standardTransitTimeWindow', {}).get('window', {}).get('ends', ''),
-                received_by_name=delivery_details.get('receivedByName', ''),
-                delivery_option_eligibility=delivery_option_eligibility
-            )
-        except Exception as e:
-            logger.error(f"Error extracting delivery details: {str(e)}")
-            raise
+            error_msg = f"Error tracking package: {str(e)}"
+            logger.error(error_msg)
+            return self._error_response(tracking_number, error_msg)
 
-    def _extract_key_dates(self, tracking_details: Dict[str, Any]) -> KeyDates:
-        try:
-            dates = tracking_details.get('dateAndTimes', [])
-            key_dates = {}
-            for date_info in dates:
-                date_type = date_info.get('type', '')
-                if date_type == 'ACTUAL_DELIVERY':
-                    key_dates['actual_delivery'] = date_info.get(
-                        'dateTime', '')
-                elif date_type == 'ACTUAL_PICKUP':
-                    key_dates['actual_pickup'] = date_info.get('dateTime', '')
-                elif date_type == 'SHIP':
-                    key_dates['ship'] = date_info.get('dateTime', '')
-                elif date_type == 'ACTUAL_TENDER':
-                    key_dates['actual_tender'] = date_info.get('dateTime', '')
-                elif date_type == 'ANTICIPATED_TENDER':
-                    key_dates['anticipated_tender'] = date_info.get(
-                        'dateTime', '')
-            return KeyDates(**key_dates)
-        except Exception as e:
-            logger.error(f"Error extracting key dates: {str(e)}")
-            raise
+        metadata = {
+            'response_time': response_time,
+            'timestamp': datetime.now().isoformat(),
+            'tracking_number': tracking_number,
+            'account_number': self.cdict['account_number']
+        }
+        if raw is not None:
+            metadata['raw_response'] = raw
+        return TrackingResponse(
+            success=True,
+            data=tracking_info,
+            error=None,
+            metadata=metadata
+        )
 
-    def _extract_commercial_info(self, tracking_details: Dict[str, Any]) -> CommercialInfo:
-        try:
-            tracking_info = tracking_details.get('trackingNumberInfo', {})
-            additional_info = tracking_details.get(
-                'additionalTrackingInfo', {})
-
-            package_identifiers = []
-            for identifier in additional_info.get('packageIdentifiers', []):
-                for value in identifier.get('values', []):
-                    package_identifiers.append({
-                        'type': identifier.get('type', ''),
-                        'value': value
-                    })
-
-            return CommercialInfo(
-                tracking_number_unique_id=tracking_info.get(
-                    'trackingNumberUniqueId', ''),
-                package_identifiers=package_identifiers,
-                service_detail=tracking_details.get(
-                    'serviceDetail', {}).get('description', ''),
-                available_notifications=tracking_details.get(
-                    'availableNotifications', [])
-            )
-        except Exception as e:
-            logger.error(f"Error extracting commercial info: {str(e)}")
-            raise
 
-    def _get_service_type(self, service_code: str) -> ServiceType:
-        service_mapping = {
-            'GROUND': ServiceType.GROUND,
-            'EXPRESS': ServiceType.EXPRESS,
-            'FIRST_OVERNIGHT': ServiceType.FIRST_OVERNIGHT,
-            'PRIORITY_OVERNIGHT': ServiceType.PRIORITY_OVERNIGHT,
-            'STANDARD_OVERNIGHT': ServiceType.STANDARD_OVERNIGHT,
-            'INTERNATIONAL': ServiceType.INTERNATIONAL,
-            'HOME_DELIVERY': ServiceType.HOME_DELIVERY,
-            'GROUND_ECONOMY': ServiceType.GROUND_ECONOMY,
-            'CUSTOM_CRITICAL': ServiceType.CUSTOM_CRITICAL,
-            'FREIGHT': ServiceType.FREIGHT,
-            'SMART_POST': ServiceType.SMART_POST
-        }
-        return service_mapping.get(service_code, ServiceType.UNKNOWN)
+# Ready-to-use services keyed by account number. Services are stateless apart
+# from their credentials, so one instance per account is shared by every request.
+_service_registry: "OrderedDict[str, FedExService]" = OrderedDict()
+_service_registry_lock = Lock()
+
+
+def get_fedex_service(account: str | None = None) -> FedExService:
+    """Return the shared :class:`FedExService` for ``account``."""
+    key = account or load_fedex_config()['account_number']
+    with _service_registry_lock:
+        service = _service_registry.get(key)
+        if service is not None:
+            _service_registry.move_to_end(key)
+            return service
+
+    service = FedExService(account)
+    with _service_registry_lock:
+        service = _service_registry.setdefault(key, service)
+        _service_registry.move_to_end(key)
+        while len(_service_registry) > settings.FEDEX_SERVICE_REGISTRY_SIZE:
+            _, evicted = _service_registry.popitem(last=False)
+            release_http_client(evicted._pool)
+    return service
+
+
+def coalescer_stats() -> Dict[str, Dict[str, float]]:
+    """Return the request coalescing metrics of every registered account."""
+    with _service_registry_lock:
+        services = list(_service_registry.items())
+    return {account: service._coalescer.stats() for account, service in services}
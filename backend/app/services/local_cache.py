@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, NamedTuple, Set
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+    group: Hashable | None
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with per-entry TTLs.
+
+    The number of entries is capped, and so is their total estimated size
+    when ``max_bytes`` is given. Entries may belong to a ``group`` (for
+    example a tracking number) so that every entry of a shipment can be
+    invalidated at once.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._groups: Dict[Hashable, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        *,
+        size: int = 1,
+        ttl: float | None = None,
+        group: Hashable | None = None,
+    ) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_entries <= 0 or self._over_bytes(size):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + ttl, group)
+            self._bytes += size
+            if group is not None:
+                self._groups.setdefault(group, set()).add(key)
+            while self._entries and (
+                    len(self._entries) > self.max_entries or self._over_bytes(self._bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _over_bytes(self, size: int) -> bool:
+        return self.max_bytes is not None and size > self.max_bytes
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_group(self, group: Hashable) -> None:
+        with self._lock:
+            for key in list(self._groups.get(group, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if entry.group is not None:
+            keys = self._groups.get(entry.group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[entry.group]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,133 @@
+import logging
+import uuid
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import event, insert, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.database import LocationDB
+from ..models.tracking import Location
+from .local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+# (city, state, country, postal_code), the natural key of a location
+LocationKey = Tuple[str, str, str, str]
+
+# Location ids never change, so they can be cached for a long time
+_location_ids = LocalCache(
+    max_entries=settings.LOCATION_CACHE_MAX_ENTRIES,
+    ttl=settings.LOCATION_CACHE_TTL,
+)
+
+# Ids found or created in a session's transaction, cached once it commits
+_PENDING = "interned_locations"
+
+# Keep the IN lists well under the bind parameter limits
+_LOOKUP_BATCH = 200
+
+
+def location_cache_stats() -> Dict[str, float]:
+    return _location_ids.stats()
+
+
+def location_key(location: Location | LocationDB | None) -> LocationKey:
+    if location is None:
+        return ('', '', '', '')
+    return (
+        location.city or '',
+        location.state or '',
+        location.country or '',
+        location.postal_code or '',
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session: Session) -> None:
+    for key, location_id in session.info.pop(_PENDING, {}).items():
+        _location_ids.set(key, location_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session) -> None:
+    # Rows created by the rolled back transaction no longer exist
+    session.info.pop(_PENDING, None)
+
+
+class LocationService:
+    """Interns locations on their (city, state, country, postal_code) key.
+
+    Every distinct place is stored once in ``locations``; callers get its id
+    back from an in-process cache, or from one batched lookup followed by a
+    batched insert of the places never seen before.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _select(self, keys: List[LocationKey]) -> Dict[LocationKey, str]:
+        found: Dict[LocationKey, str] = {}
+        columns = (LocationDB.city, LocationDB.state, LocationDB.country, LocationDB.postal_code)
+        for start in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[start:start + _LOOKUP_BATCH]
+            rows = self.db.query(LocationDB.id, *columns).filter(tuple_(*columns).in_(batch))
+            for location_id, city, state, country, postal_code in rows:
+                found[(city or '', state or '', country or '', postal_code or '')] = location_id
+        return found
+
+    def _insert(self):
+        """INSERT that leaves alone places created concurrently, where supported."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return postgresql.insert(LocationDB).on_conflict_do_nothing()
+        if dialect == 'sqlite':
+            return sqlite.insert(LocationDB).on_conflict_do_nothing()
+        return insert(LocationDB)
+
+    def get_or_create_many(
+        self, locations: Iterable[Location | None]
+    ) -> Dict[LocationKey, str]:
+        """Return the id of every distinct location, creating the missing ones."""
+        wanted: Dict[LocationKey, Location | None] = {}
+        for location in locations:
+            wanted.setdefault(location_key(location), location)
+
+        pending = self.db.info.setdefault(_PENDING, {})
+        ids: Dict[LocationKey, str] = {}
+        missing: List[LocationKey] = []
+        for key in wanted:
+            location_id = pending.get(key) or _location_ids.get(key)
+            if location_id is None:
+                missing.append(key)
+            else:
+                ids[key] = location_id
+        if not missing:
+            return ids
+
+        found = self._select(missing)
+        new_keys = [key for key in missing if key not in found]
+        if new_keys:
+            rows = []
+            for key in new_keys:
+                coordinates = getattr(wanted[key], 'coordinates', None)
+                rows.append({
+                    'id': str(uuid.uuid4()),
+                    'city': key[0],
+                    'state': key[1],
+                    'country': key[2],
+                    'postal_code': key[3],
+                    'latitude': coordinates.latitude if coordinates else None,
+                    'longitude': coordinates.longitude if coordinates else None,
+                })
+            self.db.execute(self._insert(), rows)
+            # Read back rather than trust our ids: another writer may have won
+            found.update(self._select(new_keys))
+
+        pending.update(found)
+        ids.update(found)
+        return ids
+
+    def get_or_create(self, location: Location | None) -> str:
+        return self.get_or_create_many([location])[location_key(location)]
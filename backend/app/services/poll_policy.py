@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from ..config import settings
+from ..models.tracking import PackageStatus
+
+
+def _aware(value: datetime | None) -> datetime | None:
+    # SQLite returns naive datetimes; everything is stored as UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def poll_interval(
+    status: PackageStatus | None,
+    last_event_at: datetime | None,
+    estimated_delivery: datetime | None,
+    now: datetime,
+) -> timedelta | None:
+    """How long to wait before polling FedEx again, or None to stop.
+
+    Delivered shipments are never polled. Exceptions and shipments close to
+    their ETA are polled often; legs without a scan for a long time, such as
+    ocean or long-distance ground moves, rarely.
+    """
+    if status == PackageStatus.DELIVERED:
+        return None
+    if status == PackageStatus.EXCEPTION:
+        return timedelta(seconds=settings.TRACKING_POLL_EXCEPTION)
+    estimated_delivery = _aware(estimated_delivery)
+    window = timedelta(hours=settings.TRACKING_POLL_ETA_WINDOW_HOURS)
+    if estimated_delivery is not None and abs(estimated_delivery - now) <= window:
+        return timedelta(seconds=settings.TRACKING_POLL_NEAR_ETA)
+    last_event_at = _aware(last_event_at)
+    long_haul = timedelta(hours=settings.TRACKING_POLL_LONG_HAUL_HOURS)
+    if last_event_at is not None and now - last_event_at > long_haul:
+        return timedelta(seconds=settings.TRACKING_POLL_LONG_HAUL)
+    return timedelta(seconds=settings.TRACKING_POLL_ACTIVE)
+
+
+def next_poll_at(
+    status: PackageStatus | None,
+    last_event_at: datetime | None,
+    estimated_delivery: datetime | None,
+    now: datetime | None = None,
+) -> datetime | None:
+    now = now or datetime.now(timezone.utc)
+    interval = poll_interval(status, last_event_at, estimated_delivery, now)
+    return None if interval is None else now + interval
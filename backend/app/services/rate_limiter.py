@@ -0,0 +1,208 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import AbstractContextManager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Tuple
+
+import redis.asyncio as aioredis
+
+from ..config import settings
+from .upstream_guard import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_call_priority: ContextVar[int] = ContextVar("fedex_call_priority", default=INTERACTIVE)
+
+# Refills the bucket from the Redis clock, then takes one token if available.
+# Returns the number of seconds to wait before a token will be available, as a
+# string because Lua numbers are truncated to integers on the way out.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RateLimitTimeout(UpstreamUnavailable):
+    pass
+
+
+def current_priority() -> int:
+    """Priority of the FedEx calls made in the current context."""
+    return _call_priority.get()
+
+
+@contextmanager
+def call_priority(priority: int) -> Iterator[None]:
+    """Make FedEx calls in this context at ``priority``."""
+    token = _call_priority.set(priority)
+    try:
+        yield
+    finally:
+        _call_priority.reset(token)
+
+
+def background_priority() -> AbstractContextManager[None]:
+    """Mark FedEx calls made in this context as background traffic."""
+    return call_priority(BACKGROUND)
+
+
+class _Bucket:
+    def __init__(self, account: str, endpoint: str, rate: float, burst: int):
+        self.account = account
+        self.endpoint = endpoint
+        self.rate = rate
+        self.burst = burst
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.pump: asyncio.Task | None = None
+        self.granted = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+
+class FedExRateLimiter:
+    """Token-bucket limiter shared by every worker through Redis.
+
+    Each account has one bucket per FedEx endpoint (``track``, ``proof``). The
+    refill-and-take step runs as a Lua script so concurrent workers never
+    overspend a bucket. Within a worker, callers wait in a queue ordered by
+    priority and arrival, so interactive lookups go ahead of background
+    refreshes and nobody is failed merely because the bucket is empty.
+    """
+
+    def __init__(self, client: Any | None = None,
+                 budgets: Dict[str, Tuple[float, int]] | None = None):
+        self.client = client or aioredis.from_url(settings.REDIS_URL)
+        self.budgets = budgets or {
+            "track": (settings.FEDEX_TRACK_RATE, settings.FEDEX_TRACK_BURST),
+            "proof": (settings.FEDEX_PROOF_RATE, settings.FEDEX_PROOF_BURST),
+        }
+        self._script = self.client.register_script(_TOKEN_BUCKET_LUA)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._seq = itertools.count()
+
+    @staticmethod
+    def key(account: str, endpoint: str) -> str:
+        return f"fedex:ratelimit:{account}:{endpoint}"
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queued futures belong to the previous loop; drop them
+            self._loop = loop
+            for bucket in self._buckets.values():
+                bucket.waiters = []
+                bucket.pump = None
+        return loop
+
+    async def acquire(self, account: str, endpoint: str, *,
+                      priority: int | None = None, timeout: float | None = None) -> None:
+        """Wait for a token of ``account``'s ``endpoint`` budget."""
+        if not settings.FEDEX_RATE_LIMIT_ENABLED:
+            return
+        loop = self._bind_loop()
+        bucket = self._buckets.get((account, endpoint))
+        if bucket is None:
+            rate, burst = self.budgets[endpoint]
+            bucket = self._buckets.setdefault(
+                (account, endpoint), _Bucket(account, endpoint, rate, burst))
+
+        if priority is None:
+            priority = _call_priority.get()
+        future = loop.create_future()
+        heapq.heappush(bucket.waiters, (priority, next(self._seq), future))
+        if bucket.pump is None or bucket.pump.done():
+            bucket.pump = loop.create_task(self._pump(bucket))
+
+        start = time.monotonic()
+        timeout = settings.FEDEX_CALL_DEADLINE if timeout is None else timeout
+        try:
+            await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            bucket.timeouts += 1
+            raise RateLimitTimeout(
+                f"No {endpoint} quota available for account {account} within {timeout}s")
+        bucket.wait_seconds += time.monotonic() - start
+
+    async def _pump(self, bucket: _Bucket) -> None:
+        while bucket.waiters:
+            future = bucket.waiters[0][2]
+            if future.done():
+                # The caller gave up waiting
+                heapq.heappop(bucket.waiters)
+                continue
+            wait = await self._take(bucket)
+            if wait <= 0:
+                heapq.heappop(bucket.waiters)
+                if not future.done():
+                    future.set_result(None)
+                    bucket.granted += 1
+            else:
+                bucket.throttled += 1
+                # A higher-priority caller may be at the head once we wake up
+                await asyncio.sleep(wait)
+
+    async def _take(self, bucket: _Bucket) -> float:
+        try:
+            wait = await self._script(
+                keys=[self.key(bucket.account, bucket.endpoint)],
+                args=[bucket.rate, bucket.burst, 1])
+        except Exception as e:
+            # Without Redis there is no shared budget; let the call through
+            logger.warning(f"FedEx rate limiter unavailable: {e}")
+            return 0.0
+        return float(wait)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{bucket.account}:{bucket.endpoint}": {
+                'granted': bucket.granted,
+                'throttled': bucket.throttled,
+                'timeouts': bucket.timeouts,
+                'queued': len(bucket.waiters),
+                'avg_wait': bucket.wait_seconds / bucket.granted if bucket.granted else 0.0,
+            }
+            for bucket in self._buckets.values()
+        }
+
+
+_rate_limiter: FedExRateLimiter | None = None
+
+
+def get_rate_limiter() -> FedExRateLimiter:
+    """Return the process-wide FedEx rate limiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = FedExRateLimiter()
+    return _rate_limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return _rate_limiter.stats() if _rate_limiter is not None else {}
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+import httpx
+
+from ..config import settings
+from .upstream_guard import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt for an idempotent read
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+Attempt = Callable[[float], Awaitable[httpx.Response]]
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """Return the delay requested by a ``Retry-After`` header, in seconds."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _is_retryable(response: httpx.Response) -> bool:
+    return response.status_code in RETRYABLE_STATUSES
+
+
+class RetryPolicy:
+    """Retries and optionally hedges idempotent FedEx reads within one deadline.
+
+    Failed attempts (transport errors, timeouts and retryable statuses) are
+    retried after a capped exponential backoff with full jitter, or after the
+    delay given by ``Retry-After``. With hedging enabled, an attempt that has
+    not answered after the observed p95 latency gets a second request in
+    parallel, and the first good answer wins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        deadline: float | None = None,
+        hedge: bool | None = None,
+        hedge_min_delay: float | None = None,
+        hedge_min_samples: int | None = None,
+    ):
+        self.name = name
+        if max_attempts is None:
+            max_attempts = settings.FEDEX_RETRY_MAX_ATTEMPTS
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = settings.FEDEX_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.FEDEX_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.deadline = settings.FEDEX_REQUEST_DEADLINE if deadline is None else deadline
+        self.hedge = settings.FEDEX_HEDGE_ENABLED if hedge is None else hedge
+        self.hedge_min_delay = (
+            settings.FEDEX_HEDGE_MIN_DELAY if hedge_min_delay is None else hedge_min_delay)
+        self.hedge_min_samples = (
+            settings.FEDEX_HEDGE_MIN_SAMPLES if hedge_min_samples is None else hedge_min_samples)
+        self._latencies: Deque[float] = deque(maxlen=500)
+
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (starting at 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def p95(self) -> float | None:
+        if len(self._latencies) < max(1, self.hedge_min_samples):
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def run(self, attempt: Attempt, deadline: float | None = None) -> httpx.Response:
+        """Call ``attempt(timeout)`` until it succeeds, attempts run out or the deadline passes.
+
+        ``deadline`` overrides the policy's own for a call that already used
+        part of it. The last response is returned even if it has a retryable
+        status, and the last exception is re-raised when no attempt produced
+        a response.
+        """
+        self.calls += 1
+        expires = time.monotonic() + (self.deadline if deadline is None else deadline)
+        for number in range(1, self.max_attempts + 1):
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{self.name} request deadline exceeded")
+            last_attempt = number == self.max_attempts
+            try:
+                response = await self._hedged(attempt, min(remaining, settings.FEDEX_CALL_DEADLINE))
+            except (httpx.TransportError, DeadlineExceeded) as e:
+                delay = self.backoff(number)
+                if last_attempt or delay >= expires - time.monotonic():
+                    raise
+                logger.warning(f"{self.name} attempt {number} failed ({e!r}); retrying in {delay:.2f}s")
+            else:
+                if not _is_retryable(response) or last_attempt:
+                    return response
+                retry_after = _retry_after(response)
+                delay = self.backoff(number) if retry_after is None else retry_after
+                if delay >= expires - time.monotonic():
+                    # FedEx asked us to wait longer than the caller can
+                    return response
+                logger.warning(
+                    f"{self.name} attempt {number} returned {response.status_code}; "
+                    f"retrying in {delay:.2f}s")
+            self.retries += 1
+            await asyncio.sleep(delay)
+        raise DeadlineExceeded(f"{self.name} request deadline exceeded")  # pragma: no cover
+
+    async def _timed(self, attempt: Attempt, timeout: float) -> httpx.Response:
+        start = time.monotonic()
+        response = await attempt(timeout)
+        if not _is_retryable(response):
+            self._latencies.append(time.monotonic() - start)
+        return response
+
+    async def _hedged(self, attempt: Attempt, timeout: float) -> httpx.Response:
+        primary = asyncio.ensure_future(self._timed(attempt, timeout))
+        p95 = self.p95() if self.hedge else None
+        delay = None if p95 is None else max(self.hedge_min_delay, p95)
+        if delay is None or delay >= timeout:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._timed(attempt, timeout - delay))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and not _is_retryable(task.result()):
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Neither answer was usable; report the primary one
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'p95': self.p95(),
+        }
+
+
+_policies: Dict[str, RetryPolicy] = {}
+
+
+def get_retry_policy(name: str) -> RetryPolicy:
+    """Return the process-wide retry policy for the ``name`` FedEx endpoint."""
+    policy = _policies.get(name)
+    if policy is None:
+        policy = _policies.setdefault(name, RetryPolicy(name))
+    return policy
+
+
+def retry_policy_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: policy.stats() for name, policy in _policies.items()}
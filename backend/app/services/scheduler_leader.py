@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+
+import redis.asyncio as aioredis
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Extend the lease only while this worker still holds it
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderElector:
+    """Elect one worker of the cluster to run the scheduled jobs.
+
+    Every worker campaigns for a Redis lease (``SET NX PX``) every third of
+    its TTL. The holder renews it with a compare-and-expire script and is the
+    leader while its last renewal is younger than the TTL, so a worker cut
+    off from Redis steps down before another one can take over. When the
+    leader dies its lease expires and the next campaign of another worker
+    wins it; a leader shutting down cleanly releases it right away.
+    """
+
+    def __init__(self, client: Any | None = None, key: str | None = None,
+                 ttl: float | None = None, identity: str | None = None):
+        self.client = client or aioredis.from_url(settings.REDIS_URL)
+        self.key = key or settings.SCHEDULER_LEADER_KEY
+        self.ttl = ttl or settings.SCHEDULER_LEADER_TTL_SECONDS
+        self.identity = identity or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")
+        self._renew = self.client.register_script(_RENEW_LUA)
+        self._release = self.client.register_script(_RELEASE_LUA)
+        self._valid_until = 0.0
+        self.elections = 0
+        self.lost = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def campaign(self) -> bool:
+        """Acquire or renew the lease; return whether this worker leads."""
+        was_leader = self.is_leader
+        started = time.monotonic()
+        ttl_ms = int(self.ttl * 1000)
+        try:
+            if was_leader:
+                held = bool(await self._renew(keys=[self.key], args=[self.identity, ttl_ms]))
+            else:
+                held = bool(await self.client.set(self.key, self.identity, nx=True, px=ttl_ms))
+        except Exception as e:
+            logger.warning(f"Scheduler leader election unavailable: {e}")
+            held = False
+        if held:
+            # Counted from before the call, the lease cannot outlive our belief
+            self._valid_until = started + self.ttl
+            if not was_leader:
+                self.elections += 1
+                logger.info(f"Worker {self.identity} now runs the scheduled jobs")
+        else:
+            self._valid_until = 0.0
+            if was_leader:
+                self.lost += 1
+                logger.warning(f"Worker {self.identity} lost the scheduler lease")
+        return held
+
+    async def resign(self) -> None:
+        if not self.is_leader:
+            return
+        self._valid_until = 0.0
+        try:
+            await self._release(keys=[self.key], args=[self.identity])
+        except Exception as e:
+            logger.warning(f"Could not release the scheduler lease: {e}")
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            await self.campaign()
+
+
+_job_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _stats_for(name: str) -> Dict[str, Any]:
+    return _job_stats.setdefault(name, {
+        "runs": 0, "failures": 0, "skipped": 0, "last_duration": None,
+        "max_duration": 0.0, "total_duration": 0.0, "last_run_at": None,
+        "last_error": None,
+    })
+
+
+def _record(name: str, duration: float, error: Exception | None) -> None:
+    stats = _stats_for(name)
+    stats["runs"] += 1
+    stats["last_duration"] = duration
+    stats["max_duration"] = max(stats["max_duration"], duration)
+    stats["total_duration"] += duration
+    stats["last_run_at"] = datetime.now().isoformat()
+    if error is not None:
+        stats["failures"] += 1
+        stats["last_error"] = str(error)
+
+
+async def _claim_run(elector: LeaderElector, name: str, interval: float) -> bool:
+    """Take the run lease of job ``name`` for one interval.
+
+    Each worker's timer has its own phase, so after a failover the new leader
+    could fire right after the old one ran the job. The lease, left to expire
+    after the run, rules that out; it ends ``SCHEDULER_JOB_LEASE_GRACE``
+    seconds early (at most half an interval) so that the leader's own next
+    tick is not skipped.
+    """
+    lease = max(interval / 2, interval - settings.SCHEDULER_JOB_LEASE_GRACE)
+    lease_ms = max(1, int(lease * 1000))
+    try:
+        return bool(await elector.client.set(
+            f"{elector.key}:job:{name}", elector.identity, nx=True, px=lease_ms))
+    except Exception as e:
+        logger.warning(f"Run lease of scheduled job {name} unavailable: {e}")
+        return False
+
+
+def leader_only(
+    func: Callable[[], Any], interval: float, elector: LeaderElector | None = None
+) -> Callable[[], Awaitable[None]]:
+    """Wrap a job scheduled every ``interval`` seconds so that it runs once
+    per interval on the elected worker.
+
+    Synchronous jobs run in a thread. Duration and failures of every run are
+    recorded for :func:`scheduler_stats`; workers that do not run it count a
+    skip.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def job() -> None:
+        current = elector or get_leader_elector()
+        if not current.is_leader or not await _claim_run(current, name, interval):
+            _stats_for(name)["skipped"] += 1
+            return
+        start = time.monotonic()
+        error = None
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func()
+            else:
+                await asyncio.to_thread(func)
+        except Exception as e:
+            error = e
+            logger.error(f"Scheduled job {name} failed: {e}")
+        finally:
+            _record(name, time.monotonic() - start, error)
+
+    return job
+
+
+def add_leader_job(scheduler: Any, func: Callable[[], Any], seconds: float, **kwargs: Any) -> Any:
+    """Schedule ``func`` every ``seconds`` on ``scheduler``, run cluster-wide once."""
+    return scheduler.add_job(
+        leader_only(func, seconds), "interval", seconds=seconds, **kwargs)
+
+
+_elector: LeaderElector | None = None
+_campaign: asyncio.Task | None = None
+
+
+def get_leader_elector() -> LeaderElector:
+    """Return the process-wide scheduler leader elector."""
+    global _elector
+    if _elector is None:
+        _elector = LeaderElector()
+    return _elector
+
+
+async def start_leader_election() -> None:
+    global _campaign
+    if _campaign is None:
+        await get_leader_elector().campaign()
+        _campaign = asyncio.create_task(get_leader_elector().run())
+
+
+async def stop_leader_election() -> None:
+    global _campaign
+    if _campaign is not None:
+        _campaign.cancel()
+        try:
+            await _campaign
+        except asyncio.CancelledError:
+            pass
+        _campaign = None
+    await get_leader_elector().resign()
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    elector = _elector
+    return {
+        "leader": elector is not None and elector.is_leader,
+        "identity": elector.identity if elector else None,
+        "elections": elector.elections if elector else 0,
+        "lost": elector.lost if elector else 0,
+        "jobs": {name: dict(stats) for name, stats in _job_stats.items()},
+    }
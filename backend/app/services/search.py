@@ -0,0 +1,249 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import DateTime, and_, delete, distinct, event, func, inspect, insert, or_, select, text
+from sqlalchemy.orm import Query, Session
+
+from ..config import settings
+from ..models.database import ColisDB, SearchNgramDB, TrackingDB
+
+logger = logging.getLogger(__name__)
+
+# Columns searched by substring, per table
+NGRAM_FIELDS: Dict[type, Tuple[str, ...]] = {
+    ColisDB: ('reference', 'tcn', 'code_barre'),
+    TrackingDB: ('tracking_number', 'customer_name'),
+}
+
+NGRAM_SIZE = 3
+
+
+class SearchPage(NamedTuple):
+    items: List[Any]
+    # None when the count was skipped
+    total: int | None
+    next_cursor: str | None
+    total_is_estimate: bool = False
+
+
+def total_pages(total: int | None, page_size: int) -> int | None:
+    return None if total is None else (total + page_size - 1) // page_size
+
+
+def ngrams(value: str | None) -> set[str]:
+    value = (value or '').lower()
+    return {value[i:i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+
+
+def _uses_trigram_index(db: Session) -> bool:
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+def substring_filter(db: Session, model: type, field: str, term: str):
+    """``field ILIKE '%term%'``, narrowed with the n-gram table when there
+    is no trigram index to serve it."""
+    column = getattr(model, field)
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    clause = column.ilike(f"%{escaped}%", escape='\\')
+    grams = ngrams(term)
+    if _uses_trigram_index(db) or not grams:
+        return clause
+    candidates = (
+        select(SearchNgramDB.row_id)
+        .where(
+            SearchNgramDB.entity == model.__tablename__,
+            SearchNgramDB.field == field,
+            SearchNgramDB.gram.in_(grams),
+        )
+        .group_by(SearchNgramDB.row_id)
+        .having(func.count(distinct(SearchNgramDB.gram)) == len(grams))
+    )
+    return and_(model.id.in_(candidates), clause)
+
+
+# -- n-gram maintenance ----------------------------------------------------
+
+
+def _ngram_rows(model: type, target: Any, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    return [
+        {'entity': model.__tablename__, 'field': field, 'gram': gram, 'row_id': target.id}
+        for field in fields
+        for gram in ngrams(getattr(target, field))
+    ]
+
+
+def _reindex_row(connection, model: type, target: Any, fields: Tuple[str, ...]) -> None:
+    connection.execute(delete(SearchNgramDB).where(
+        SearchNgramDB.entity == model.__tablename__,
+        SearchNgramDB.row_id == target.id,
+        SearchNgramDB.field.in_(fields),
+    ))
+    rows = _ngram_rows(model, target, fields)
+    if rows:
+        connection.execute(insert(SearchNgramDB), rows)
+
+
+def _register_ngram_listeners(model: type, fields: Tuple[str, ...]) -> None:
+    @event.listens_for(model, "after_insert")
+    def _inserted(mapper, connection, target):
+        if connection.dialect.name != 'postgresql':
+            rows = _ngram_rows(model, target, fields)
+            if rows:
+                connection.execute(insert(SearchNgramDB), rows)
+
+    @event.listens_for(model, "after_update")
+    def _updated(mapper, connection, target):
+        if connection.dialect.name == 'postgresql':
+            return
+        state = inspect(target)
+        changed = tuple(f for f in fields if state.attrs[f].history.has_changes())
+        if changed:
+            _reindex_row(connection, model, target, changed)
+
+    @event.listens_for(model, "after_delete")
+    def _deleted(mapper, connection, target):
+        if connection.dialect.name != 'postgresql':
+            connection.execute(delete(SearchNgramDB).where(
+                SearchNgramDB.entity == model.__tablename__,
+                SearchNgramDB.row_id == target.id,
+            ))
+
+
+for _model, _fields in NGRAM_FIELDS.items():
+    _register_ngram_listeners(_model, _fields)
+
+
+def rebuild_ngram_index(db: Session) -> int:
+    """Recompute every n-gram, e.g. for rows created before the table existed."""
+    if _uses_trigram_index(db):
+        return 0
+    db.execute(delete(SearchNgramDB))
+    count = 0
+    for model, fields in NGRAM_FIELDS.items():
+        for row in db.query(model).yield_per(1000):
+            rows = _ngram_rows(model, row, fields)
+            if rows:
+                db.execute(insert(SearchNgramDB), rows)
+            count += 1
+    db.commit()
+    return count
+
+
+# -- keyset pagination -------------------------------------------------------
+
+
+def encode_cursor(sort_by: str, descending: bool, row: Any) -> str:
+    value = getattr(row, sort_by)
+    if isinstance(value, Enum):
+        value = value.value
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {'s': sort_by, 'd': descending, 'v': value, 'id': row.id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool) -> Tuple[Any, str]:
+    """Return the (sort value, id) of the row a cursor points after.
+
+    Raises ``ValueError`` for a malformed cursor or one issued for another
+    sort order.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        value, row_id = payload['v'], payload['id']
+        matches = payload['s'] == sort_by and payload['d'] == descending
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if not matches:
+        raise ValueError("Cursor does not match the requested sort order")
+    return value, row_id
+
+
+def keyset_page(
+    query: Query,
+    model: type,
+    sort_by: str,
+    descending: bool,
+    page_size: int,
+    *,
+    cursor: str | None = None,
+    page: int = 1,
+) -> Tuple[List[Any], str | None]:
+    """Fetch one page ordered by ``(sort_by, id)``.
+
+    With a cursor the page starts right after the row it points to, using
+    the sort index instead of skipping rows; without one ``page`` falls back
+    to OFFSET. The cursor of the next page is returned, or None on the last.
+    """
+    column = getattr(model, sort_by)
+    order = (column.desc(), model.id.desc()) if descending else (column.asc(), model.id.asc())
+    query = query.order_by(*order)
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_by, descending)
+        if isinstance(column.type, DateTime) and value is not None:
+            value = datetime.fromisoformat(value)
+        # Compare against the stored value of the cursor row, so the
+        # database never has to match a re-serialized copy of it; the value
+        # in the cursor only serves if that row was deleted meanwhile
+        stored = select(column).where(model.id == row_id).scalar_subquery()
+        boundary = func.coalesce(stored, value)
+        if descending:
+            after = or_(column < boundary, and_(column == boundary, model.id < row_id))
+        else:
+            after = or_(column > boundary, and_(column == boundary, model.id > row_id))
+        query = query.filter(after)
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    rows = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(sort_by, descending, rows[-1])
+    return rows, next_cursor
+
+
+# -- totals -----------------------------------------------------------------
+
+
+def _planner_estimate(db: Session, query: Query) -> int | None:
+    """Row count estimated by the PostgreSQL planner, without running the query."""
+    try:
+        sql = str(query.statement.compile(
+            dialect=db.get_bind().dialect, compile_kwargs={'literal_binds': True}))
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Could not estimate search count: {e}")
+        return None
+
+
+def count_rows(db: Session, query: Query, mode: str) -> Tuple[int | None, bool]:
+    """Return ``(total, is_estimate)`` for ``mode`` exact, estimate or none.
+
+    Estimates come from the PostgreSQL planner. Other databases count
+    exactly up to ``SEARCH_COUNT_ESTIMATE_CAP`` rows and report the cap as
+    an estimate beyond it.
+    """
+    if mode == 'none':
+        return None, False
+    if mode == 'estimate':
+        if _uses_trigram_index(db):
+            estimate = _planner_estimate(db, query)
+            if estimate is not None:
+                return estimate, True
+        else:
+            cap = settings.SEARCH_COUNT_ESTIMATE_CAP
+            capped = query.limit(cap + 1).count()
+            if capped > cap:
+                return cap, True
+            return capped, False
+    return query.count(), False
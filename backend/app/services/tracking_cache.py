@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, NamedTuple
+
+import redis.asyncio as aioredis
+
+from ..config import settings
+from ..models.tracking import PackageStatus, TrackingResponse
+from .fedex_service import normalize_package_status
+from .local_cache import LocalCache
+from .cache_invalidation import publish_invalidation, register_invalidation_handler
+from .rate_limiter import background_priority
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "tracking"
+# Payloads above this size are zlib-compressed before being stored
+_COMPRESS_THRESHOLD = 1024
+_PLAIN = b"j"
+_ZLIB = b"z"
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _loads(data: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _encode(response: TrackingResponse) -> tuple[bytes, int]:
+    data = response.model_dump(mode="json", exclude_none=True)
+    metadata = data.get("metadata") or {}
+    metadata.pop("raw_response", None)
+    body = _dumps(data)
+    if len(body) > _COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(body, 1), len(body)
+    return _PLAIN + body, len(body)
+
+
+def _decode(blob: bytes) -> tuple[TrackingResponse, int]:
+    flag, body = blob[:1], blob[1:]
+    if flag == _ZLIB:
+        body = zlib.decompress(body)
+    return TrackingResponse.model_validate(_loads(body)), len(body)
+
+
+def serialize_response(response: TrackingResponse) -> bytes:
+    """Encode a response compactly, leaving out the raw FedEx payload."""
+    return _encode(response)[0]
+
+
+def deserialize_response(blob: bytes) -> TrackingResponse:
+    return _decode(blob)[0]
+
+
+def ttl_for_status(status: str | None) -> int:
+    """Return how long a response with ``status`` may be served from cache."""
+    ttls = {
+        PackageStatus.DELIVERED: settings.TRACKING_CACHE_TTL_DELIVERED,
+        PackageStatus.IN_TRANSIT: settings.TRACKING_CACHE_TTL_IN_TRANSIT,
+        PackageStatus.PENDING: settings.TRACKING_CACHE_TTL_IN_TRANSIT,
+    }
+    return ttls.get(normalize_package_status(status), settings.TRACKING_CACHE_TTL_EXCEPTION)
+
+
+class CachedTracking(NamedTuple):
+    response: TrackingResponse
+    age: float
+    stale: bool
+
+
+def _age(response: TrackingResponse) -> float:
+    cached_at = (response.metadata or {}).get("cached_at")
+    if not cached_at:
+        return float("inf")
+    return max(0.0, (datetime.now() - datetime.fromisoformat(cached_at)).total_seconds())
+
+
+def _copy(response: TrackingResponse) -> TrackingResponse:
+    # Callers decorate the metadata, so never hand out the cached instance
+    return response.model_copy(update={"metadata": dict(response.metadata or {})})
+
+
+class TrackingCache:
+    """Two-level cache of successful tracking responses.
+
+    The first level is a bounded in-process LRU that saves the Redis round
+    trip and deserialization for hot numbers. The second level is Redis:
+    entries for one tracking number live in a single hash whose fields are
+    account numbers, so a webhook update can drop every account's copy with
+    one ``DEL`` and the status-dependent TTL applies to the whole shipment.
+    Invalidations are broadcast so every worker drops its local copy.
+    """
+
+    def __init__(self, client: Any | None = None, local: LocalCache | None = None):
+        self.client = client or aioredis.from_url(settings.REDIS_URL)
+        self.local = local or LocalCache(
+            max_entries=settings.TRACKING_L1_MAX_ENTRIES,
+            max_bytes=settings.TRACKING_L1_MAX_BYTES,
+            ttl=settings.TRACKING_L1_TTL,
+        )
+        self._refreshing: Dict[tuple[str, str], asyncio.Task] = {}
+
+    @staticmethod
+    def key(tracking_number: str) -> str:
+        return f"{_KEY_PREFIX}:{tracking_number}"
+
+    async def lookup(self, tracking_number: str, account: str) -> CachedTracking | None:
+        """Return the cached response if it is fresh or within the max-staleness window."""
+        response = self.local.get((tracking_number, account))
+        if response is None:
+            try:
+                async with self.client.pipeline(transaction=False) as pipe:
+                    pipe.hget(self.key(tracking_number), account)
+                    pipe.ttl(self.key(tracking_number))
+                    blob, ttl = await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Tracking cache read failed for {tracking_number}: {e}")
+                return None
+            if blob is None:
+                return None
+            try:
+                response, size = _decode(blob)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cache entry for {tracking_number}: {e}")
+                return None
+            if ttl and ttl > 0:
+                self.local.set((tracking_number, account), response,
+                               size=size, ttl=ttl, group=tracking_number)
+
+        age = _age(response)
+        fresh_for = ttl_for_status(response.data.status if response.data else None)
+        if age >= fresh_for + settings.TRACKING_CACHE_MAX_STALE:
+            return None
+        return CachedTracking(_copy(response), age, age >= fresh_for)
+
+    async def get(self, tracking_number: str, account: str) -> TrackingResponse | None:
+        """Return the cached response only while it is fresh."""
+        cached = await self.lookup(tracking_number, account)
+        if cached is None or cached.stale:
+            return None
+        return cached.response
+
+    async def set(self, tracking_number: str, account: str, response: TrackingResponse) -> None:
+        if not response.success or response.data is None:
+            return
+        metadata = dict(response.metadata or {})
+        # The FedEx payload is only returned to the caller that asked for it
+        metadata.pop("raw_response", None)
+        metadata["cached_at"] = datetime.now().isoformat()
+        cached = response.model_copy(update={"metadata": metadata})
+        blob, size = _encode(cached)
+        # Keep entries past their freshness so they can be served while revalidating
+        ttl = ttl_for_status(response.data.status) + settings.TRACKING_CACHE_MAX_STALE
+        self.local.set((tracking_number, account), cached,
+                       size=size, ttl=ttl, group=tracking_number)
+        key = self.key(tracking_number)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, account, blob)
+                pipe.expire(key, ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Tracking cache write failed for {tracking_number}: {e}")
+
+    def refresh_in_background(
+        self,
+        tracking_number: str,
+        account: str,
+        fetch: Callable[[], Awaitable[TrackingResponse]],
+    ) -> None:
+        """Re-fetch a stale entry without making the caller wait.
+
+        At most one refresh per number and account runs in this worker, and a
+        short Redis lock keeps other workers from refreshing it concurrently.
+        """
+        key = (tracking_number, account)
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._refresh(tracking_number, account, fetch))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(
+        self,
+        tracking_number: str,
+        account: str,
+        fetch: Callable[[], Awaitable[TrackingResponse]],
+    ) -> None:
+        lock_key = f"{self.key(tracking_number)}:refresh:{account}"
+        try:
+            acquired = await self.client.set(
+                lock_key, "1", nx=True, ex=settings.TRACKING_REFRESH_LOCK_SECONDS)
+        except Exception as e:
+            logger.warning(f"Tracking refresh lock unavailable for {tracking_number}: {e}")
+            acquired = True
+        if not acquired:
+            return
+        try:
+            # Refreshes must not hold up interactive lookups at the rate limiter
+            with background_priority():
+                response = await fetch()
+            if response.success:
+                await self.set(tracking_number, account, response)
+            else:
+                logger.warning(
+                    f"Background refresh of {tracking_number} failed: {response.error}")
+        except Exception as e:
+            logger.error(f"Background refresh of {tracking_number} failed: {e}")
+        finally:
+            try:
+                await self.client.delete(lock_key)
+            except Exception:
+                pass
+
+    async def invalidate(self, tracking_number: str) -> None:
+        try:
+            await self.client.delete(self.key(tracking_number))
+        except Exception as e:
+            logger.warning(f"Tracking cache invalidation failed for {tracking_number}: {e}")
+        await publish_invalidation("tracking", tracking_number)
+
+
+_tracking_cache: TrackingCache | None = None
+
+
+def get_tracking_cache() -> TrackingCache:
+    """Return the process-wide tracking cache."""
+    global _tracking_cache
+    if _tracking_cache is None:
+        _tracking_cache = TrackingCache()
+    return _tracking_cache
+
+
+def _drop_local(tracking_number: str) -> None:
+    if _tracking_cache is not None:
+        _tracking_cache.local.invalidate_group(tracking_number)
+
+
+register_invalidation_handler("tracking", _drop_local)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+from ..models.tracking import TrackingResponse
+from .rate_limiter import call_priority, current_priority
+
+logger = logging.getLogger(__name__)
+
+BatchLoader = Callable[[List[str]], Awaitable[List[TrackingResponse]]]
+
+
+class TrackingCoalescer:
+    """Dataloader-style front for single tracking lookups.
+
+    Concurrent requests for the same number share one in-flight upstream
+    future, and distinct numbers arriving within ``window`` seconds are merged
+    into a single multi-number call to ``loader``.
+
+    Batches are kept apart per rate limiter priority and dispatched at that
+    priority, so interactive lookups never wait behind a batch opened by a
+    background refresh. A background lookup may still join an interactive
+    request for the same number.
+    """
+
+    def __init__(self, loader: BatchLoader, window: float, max_batch: int):
+        self._loader = loader
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Futures per priority, then per tracking number
+        self._pending: Dict[int, Dict[str, asyncio.Future]] = {}
+        self._inflight: Dict[int, Dict[str, asyncio.Future]] = {}
+        self._flush_handles: Dict[int, asyncio.TimerHandle] = {}
+
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_numbers = 0
+        self.max_batch_size = 0
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures cannot cross event loops; start from a clean slate
+            self._loop = loop
+            self._pending = {}
+            self._inflight = {}
+            self._flush_handles = {}
+        return loop
+
+    def _shared(self, tracking_number: str, priority: int) -> asyncio.Future | None:
+        """A future for ``tracking_number`` at ``priority`` or a more urgent one."""
+        for futures in (self._inflight, self._pending):
+            for level, by_number in futures.items():
+                future = by_number.get(tracking_number)
+                if future is not None and level <= priority:
+                    return future
+        return None
+
+    async def load(self, tracking_number: str) -> TrackingResponse:
+        loop = self._bind_loop()
+        self.requests += 1
+        priority = current_priority()
+
+        future = self._shared(tracking_number, priority)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = loop.create_future()
+            pending = self._pending.setdefault(priority, {})
+            pending[tracking_number] = future
+            if len(pending) >= self.max_batch:
+                self._flush(priority)
+            elif priority not in self._flush_handles:
+                self._flush_handles[priority] = loop.call_later(
+                    self.window, self._flush, priority)
+
+        response = await asyncio.shield(future)
+        # Callers decorate the metadata, so each one gets its own copy
+        return response.model_copy(update={'metadata': dict(response.metadata or {})})
+
+    def _flush(self, priority: int) -> None:
+        handle = self._flush_handles.pop(priority, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(priority, {})
+        if not batch:
+            return
+        self._inflight.setdefault(priority, {}).update(batch)
+        self.batches += 1
+        self.batched_numbers += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        asyncio.get_running_loop().create_task(self._dispatch(batch, priority))
+
+    async def _dispatch(self, batch: Dict[str, asyncio.Future], priority: int) -> None:
+        numbers = list(batch)
+        inflight = self._inflight[priority]
+        try:
+            # The task inherits the context of whoever opened the batch
+            with call_priority(priority):
+                responses = await self._loader(numbers)
+            for number, response in zip(numbers, responses):
+                if not batch[number].done():
+                    batch[number].set_result(response)
+        except Exception as e:
+            logger.error(f"Coalesced tracking batch failed: {str(e)}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for number, future in batch.items():
+                if inflight.get(number) is future:
+                    del inflight[number]
+                if not future.done():
+                    future.set_exception(
+                        RuntimeError(f"No tracking result returned for {number}"))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'avg_batch_size': self.batched_numbers / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            # Caller requests served per upstream call
+            'coalesce_ratio': self.requests / self.batches if self.batches else 0.0,
+            'pending': sum(len(p) for p in self._pending.values()),
+            'inflight': sum(len(p) for p in self._inflight.values()),
+        }
@@ -20,13 +20,18 @@ class TrackingHistoryService:
         note: str | None = None,
         pinned: bool | None = False,
     ) -> TrackedShipmentDB | None:
-        """Persist a search in the user's tracking history."""
+        """Persist a search in the user's tracking history.
+
+        The raw FedEx payload is never stored, even when the response
+        carries one.
+        """
+        meta_data = {k: v for k, v in (meta_data or {}).items() if k != 'raw_response'}
         try:
             record = TrackedShipmentDB(
                 user_id=user_id,
                 tracking_number=tracking_number,
                 status=status,
-                meta_data=meta_data or {},
+                meta_data=meta_data,
                 note=note,
                 pinned=pinned or False,
             )
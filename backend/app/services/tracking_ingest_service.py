@@ -0,0 +1,255 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.database import (
+    DeliveryDetailsDB,
+    LocationDB,
+    PackageDetailsDB,
+    TrackingDB,
+    TrackingEventDB,
+)
+from ..models.tracking import PackageStatus, PackageType, TrackingEvent, TrackingInfo
+from .fedex_service import normalize_package_status
+from .location_service import LocationKey, LocationService, location_key
+from .poll_policy import next_poll_at
+from .tracking_stats_service import TrackingStatsService
+
+logger = logging.getLogger(__name__)
+
+# (timestamp, event_type, location)
+EventKey = Tuple[Optional[datetime], str, LocationKey]
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """Parse a FedEx ISO 8601 timestamp into an aware UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _utc_naive(value: datetime | None) -> datetime | None:
+    # SQLite hands back naive datetimes; compare everything as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _latest_event(info: TrackingInfo | None) -> Tuple[TrackingEvent | None, datetime | None]:
+    latest, latest_at = None, None
+    for event in info.events if info is not None else ():
+        timestamp = parse_timestamp(event.timestamp)
+        if timestamp is not None and (latest_at is None or timestamp > latest_at):
+            latest, latest_at = event, timestamp
+    return latest, latest_at
+
+
+def _is_outdated(record: TrackingDB, latest_at: datetime | None) -> bool:
+    """Whether a payload whose newest scan is ``latest_at`` predates the stored one."""
+    return (latest_at is not None and record.last_event_at is not None
+            and _utc_naive(latest_at) < _utc_naive(record.last_event_at))
+
+
+def _weight(weight: Dict[str, Any] | None) -> float | None:
+    for value in (weight or {}).values():
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class TrackingIngestService:
+    """Persists parsed FedEx tracking data so reads can be served locally.
+
+    The shipment, package and delivery rows are upserted, and only the scan
+    events not stored yet are inserted, in bulk and in the same transaction.
+    Events are identified by tracking id, timestamp, event type and location.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.locations = LocationService(db)
+        self.stats = TrackingStatsService(db)
+
+    def ingest(
+        self,
+        tracking_number: str,
+        info: TrackingInfo | None,
+        meta_data: Dict[str, Any] | None = None,
+    ) -> TrackingDB:
+        """Upsert ``tracking_number`` from ``info`` and commit.
+
+        ``meta_data`` is merged into the stored metadata. A payload older
+        than the stored state, going by its latest scan, only adds the events
+        still missing. The transaction is rolled back and the error re-raised
+        on failure.
+        """
+        try:
+            self.stats.ensure_initialized()
+            latest, latest_at = _latest_event(info)
+            record = self._upsert_tracking(tracking_number, info, latest_at)
+            if meta_data:
+                record.meta_data = {**(record.meta_data or {}), **meta_data}
+                if 'customer_name' in meta_data:
+                    record.customer_name = meta_data['customer_name']
+            if info is not None:
+                self.db.flush()
+                inserted = self._insert_new_events(record, info)
+                # An older payload must not move the stored state backwards
+                if not _is_outdated(record, latest_at):
+                    self._upsert_package_details(record, info)
+                    self._upsert_delivery_details(record, info)
+                    self._update_last_state(record, info, latest, latest_at)
+                record.next_poll_at = next_poll_at(
+                    record.status, record.last_event_at, record.estimated_delivery)
+                logger.info(f"Ingested {inserted} new events for {tracking_number}")
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.db.refresh(record)
+        return record
+
+    def _upsert_tracking(
+        self, tracking_number: str, info: TrackingInfo | None, latest_at: datetime | None
+    ) -> TrackingDB:
+        # Locked until commit: concurrent ingests of one tracking must not both
+        # move the counters away from the same old status
+        record = (
+            self.db.query(TrackingDB)
+            .filter(TrackingDB.tracking_number == tracking_number)
+            .with_for_update()
+            .first()
+        )
+        before = None if record is None else (record.status, record.carrier)
+        if record is None:
+            record = TrackingDB(
+                tracking_number=tracking_number,
+                carrier="FedEx",
+                status=PackageStatus.UNKNOWN,
+                package_type=PackageType.UNKNOWN,
+                meta_data={},
+            )
+            self.db.add(record)
+        if info is not None and not _is_outdated(record, latest_at):
+            record.carrier = info.carrier or record.carrier
+            record.status = normalize_package_status(info.status)
+            try:
+                record.package_type = PackageType(info.service_type)
+            except ValueError:
+                record.package_type = PackageType.UNKNOWN
+        self.stats.record_transition(before, (record.status, record.carrier))
+        return record
+
+    def _upsert_package_details(self, record: TrackingDB, info: TrackingInfo) -> None:
+        details = info.package_details
+        row = record.package_details
+        if row is None:
+            row = PackageDetailsDB(id=str(uuid.uuid4()), tracking_id=record.id)
+            self.db.add(row)
+            record.package_details = row
+        row.weight = _weight(details.weight)
+        row.dimensions = details.dimensions or {}
+        row.service_type = details.service_type
+
+    def _upsert_delivery_details(self, record: TrackingDB, info: TrackingInfo) -> None:
+        details = info.delivery_details
+        location_id = None
+        if details.delivery_location is not None and any(location_key(details.delivery_location)):
+            location_id = self.locations.get_or_create(details.delivery_location)
+        row = record.delivery_details
+        if row is None:
+            row = DeliveryDetailsDB(id=str(uuid.uuid4()), tracking_id=record.id)
+            self.db.add(row)
+            record.delivery_details = row
+        row.estimated_delivery = parse_timestamp(details.estimated_delivery)
+        row.actual_delivery = parse_timestamp(details.actual_delivery)
+        row.delivery_location_id = location_id
+
+    def _update_last_state(
+        self,
+        record: TrackingDB,
+        info: TrackingInfo,
+        latest: TrackingEvent | None,
+        latest_at: datetime | None,
+    ) -> None:
+        """Copy the latest event and the delivery estimate onto the tracking row."""
+        if latest is not None:
+            city, state, country, postal_code = location_key(latest.location)
+            record.last_event_at = latest_at
+            record.last_city = city or None
+            record.last_state = state or None
+            record.last_country = country or None
+            record.last_postal_code = postal_code or None
+        record.estimated_delivery = parse_timestamp(info.delivery_details.estimated_delivery)
+
+    def _stored_event_keys(self, tracking_id: str) -> set[EventKey]:
+        rows = (
+            self.db.query(
+                TrackingEventDB.timestamp,
+                TrackingEventDB.event_type,
+                LocationDB.city,
+                LocationDB.state,
+                LocationDB.country,
+                LocationDB.postal_code,
+            )
+            .outerjoin(LocationDB, TrackingEventDB.location_id == LocationDB.id)
+            .filter(TrackingEventDB.tracking_id == tracking_id)
+        )
+        return {
+            (_utc_naive(timestamp), event_type or '',
+             (city or '', state or '', country or '', postal_code or ''))
+            for timestamp, event_type, city, state, country, postal_code in rows
+        }
+
+    def _insert(self):
+        """INSERT that skips rows clashing with the natural key, where supported."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return postgresql.insert(TrackingEventDB).on_conflict_do_nothing()
+        if dialect == 'sqlite':
+            return sqlite.insert(TrackingEventDB).on_conflict_do_nothing()
+        return insert(TrackingEventDB)
+
+    def _insert_new_events(self, record: TrackingDB, info: TrackingInfo) -> int:
+        stored = self._stored_event_keys(record.id)
+        new_events = []
+        for event in info.events:
+            timestamp = parse_timestamp(event.timestamp)
+            event_type = event.event_type or event.status or ''
+            key = (_utc_naive(timestamp), event_type, location_key(event.location))
+            if key in stored:
+                continue
+            stored.add(key)
+            new_events.append((event, timestamp, event_type))
+        if not new_events:
+            return 0
+
+        location_ids = self.locations.get_or_create_many(
+            event.location for event, _, _ in new_events)
+        rows = [
+            {
+                'id': str(uuid.uuid4()),
+                'tracking_id': record.id,
+                'status': event.status,
+                'description': event.description,
+                'event_type': event_type,
+                'timestamp': timestamp,
+                'location_id': location_ids[location_key(event.location)],
+            }
+            for event, timestamp, event_type in new_events
+        ]
+        self.db.execute(self._insert(), rows)
+        return len(rows)
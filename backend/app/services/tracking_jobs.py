@@ -0,0 +1,296 @@
+import asyncio
+import json
+import logging
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List
+
+import redis.asyncio as aioredis
+
+from ..config import settings
+from ..models.tracking import TrackingResponse
+from .fedex_service import get_fedex_service
+from .rate_limiter import background_priority
+from .tracking_service import INVALID_NUMBER_ERROR, error_response, is_valid_tracking_number
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Ids of jobs that still have chunks to process, oldest first
+_QUEUE_KEY = "trackjob:queue"
+
+# Moves the next chunk to processing and leases it in one step, so that no
+# other worker sees it in processing without a lease and re-queues it. The
+# lease key shares the job's hash tag, hence its cluster slot.
+_CLAIM_LUA = """
+local chunk = redis.call('LMOVE', KEYS[1], KEYS[2], 'LEFT', 'RIGHT')
+if not chunk then
+    return false
+end
+redis.call('SET', ARGV[1] .. chunk, ARGV[2], 'EX', ARGV[3])
+redis.call('HSET', KEYS[3], 'status', ARGV[4])
+return chunk
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class TrackingJobStore:
+    """Bulk tracking jobs kept in Redis so any worker can pick them up.
+
+    A job's numbers are split into chunks of ``FEDEX_TRACK_BATCH_SIZE``.
+    Chunk indexes wait in a ``pending`` list; a worker moves one to the
+    ``processing`` list and takes a lease on it in one script, and holds the
+    lease while it calls FedEx. Chunks
+    whose lease expired (the worker died) are put back in ``pending``, so a
+    job survives restarts. Results are stored zlib-compressed per chunk, and
+    every key of a job expires ``TRACKING_JOB_TTL`` seconds after its last
+    update.
+    """
+
+    def __init__(self, client: Any | None = None):
+        self.client = client or aioredis.from_url(settings.REDIS_URL)
+        self._claim = self.client.register_script(_CLAIM_LUA)
+
+    @staticmethod
+    def key(job_id: str, part: str) -> str:
+        # The hash tag keeps every key of a job in the same cluster slot
+        return f"trackjob:{{{job_id}}}:{part}"
+
+    def _keys(self, job_id: str) -> List[str]:
+        return [self.key(job_id, part)
+                for part in ("meta", "chunks", "pending", "processing", "results")]
+
+    async def create(self, tracking_numbers: List[str], account: str | None = None) -> Dict[str, Any]:
+        """Store a new job and queue all of its chunks."""
+        numbers = list(dict.fromkeys(n.strip() for n in tracking_numbers if n and n.strip()))
+        if not numbers:
+            raise ValueError("No tracking numbers given")
+        if len(numbers) > settings.TRACKING_JOB_MAX_ITEMS:
+            raise ValueError(
+                f"At most {settings.TRACKING_JOB_MAX_ITEMS} tracking numbers per job")
+
+        job_id = uuid.uuid4().hex
+        size = max(1, settings.FEDEX_TRACK_BATCH_SIZE)
+        chunks = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+        now = datetime.now().isoformat()
+        meta = {
+            "status": QUEUED,
+            "account": account or "",
+            "total": len(numbers),
+            "chunk_size": size,
+            "chunks": len(chunks),
+            "done": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.key(job_id, "meta"), mapping=meta)
+            pipe.rpush(self.key(job_id, "chunks"), *(zlib.compress(_dumps(c)) for c in chunks))
+            pipe.rpush(self.key(job_id, "pending"), *range(len(chunks)))
+            for key in self._keys(job_id):
+                pipe.expire(key, settings.TRACKING_JOB_TTL)
+            pipe.rpush(_QUEUE_KEY, job_id)
+            await pipe.execute()
+        return dict(meta, id=job_id)
+
+    async def get(self, job_id: str) -> Dict[str, Any] | None:
+        raw = await self.client.hgetall(self.key(job_id, "meta"))
+        if not raw:
+            return None
+        meta: Dict[str, Any] = {_text(k): _text(v) for k, v in raw.items()}
+        for field in ("total", "chunk_size", "chunks", "done", "succeeded", "failed"):
+            meta[field] = int(meta[field])
+        meta["account"] = meta["account"] or None
+        meta["progress"] = meta["done"] / meta["total"] if meta["total"] else 1.0
+        meta["id"] = job_id
+        return meta
+
+    async def results(self, job_id: str, meta: Dict[str, Any],
+                      offset: int = 0, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Return the available results in ``[offset, offset + limit)`` with their index."""
+        size = meta["chunk_size"]
+        end = meta["total"] if limit is None else min(meta["total"], offset + limit)
+        if offset >= end:
+            return []
+        indexes = list(range(offset // size, (end - 1) // size + 1))
+        blobs = await self.client.hmget(self.key(job_id, "results"), indexes)
+        items = []
+        for chunk_index, blob in zip(indexes, blobs):
+            if blob is None:
+                continue
+            for position, result in enumerate(_loads(zlib.decompress(blob))):
+                index = chunk_index * size + position
+                if offset <= index < end:
+                    items.append({"index": index, "result": result})
+        return items
+
+    async def claim(self, job_id: str, worker: str) -> tuple[int, List[str]] | None:
+        """Take the next chunk of ``job_id``, reclaiming abandoned ones first."""
+        await self._requeue_expired(job_id)
+        chunk = await self._claim(
+            keys=[self.key(job_id, "pending"), self.key(job_id, "processing"),
+                  self.key(job_id, "meta")],
+            args=[self.key(job_id, "lease:"), worker, settings.TRACKING_JOB_LEASE_SECONDS, RUNNING])
+        if chunk is None:
+            return None
+        index = int(chunk)
+        blob = await self.client.lindex(self.key(job_id, "chunks"), index)
+        return index, _loads(zlib.decompress(blob))
+
+    async def _requeue_expired(self, job_id: str) -> None:
+        for chunk in await self.client.lrange(self.key(job_id, "processing"), 0, -1):
+            index = int(chunk)
+            if await self.client.exists(self.key(job_id, f"lease:{index}")):
+                continue
+            # Only the worker that removes it from processing re-queues it
+            if await self.client.lrem(self.key(job_id, "processing"), 1, chunk):
+                logger.warning(f"Re-queueing abandoned chunk {index} of tracking job {job_id}")
+                await self.client.rpush(self.key(job_id, "pending"), index)
+
+    async def complete(self, job_id: str, index: int, responses: List[TrackingResponse]) -> None:
+        """Store the results of a chunk and update the job's progress."""
+        blob = zlib.compress(_dumps([
+            r.model_dump(mode="json", exclude_none=True) for r in responses]))
+        # A chunk re-processed after its lease expired must not be counted twice
+        first = await self.client.hsetnx(self.key(job_id, "results"), index, blob)
+        succeeded = sum(1 for r in responses if r.success)
+        async with self.client.pipeline(transaction=True) as pipe:
+            if first:
+                pipe.hincrby(self.key(job_id, "meta"), "done", len(responses))
+                pipe.hincrby(self.key(job_id, "meta"), "succeeded", succeeded)
+                pipe.hincrby(self.key(job_id, "meta"), "failed", len(responses) - succeeded)
+            pipe.hset(self.key(job_id, "meta"), "updated_at", datetime.now().isoformat())
+            pipe.lrem(self.key(job_id, "processing"), 1, index)
+            pipe.delete(self.key(job_id, f"lease:{index}"))
+            for key in self._keys(job_id):
+                pipe.expire(key, settings.TRACKING_JOB_TTL)
+            await pipe.execute()
+
+    async def release(self, job_id: str, index: int) -> None:
+        """Give a chunk back after a failure so another attempt can process it."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.key(job_id, "processing"), 1, index)
+            pipe.delete(self.key(job_id, f"lease:{index}"))
+            pipe.rpush(self.key(job_id, "pending"), index)
+            await pipe.execute()
+
+    async def finish_if_done(self, job_id: str) -> bool:
+        """Mark the job completed and dequeue it once no chunk is left."""
+        meta_key = self.key(job_id, "meta")
+        if not await self.client.exists(meta_key):
+            # Expired job: just forget about it
+            await self.client.lrem(_QUEUE_KEY, 0, job_id)
+            return True
+        if (await self.client.llen(self.key(job_id, "pending"))
+                or await self.client.llen(self.key(job_id, "processing"))):
+            return False
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(meta_key, mapping={
+                "status": COMPLETED, "completed_at": datetime.now().isoformat()})
+            pipe.lrem(_QUEUE_KEY, 0, job_id)
+            await pipe.execute()
+        return True
+
+    async def queued_jobs(self) -> List[str]:
+        return [_text(job_id) for job_id in await self.client.lrange(_QUEUE_KEY, 0, -1)]
+
+
+async def process_chunk(numbers: List[str], account: str | None) -> List[TrackingResponse]:
+    """Track one chunk as a multi-number FedEx call at background priority."""
+    valid = [n for n in numbers if is_valid_tracking_number(n)]
+    tracked: Dict[str, TrackingResponse] = {}
+    if valid:
+        with background_priority():
+            responses = await get_fedex_service(account).track_packages(valid)
+        tracked = dict(zip(valid, responses))
+    return [tracked.get(n) or error_response(n, INVALID_NUMBER_ERROR) for n in numbers]
+
+
+async def run_once(store: TrackingJobStore, worker: str) -> bool:
+    """Process one chunk of the oldest job with work left; False when idle."""
+    for job_id in await store.queued_jobs():
+        claimed = await store.claim(job_id, worker)
+        if claimed is None:
+            await store.finish_if_done(job_id)
+            continue
+        index, numbers = claimed
+        meta = await store.get(job_id)
+        try:
+            responses = await process_chunk(numbers, meta["account"] if meta else None)
+        except Exception as e:
+            logger.error(f"Tracking job {job_id} chunk {index} failed: {e}")
+            await store.release(job_id, index)
+            raise
+        await store.complete(job_id, index, responses)
+        return True
+    return False
+
+
+async def _work(store: TrackingJobStore, worker: str) -> None:
+    while True:
+        try:
+            busy = await run_once(store, worker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Tracking job worker {worker} error: {e}")
+            busy = False
+        if not busy:
+            await asyncio.sleep(settings.TRACKING_JOB_POLL_SECONDS)
+
+
+_store: TrackingJobStore | None = None
+_workers: List[asyncio.Task] = []
+
+
+def get_job_store() -> TrackingJobStore:
+    """Return the process-wide tracking job store."""
+    global _store
+    if _store is None:
+        _store = TrackingJobStore()
+    return _store
+
+
+async def start_job_workers() -> None:
+    if _workers:
+        return
+    prefix = uuid.uuid4().hex[:8]
+    for n in range(settings.TRACKING_JOB_WORKERS):
+        _workers.append(asyncio.create_task(_work(get_job_store(), f"{prefix}-{n}")))
+
+
+async def stop_job_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    for task in _workers:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _workers.clear()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.database import TrackingDB
+from ..models.tracking import PackageStatus
+from .fedex_service import get_fedex_service
+from .rate_limiter import background_priority
+from .tracking_cache import get_tracking_cache
+from .tracking_ingest_service import TrackingIngestService
+
+logger = logging.getLogger(__name__)
+
+_stats: Dict[str, Any] = {
+    "runs": 0,
+    "polled": 0,
+    "updated": 0,
+    "failed": 0,
+    "last_due": 0,
+    "last_run_at": None,
+}
+
+
+def due_trackings(db: Session, now: datetime, limit: int) -> List[TrackingDB]:
+    """Undelivered trackings whose poll is due, most urgent first.
+
+    Trackings never polled come first, then the most overdue ones; among
+    equally overdue trackings the closest ETA wins.
+    """
+    return (
+        db.query(TrackingDB)
+        .filter(
+            TrackingDB.status != PackageStatus.DELIVERED,
+            (TrackingDB.next_poll_at.is_(None)) | (TrackingDB.next_poll_at <= now),
+        )
+        .order_by(
+            TrackingDB.next_poll_at.isnot(None),
+            TrackingDB.next_poll_at,
+            TrackingDB.estimated_delivery.is_(None),
+            TrackingDB.estimated_delivery,
+        )
+        .limit(limit)
+        .all()
+    )
+
+
+def _due_numbers(db: Session, now: datetime, limit: int) -> List[str]:
+    return [t.tracking_number for t in due_trackings(db, now, limit)]
+
+
+def _postpone(db: Session, numbers: List[str], now: datetime) -> None:
+    retry_at = now + timedelta(seconds=settings.TRACKING_POLL_RETRY)
+    db.query(TrackingDB).filter(TrackingDB.tracking_number.in_(numbers)).update(
+        {TrackingDB.next_poll_at: retry_at}, synchronize_session=False)
+    db.commit()
+
+
+def _store_chunk(db: Session, numbers: List[str], responses: List[Any], now: datetime) -> List[str]:
+    """Ingest the answered numbers and postpone the others; return those stored."""
+    stored, failed = [], []
+    ingest = TrackingIngestService(db)
+    for tracking_number, response in zip(numbers, responses):
+        if not response.success or response.data is None:
+            failed.append(tracking_number)
+            continue
+        try:
+            ingest.ingest(tracking_number, response.data)
+        except Exception as e:
+            logger.error(f"Could not store polled tracking {tracking_number}: {e}")
+            failed.append(tracking_number)
+            continue
+        stored.append(tracking_number)
+    if failed:
+        _postpone(db, failed, now)
+    return stored
+
+
+async def _in_thread(session_factory: Callable[[], Session], func: Callable[..., Any], *args: Any) -> Any:
+    """Run ``func(db, *args)`` in a worker thread with a session of its own."""
+    def run() -> Any:
+        db = session_factory()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    return await asyncio.to_thread(run)
+
+
+async def _poll_chunk(session_factory: Callable[[], Session], numbers: List[str], now: datetime) -> None:
+    with background_priority():
+        responses = await get_fedex_service().track_packages(numbers)
+    stored = await _in_thread(session_factory, _store_chunk, numbers, responses, now)
+    _stats["updated"] += len(stored)
+    _stats["failed"] += len(numbers) - len(stored)
+    for tracking_number in stored:
+        await get_tracking_cache().invalidate(tracking_number)
+
+
+async def poll_due_trackings(
+    session_factory: Callable[[], Session] | None = None,
+    *,
+    budget: int | None = None,
+    now: datetime | None = None,
+) -> int:
+    """Refresh due trackings from FedEx; return how many were polled.
+
+    At most ``TRACKING_POLL_BUDGET`` numbers are sent per run, as
+    multi-number calls of ``FEDEX_TRACK_BATCH_SIZE`` at background priority,
+    so interactive lookups keep precedence at the rate limiter. Ingestion
+    schedules the next poll of every tracking it stores; numbers FedEx did
+    not answer are retried after ``TRACKING_POLL_RETRY`` seconds. When a
+    call fails outright the rest of the run is skipped.
+
+    The job runs on the event loop, so every database step runs in a worker
+    thread with its own session from ``session_factory`` and only the FedEx
+    calls stay on the loop.
+    """
+    session_factory = session_factory or SessionLocal
+    now = now or datetime.now(timezone.utc)
+    budget = settings.TRACKING_POLL_BUDGET if budget is None else budget
+    polled = 0
+    numbers = await _in_thread(session_factory, _due_numbers, now, budget)
+    _stats["runs"] += 1
+    _stats["last_due"] = len(numbers)
+    _stats["last_run_at"] = now.isoformat()
+    size = max(1, settings.FEDEX_TRACK_BATCH_SIZE)
+    for i in range(0, len(numbers), size):
+        chunk = numbers[i:i + size]
+        try:
+            await _poll_chunk(session_factory, chunk, now)
+        except Exception as e:
+            logger.warning(f"Tracking poll stopped after {polled} numbers: {e}")
+            _stats["failed"] += len(chunk)
+            await _in_thread(session_factory, _postpone, chunk, now)
+            break
+        polled += len(chunk)
+    _stats["polled"] += polled
+    if numbers:
+        logger.info(f"Polled {polled} of {len(numbers)} due trackings")
+    return polled
+
+
+def tracking_poller_stats() -> Dict[str, Any]:
+    return dict(_stats)
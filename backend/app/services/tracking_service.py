@@ -1,34 +1,98 @@
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
-from .fedex_service import FedExService
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+from ..config import settings
+from .fedex_service import get_fedex_service
+from .tracking_cache import get_tracking_cache
+from .tracking_ingest_service import TrackingIngestService
+from .tracking_stats_service import TrackingStatsService
+from .search import SearchPage, count_rows, keyset_page, substring_filter
 from ..models.tracking import (
     TrackingInfo,
     TrackingResponse,
     TrackingFilter,
     PackageStatus,
-    PackageType,
 )
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc, and_
-from ..models.database import TrackingDB, TrackingEventDB
+from sqlalchemy.orm import Session, joinedload, selectinload
+from ..models.database import (
+    DeliveryDetailsDB,
+    LocationDB,
+    TrackingDB,
+    TrackingEventDB,
+)
 
 logger = logging.getLogger(__name__)
 
+# Columns a tracking search may be sorted on
+SORTABLE_COLUMNS = ('created_at', 'updated_at', 'tracking_number', 'status', 'carrier')
+
+# Everything _convert_db_to_tracking_info reads, loaded with the page: the
+# one-to-one details in the same query, events and their locations in one more
+TRACKING_LOAD_OPTIONS = (
+    joinedload(TrackingDB.package_details),
+    joinedload(TrackingDB.delivery_details).joinedload(DeliveryDetailsDB.delivery_location),
+    selectinload(TrackingDB.events).joinedload(TrackingEventDB.location),
+)
+
+_TRACKING_URL = "https://www.fedex.com/tracking?tracknumbers="
+
+_NO_LOCATION = {'city': '', 'state': '', 'country': '', 'postal_code': ''}
+
+INVALID_NUMBER_ERROR = "Invalid tracking number format. FedEx tracking numbers must be 12 digits."
+
+
+def is_valid_tracking_number(tracking_number: str) -> bool:
+    # FedEx tracking numbers are typically 12 digits
+    return bool(tracking_number) and tracking_number.isdigit() and len(tracking_number) == 12
+
+
+def error_response(tracking_number: str, error: str) -> TrackingResponse:
+    return TrackingResponse(
+        success=False,
+        data=None,
+        error=error,
+        metadata={
+            'timestamp': datetime.now().isoformat(),
+            'tracking_number': tracking_number
+        }
+    )
+
+
+def _location(location: LocationDB | None) -> Dict[str, Any]:
+    if location is None:
+        return _NO_LOCATION
+    coordinates = None
+    if location.latitude is not None and location.longitude is not None:
+        coordinates = {'latitude': location.latitude, 'longitude': location.longitude}
+    return {
+        'city': location.city or '',
+        'state': location.state or '',
+        'country': location.country or '',
+        'postal_code': location.postal_code or '',
+        'coordinates': coordinates,
+    }
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # Stored as UTC; SQLite drops the offset
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
 
 class TrackingService:
     def __init__(self, db: Session, account: str | None = None):
         self.db = db
-        self.fedex_service = FedExService(account)
+        self.fedex_service = get_fedex_service(account)
 
     def _validate_tracking_number(self, tracking_number: str) -> bool:
         """
         Validate tracking number format
         """
-        # FedEx tracking numbers are typically 12 digits
-        if not tracking_number or not tracking_number.isdigit() or len(tracking_number) != 12:
-            return False
-        return True
+        return is_valid_tracking_number(tracking_number)
 
     async def track_single_package(
         self,
@@ -45,7 +109,7 @@ class TrackingService:
                 return TrackingResponse(
                     success=False,
                     data=None,
-                    error="Invalid tracking number format. FedEx tracking numbers must be 12 digits.",
+                    error=INVALID_NUMBER_ERROR,
                     metadata={
                         'timestamp': datetime.now().isoformat(),
                         'tracking_number': tracking_number
@@ -80,14 +144,72 @@ class TrackingService:
 
     async def track_multiple_packages(self, tracking_numbers: List[str]) -> List[TrackingResponse]:
         """
-        Track multiple packages using FedEx API (simplified)
+        Track multiple packages, returning one response per number in input order
         """
-        responses = []
-        for tracking_number in tracking_numbers:
-            response = await self.track_single_package(tracking_number)
-            responses.append(response)
+        responses: List[TrackingResponse | None] = [None] * len(tracking_numbers)
+        async for index, response in self.iter_multiple_packages(tracking_numbers):
+            responses[index] = response
         return responses
 
+    async def iter_multiple_packages(
+        self, tracking_numbers: List[str]
+    ) -> AsyncIterator[Tuple[int, TrackingResponse]]:
+        """
+        Yield ``(index, response)`` pairs as soon as each result is available.
+
+        Duplicate numbers are tracked once. Valid numbers are split into
+        chunks of ``TRACKING_BATCH_CHUNK_SIZE`` (by default
+        ``FEDEX_TRACK_BATCH_SIZE``) sent as multi-number FedEx calls, at most
+        ``TRACKING_BATCH_CONCURRENCY`` at a time, and every chunk must answer
+        within ``TRACKING_BATCH_ITEM_TIMEOUT`` seconds.
+        """
+        if len(tracking_numbers) > settings.TRACKING_BATCH_MAX_ITEMS:
+            raise ValueError(
+                f"At most {settings.TRACKING_BATCH_MAX_ITEMS} tracking numbers per batch")
+
+        positions: Dict[str, List[int]] = {}
+        for index, tracking_number in enumerate(tracking_numbers):
+            if self._validate_tracking_number(tracking_number):
+                positions.setdefault(tracking_number, []).append(index)
+            else:
+                yield index, error_response(tracking_number, INVALID_NUMBER_ERROR)
+
+        unique = list(positions)
+        size = max(1, settings.TRACKING_BATCH_CHUNK_SIZE or settings.FEDEX_TRACK_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max(1, settings.TRACKING_BATCH_CONCURRENCY))
+        tasks = [
+            asyncio.ensure_future(self._track_chunk(unique[i:i + size], semaphore))
+            for i in range(0, len(unique), size)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for tracking_number, response in await next_done:
+                    for index in positions[tracking_number]:
+                        yield index, response
+        finally:
+            # The consumer may stop early, e.g. when a streaming client disconnects
+            for task in tasks:
+                task.cancel()
+
+    async def _track_chunk(
+        self, chunk: List[str], semaphore: asyncio.Semaphore
+    ) -> List[Tuple[str, TrackingResponse]]:
+        async with semaphore:
+            try:
+                responses = await asyncio.wait_for(
+                    self.fedex_service.track_packages(chunk),
+                    timeout=settings.TRACKING_BATCH_ITEM_TIMEOUT)
+            except asyncio.TimeoutError:
+                error_msg = (f"Timed out after {settings.TRACKING_BATCH_ITEM_TIMEOUT}s "
+                             f"waiting for FedEx")
+                logger.error(f"{error_msg} ({', '.join(chunk)})")
+                responses = [error_response(n, error_msg) for n in chunk]
+            except Exception as e:
+                error_msg = f"Unexpected error tracking packages: {str(e)}"
+                logger.error(error_msg)
+                responses = [error_response(n, error_msg) for n in chunk]
+        return list(zip(chunk, responses))
+
     async def update_tracking(
         self,
         tracking_id: str,
@@ -104,7 +226,7 @@ class TrackingService:
                 return TrackingResponse(
                     success=False,
                     data=None,
-                    error="Invalid tracking number format. FedEx tracking numbers must be 12 digits.",
+                    error=INVALID_NUMBER_ERROR,
                     metadata={
                         'timestamp': datetime.now().isoformat(),
                         'tracking_number': tracking_id,
@@ -116,59 +238,20 @@ class TrackingService:
             if not tracking_resp.success:
                 return tracking_resp
 
-            info = tracking_resp.data
+            meta = {}
+            if customer_name is not None:
+                meta['customer_name'] = customer_name
+            if note is not None:
+                meta['note'] = note
 
             try:
-                record = (
-                    self.db.query(TrackingDB)
-                    .filter(TrackingDB.tracking_number == tracking_id)
-                    .first()
-                )
-                if not record:
-                    status = PackageStatus.UNKNOWN
-                    ptype = PackageType.UNKNOWN
-                    if info:
-                        try:
-                            status = PackageStatus(info.status)
-                        except ValueError:
-                            status = PackageStatus.UNKNOWN
-                        try:
-                            ptype = PackageType(info.service_type)
-                        except ValueError:
-                            ptype = PackageType.UNKNOWN
-                    record = TrackingDB(
-                        tracking_number=tracking_id,
-                        carrier="FedEx",
-                        status=status,
-                        package_type=ptype,
-                        meta_data={},
-                    )
-                    self.db.add(record)
-                else:
-                    if info:
-                        try:
-                            record.status = PackageStatus(info.status)
-                        except ValueError:
-                            record.status = PackageStatus.UNKNOWN
-                        try:
-                            record.package_type = PackageType(
-                                info.service_type)
-                        except ValueError:
-                            record.package_type = PackageType.UNKNOWN
-
-                meta = record.meta_data or {}
-                if customer_name is not None:
-                    meta['customer_name'] = customer_name
-                if note is not None:
-                    meta['note'] = note
-                record.meta_data = meta
-
-                self.db.commit()
-                self.db.refresh(record)
+                TrackingIngestService(self.db).ingest(
+                    tracking_id, tracking_resp.data, meta_data=meta)
             except Exception as db_exc:
-                self.db.rollback()
                 logger.error(
                     f"Database error while updating tracking {tracking_id}: {db_exc}")
+            else:
+                await get_tracking_cache().invalidate(tracking_id)
 
             return tracking_resp
 
@@ -185,9 +268,11 @@ class TrackingService:
                 },
             )
 
-    def search_trackings(self, filters: TrackingFilter) -> Tuple[List[TrackingInfo], int]:
+    def search_trackings(self, filters: TrackingFilter) -> SearchPage:
         """
         Search and filter tracking records
+
+        Raises ``ValueError`` for an invalid cursor.
         """
         try:
             # Build base query
@@ -195,8 +280,8 @@ class TrackingService:
 
             # Apply filters
             if filters.tracking_number:
-                query = query.filter(TrackingDB.tracking_number.ilike(
-                    f"%{filters.tracking_number}%"))
+                query = query.filter(substring_filter(
+                    self.db, TrackingDB, 'tracking_number', filters.tracking_number))
 
             if filters.status:
                 query = query.filter(TrackingDB.status == filters.status)
@@ -205,8 +290,8 @@ class TrackingService:
                 query = query.filter(TrackingDB.carrier == filters.carrier)
 
             if filters.customer_name:
-                query = query.filter(TrackingDB.meta_data['customer_name'].astext.ilike(
-                    f"%{filters.customer_name}%"))
+                query = query.filter(substring_filter(
+                    self.db, TrackingDB, 'customer_name', filters.customer_name))
 
             if filters.start_date:
                 query = query.filter(
@@ -215,23 +300,25 @@ class TrackingService:
             if filters.end_date:
                 query = query.filter(TrackingDB.created_at <= filters.end_date)
 
+            if filters.estimated_delivery_start:
+                query = query.filter(
+                    TrackingDB.estimated_delivery >= filters.estimated_delivery_start)
+
+            if filters.estimated_delivery_end:
+                query = query.filter(
+                    TrackingDB.estimated_delivery <= filters.estimated_delivery_end)
+
+            # Matches the last known location of the shipment
             if filters.location:
-                location_filters = []
                 if filters.location.city:
-                    location_filters.append(
-                        TrackingEventDB.location.has(city=filters.location.city))
+                    query = query.filter(TrackingDB.last_city == filters.location.city)
                 if filters.location.state:
-                    location_filters.append(
-                        TrackingEventDB.location.has(state=filters.location.state))
+                    query = query.filter(TrackingDB.last_state == filters.location.state)
                 if filters.location.country:
-                    location_filters.append(TrackingEventDB.location.has(
-                        country=filters.location.country))
+                    query = query.filter(TrackingDB.last_country == filters.location.country)
                 if filters.location.postal_code:
-                    location_filters.append(TrackingEventDB.location.has(
-                        postal_code=filters.location.postal_code))
-                if location_filters:
                     query = query.filter(
-                        TrackingDB.events.any(and_(*location_filters)))
+                        TrackingDB.last_postal_code == filters.location.postal_code)
 
             if filters.service_type:
                 query = query.filter(TrackingDB.package_details.has(
@@ -243,70 +330,79 @@ class TrackingService:
                 else:
                     query = query.filter(TrackingDB.status != "DELIVERED")
 
-            # Get total count before pagination
-            total_count = query.count()
-
-            # Apply sorting
-            if filters.sort_by:
-                sort_column = getattr(TrackingDB, filters.sort_by, None)
-                if sort_column is not None:
-                    if filters.sort_order == "desc":
-                        query = query.order_by(desc(sort_column))
-                    else:
-                        query = query.order_by(asc(sort_column))
-
-            # Apply pagination
-            query = query.offset((filters.page - 1) *
-                                 filters.page_size).limit(filters.page_size)
+            total_count, estimated = count_rows(self.db, query, filters.count)
 
-            # Execute query and convert results
-            results = []
-            for db_tracking in query.all():
-                results.append(self._convert_db_to_tracking_info(db_tracking))
+            sort_by = filters.sort_by if filters.sort_by in SORTABLE_COLUMNS else 'created_at'
+            rows, next_cursor = keyset_page(
+                query.options(*TRACKING_LOAD_OPTIONS), TrackingDB, sort_by,
+                filters.sort_order != "asc", filters.page_size,
+                cursor=filters.cursor, page=filters.page)
 
-            return results, total_count
+            results = [self._convert_db_to_tracking_info(db_tracking) for db_tracking in rows]
+            return SearchPage(results, total_count, next_cursor, estimated)
 
         except Exception as e:
             logger.error(f"Error searching trackings: {str(e)}")
             raise
 
+    def _convert_db_to_tracking_info(self, db_tracking: TrackingDB) -> TrackingInfo:
+        """
+        Map a stored tracking to a TrackingInfo
+
+        Relationships are expected to be loaded with TRACKING_LOAD_OPTIONS;
+        the nested dicts are validated in a single model_validate call.
+        """
+        package = db_tracking.package_details
+        delivery = db_tracking.delivery_details
+        events = sorted(
+            db_tracking.events,
+            key=lambda e: (e.timestamp is not None, e.timestamp or datetime.min),
+            reverse=True,
+        )
+        actual_delivery = _isoformat(delivery.actual_delivery) if delivery else None
+        status = db_tracking.status.value if db_tracking.status else PackageStatus.UNKNOWN.value
+        package_type = db_tracking.package_type.value if db_tracking.package_type else None
+        return TrackingInfo.model_validate({
+            'tracking_number': db_tracking.tracking_number,
+            'status': status,
+            'carrier': db_tracking.carrier,
+            'service_type': package_type or 'UNKNOWN',
+            # Origin and destination are not stored
+            'origin': _NO_LOCATION,
+            'destination': _NO_LOCATION,
+            'package_details': {
+                'weight': {'value': package.weight} if package and package.weight is not None else None,
+                'dimensions': package.dimensions if package else None,
+                'service_type': package.service_type if package else None,
+            },
+            'delivery_details': {
+                'actual_delivery': actual_delivery,
+                'delivery_date': actual_delivery,
+                'estimated_delivery': _isoformat(delivery.estimated_delivery) if delivery else None,
+                'delivery_location':
+                    _location(delivery.delivery_location) if delivery and delivery.delivery_location else None,
+            },
+            'events': [
+                {
+                    'status': event.status or '',
+                    'description': event.description or '',
+                    'timestamp': _isoformat(event.timestamp),
+                    'location': _location(event.location),
+                    'event_type': event.event_type,
+                }
+                for event in events
+            ],
+            'key_dates': {'actual_delivery': actual_delivery},
+            'commercial_info': {},
+            'tracking_url': _TRACKING_URL + db_tracking.tracking_number,
+        })
+
     def get_tracking_stats(self) -> Dict[str, Any]:
         """
         Get tracking statistics
         """
         try:
-            total_trackings = self.db.query(TrackingDB).count()
-            delivered_trackings = self.db.query(TrackingDB).filter(
-                TrackingDB.status == "DELIVERED").count()
-            in_transit_trackings = self.db.query(TrackingDB).filter(
-                TrackingDB.status == "IN_TRANSIT").count()
-            exception_trackings = self.db.query(TrackingDB).filter(
-                TrackingDB.status == "EXCEPTION").count()
-
-            # Get status distribution
-            status_counts = {}
-            for status in self.db.query(TrackingDB.status).distinct():
-                count = self.db.query(TrackingDB).filter(
-                    TrackingDB.status == status[0]).count()
-                status_counts[status[0]] = count
-
-            # Get carrier distribution
-            carrier_counts = {}
-            for carrier in self.db.query(TrackingDB.carrier).distinct():
-                count = self.db.query(TrackingDB).filter(
-                    TrackingDB.carrier == carrier[0]).count()
-                carrier_counts[carrier[0]] = count
-
-            return {
-                "total_trackings": total_trackings,
-                "delivered_trackings": delivered_trackings,
-                "in_transit_trackings": in_transit_trackings,
-                "exception_trackings": exception_trackings,
-                "status_distribution": status_counts,
-                "carrier_distribution": carrier_counts,
-                "delivery_rate": (delivered_trackings / total_trackings * 100) if total_trackings > 0 else 0
-            }
-
+            return TrackingStatsService(self.db).summary()
         except Exception as e:
             logger.error(f"Error getting tracking stats: {str(e)}")
             raise
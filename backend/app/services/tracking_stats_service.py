@@ -0,0 +1,119 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.database import TrackingDB, TrackingStatsDB
+from ..models.tracking import PackageStatus
+
+logger = logging.getLogger(__name__)
+
+# (status, carrier)
+StatsKey = Tuple[str, str]
+
+
+def _status(value: PackageStatus | str | None) -> str:
+    if isinstance(value, PackageStatus):
+        return value.value
+    return value or PackageStatus.UNKNOWN.value
+
+
+class TrackingStatsService:
+    """Tracking counts per (status, carrier), maintained incrementally.
+
+    Ingestion calls :meth:`record_transition` within the ingest transaction,
+    holding the tracking row locked, whenever a tracking is created or changes
+    status, so the dashboard reads a handful of counter rows instead of
+    scanning ``trackings``. The counters are rebuilt from one grouped
+    aggregate while they are still empty, which covers databases that had
+    trackings before the table existed.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def aggregate(self) -> Dict[StatsKey, int]:
+        """Count trackings per (status, carrier) in a single grouped query."""
+        rows = (
+            self.db.query(TrackingDB.status, TrackingDB.carrier, func.count(TrackingDB.id))
+            .group_by(TrackingDB.status, TrackingDB.carrier)
+        )
+        return {(_status(status), carrier or ''): count for status, carrier, count in rows}
+
+    def _upsert(self, status: str, carrier: str, count: int, *, increment: bool) -> None:
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            module = postgresql if dialect == 'postgresql' else sqlite
+            stmt = module.insert(TrackingStatsDB).values(
+                status=status, carrier=carrier, count=count)
+            new_count = TrackingStatsDB.count + count if increment else stmt.excluded.count
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=['status', 'carrier'], set_={'count': new_count}))
+            return
+        row = self.db.get(TrackingStatsDB, (status, carrier))
+        if row is None:
+            self.db.add(TrackingStatsDB(status=status, carrier=carrier, count=count))
+        else:
+            row.count = row.count + count if increment else count
+        self.db.flush()
+
+    def ensure_initialized(self) -> None:
+        """Seed the counters from ``trackings`` if they were never filled."""
+        if self.db.query(TrackingStatsDB.status).first() is not None:
+            return
+        counts = self.aggregate()
+        for (status, carrier), count in counts.items():
+            self._upsert(status, carrier, count, increment=False)
+        if counts:
+            logger.info(f"Rebuilt tracking counters for {sum(counts.values())} trackings")
+
+    def record_transition(
+        self,
+        before: Tuple[PackageStatus | str, str] | None,
+        after: Tuple[PackageStatus | str, str],
+    ) -> None:
+        """Move one tracking from the ``before`` (status, carrier) to ``after``.
+
+        ``before`` is None for a new tracking. Nothing is committed.
+        """
+        old = None if before is None else (_status(before[0]), before[1] or '')
+        new = (_status(after[0]), after[1] or '')
+        if old == new:
+            return
+        if old is not None:
+            self._upsert(*old, -1, increment=True)
+        self._upsert(*new, 1, increment=True)
+
+    def counts(self) -> Dict[StatsKey, int]:
+        self.ensure_initialized()
+        self.db.commit()
+        return {
+            (status, carrier): count
+            for status, carrier, count in self.db.query(
+                TrackingStatsDB.status, TrackingStatsDB.carrier, TrackingStatsDB.count)
+            if count
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Dashboard statistics computed from the counters."""
+        counts = self.counts()
+        by_status: Counter = Counter()
+        by_carrier: Counter = Counter()
+        for (status, carrier), count in counts.items():
+            by_status[status] += count
+            by_carrier[carrier] += count
+
+        total = sum(counts.values())
+        delivered = by_status[PackageStatus.DELIVERED.value]
+        return {
+            "total_trackings": total,
+            "delivered_trackings": delivered,
+            "in_transit_trackings": by_status[PackageStatus.IN_TRANSIT.value],
+            "exception_trackings": by_status[PackageStatus.EXCEPTION.value],
+            "status_distribution": dict(by_status),
+            "carrier_distribution": dict(by_carrier),
+            "delivery_rate": (delivered / total * 100) if total > 0 else 0
+        }
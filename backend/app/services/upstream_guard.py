@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, TypeVar
+
+import httpx
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream call was not attempted or did not finish in time."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class QueueFullError(UpstreamUnavailable):
+    pass
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    pass
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+
+    Every fast success grows the limit by roughly one slot per window of
+    requests; a timeout, 5xx, 429 or slow response shrinks it by ``backoff``.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int,
+                 latency_threshold: float, backoff: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_threshold:
+            self.on_drop()
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_drop(self) -> None:
+        self.limit = max(self.minimum, self.limit * self.backoff)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one probe through after a pause."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_inflight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_inflight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_inflight:
+                return False
+            self._probe_inflight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot whose call never reached upstream."""
+        self._probe_inflight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = self.CLOSED
+        self._probe_inflight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit opened after {self.failures} upstream failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_inflight = False
+
+
+def _is_failure(result: Any) -> bool:
+    return isinstance(result, httpx.Response) and result.status_code >= 500
+
+
+def _is_overload(result: Any) -> bool:
+    return isinstance(result, httpx.Response) and (
+        result.status_code >= 500 or result.status_code == 429)
+
+
+class UpstreamGuard:
+    """Protects an upstream with an adaptive concurrency limit and a circuit breaker.
+
+    Calls beyond the current limit wait in a bounded FIFO queue. Every call
+    has a deadline covering both the queue wait and the call itself.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        limiter: AIMDLimiter | None = None,
+        breaker: CircuitBreaker | None = None,
+        max_queue: int | None = None,
+        deadline: float | None = None,
+    ):
+        self.name = name
+        self.limiter = limiter or AIMDLimiter(
+            initial=settings.FEDEX_GUARD_INITIAL_LIMIT,
+            minimum=settings.FEDEX_GUARD_MIN_LIMIT,
+            maximum=settings.FEDEX_GUARD_MAX_LIMIT,
+            latency_threshold=settings.FEDEX_GUARD_LATENCY_THRESHOLD,
+            backoff=settings.FEDEX_GUARD_BACKOFF,
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.FEDEX_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.FEDEX_BREAKER_RESET_TIMEOUT,
+        )
+        self.max_queue = settings.FEDEX_GUARD_MAX_QUEUE if max_queue is None else max_queue
+        self.deadline = settings.FEDEX_CALL_DEADLINE if deadline is None else deadline
+        self._inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.short_circuited = 0
+
+    async def call(self, fn: Callable[[], Awaitable[T]], *, deadline: float | None = None) -> T:
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        expires = time.monotonic() + (self.deadline if deadline is None else deadline)
+        try:
+            await self._acquire(expires)
+        except (UpstreamUnavailable, asyncio.CancelledError):
+            self.breaker.release_probe()
+            raise
+
+        start = time.monotonic()
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(fn(), timeout=max(0.0, expires - start))
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            self.timeouts += 1
+            self._record_failure()
+            raise DeadlineExceeded(f"{self.name} call exceeded its deadline") from e
+        except httpx.TransportError:
+            self._record_failure()
+            raise
+        except (Exception, asyncio.CancelledError):
+            # Our own errors and cancelled (e.g. hedged) calls say nothing
+            # about upstream health
+            self.breaker.release_probe()
+            raise
+        finally:
+            self._release()
+
+        if _is_failure(result):
+            self._record_failure()
+        elif _is_overload(result):
+            self.limiter.on_drop()
+            self.breaker.record_success()
+        else:
+            self.limiter.on_success(time.monotonic() - start)
+            self.breaker.record_success()
+        return result
+
+    def _record_failure(self) -> None:
+        self.failures += 1
+        self.limiter.on_drop()
+        self.breaker.record_failure()
+
+    async def _acquire(self, expires: float) -> None:
+        if self._inflight < int(self.limiter.limit) and not self._waiters:
+            self._inflight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} wait queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=max(0.0, expires - time.monotonic()))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up waiting
+                self._release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timeouts += 1
+            raise DeadlineExceeded(f"{self.name} call timed out waiting for a slot")
+
+    def _release(self) -> None:
+        self._inflight -= 1
+        while self._waiters and self._inflight < int(self.limiter.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._inflight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'limit': round(self.limiter.limit, 2),
+            'inflight': self._inflight,
+            'queued': len(self._waiters),
+            'calls': self.calls,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+            'short_circuited': self.short_circuited,
+        }
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def get_upstream_guard(name: str = "fedex") -> UpstreamGuard:
+    """Return the process-wide guard protecting the ``name`` upstream."""
+    guard = _guards.get(name)
+    if guard is None:
+        guard = _guards.setdefault(name, UpstreamGuard(name))
+    return guard
+
+
+def upstream_guard_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: guard.stats() for name, guard in _guards.items()}
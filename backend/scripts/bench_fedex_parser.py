@@ -0,0 +1,136 @@
+"""Micro-benchmark of the FedEx response parser.
+
+Usage::
+
+    python backend/scripts/bench_fedex_parser.py [--payload recorded.json] [--events 10 100 500]
+
+Each row decodes and parses a FedEx Track API response whose first track
+result is given an increasing number of scan events. ``json`` is the
+standard-library decoder for reference, ``loads`` the one used by the
+service (orjson when installed). ``--payload`` uses a recorded response as
+the template instead of the built-in one.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from copy import deepcopy
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'bench')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'bench')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'bench')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.app.services import fedex_parser  # noqa: E402
+
+ADDRESS = {
+    "city": "MEMPHIS",
+    "stateOrProvinceCode": "TN",
+    "countryCode": "US",
+    "postalCode": "38116",
+}
+
+TEMPLATE = {
+    "output": {
+        "completeTrackResults": [{
+            "trackingNumber": "123456789012",
+            "trackResults": [{
+                "trackingNumberInfo": {
+                    "trackingNumber": "123456789012",
+                    "trackingNumberUniqueId": "12029~123456789012~FDEG",
+                },
+                "latestStatusDetail": {"code": "IT", "description": "In transit"},
+                "serviceDetail": {"type": "GROUND", "description": "FedEx Ground"},
+                "shipperInformation": {"address": ADDRESS},
+                "recipientInformation": {"address": dict(ADDRESS, city="PARIS", countryCode="FR")},
+                "packageDetails": {
+                    "count": "1",
+                    "packagingDescription": {"description": "Your Packaging"},
+                    "weightAndDimensions": {
+                        "weight": [{"unit": "KG", "value": "2.5"}, {"unit": "LB", "value": "5.5"}],
+                        "dimensions": [{"units": "CM", "length": 30, "width": 20, "height": 10}],
+                    },
+                },
+                "deliveryDetails": {
+                    "deliveryAttempts": "0",
+                    "actualDeliveryAddress": {},
+                    "deliveryOptionEligibilityDetails": [
+                        {"option": "REDIRECT_TO_HOLD_AT_LOCATION", "eligibility": "ELIGIBLE"},
+                    ],
+                },
+                "dateAndTimes": [
+                    {"type": "SHIP", "dateTime": "2024-01-01T08:00:00-06:00"},
+                    {"type": "ACTUAL_PICKUP", "dateTime": "2024-01-01T09:00:00-06:00"},
+                ],
+                "standardTransitTimeWindow": {"window": {"ends": "2024-01-05T00:00:00-06:00"}},
+                "availableNotifications": ["ON_DELIVERY", "ON_EXCEPTION"],
+                "scanEvents": [],
+            }],
+        }],
+    },
+}
+
+
+def scan_event(index):
+    return {
+        "date": f"2024-01-{1 + index % 28:02d}T{index % 24:02d}:00:00-06:00",
+        "eventType": "IT",
+        "eventDescription": "In transit",
+        "exceptionCode": "",
+        "exceptionDescription": "",
+        "scanLocation": dict(ADDRESS, latitude=35.04, longitude=-89.98),
+        "derivedStatusCode": "IT",
+    }
+
+
+def build_payload(template, events):
+    payload = deepcopy(template)
+    result = payload["output"]["completeTrackResults"][0]["trackResults"][0]
+    recorded = result.get("scanEvents") or []
+    result["scanEvents"] = [
+        recorded[i % len(recorded)] if recorded else scan_event(i) for i in range(events)]
+    return json.dumps(payload).encode()
+
+
+def first_result(data):
+    return data["output"]["completeTrackResults"][0]["trackResults"][0]
+
+
+def bench(fn, repeat, number):
+    best = min(timeit.repeat(fn, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload", help="recorded FedEx Track API response (JSON)")
+    parser.add_argument("--events", type=int, nargs="+", default=[0, 10, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    template = TEMPLATE
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            template = json.load(f)
+
+    print(f"orjson: {'yes' if fedex_parser.orjson is not None else 'no'}")
+    print(f"{'events':>8} {'bytes':>9} {'json us':>9} {'loads us':>9} "
+          f"{'parse us':>9} {'us/event':>9}")
+    for events in args.events:
+        body = build_payload(template, events)
+        result = first_result(fedex_parser.loads(body))
+        number = max(1, 2000 // (events + 10))
+        stdlib = bench(lambda: json.loads(body), args.repeat, number)
+        decode = bench(lambda: fedex_parser.loads(body), args.repeat, number)
+        parse = bench(lambda: fedex_parser.parse_tracking_info(result), args.repeat, number)
+        per_event = parse / events if events else 0.0
+        print(f"{events:>8} {len(body):>9} {stdlib:>9.1f} {decode:>9.1f} "
+              f"{parse:>9.1f} {per_event:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,10 @@ def db_session():
     if ModelsBase is not None:
         ModelsBase.metadata.create_all(bind=engine)
 
+    # Interned location ids point at rows of the database just dropped
+    from backend.app.services.location_service import _location_ids
+    _location_ids.clear()
+
     db = SessionLocal()
     try:
         yield db
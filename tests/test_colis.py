@@ -66,3 +66,87 @@ def test_delete_colis_not_found(db_session):
         asyncio.run(colis_router.delete_colis("UNKNOWN", db_session))
     assert exc.value.status_code == 404
 
+
+def test_search_colis_sparse_fields(db_session, monkeypatch):
+    import json
+    from backend.app.models.colis import ColisFilter
+
+    setup_colis(db_session, monkeypatch)
+    resp = asyncio.run(colis_router.search_colis(ColisFilter(), db_session, fields="id,status"))
+
+    body = json.loads(resp.body)
+    assert body["total"] == 1
+    assert body["items"] == [{"id": "TESTDEL", "status": body["items"][0]["status"]}]
+
+
+def _add_colis(db, n, created_at):
+    from backend.app.models.database import ColisDB
+    db.add_all([
+        ColisDB(id=f"C{i:02d}", reference=f"REF-{i:02d}-X", tcn=f"TCN{i:02d}",
+                code_barre=f"CB{i:02d}", status="En attente", created_at=created_at(i))
+        for i in range(n)
+    ])
+    db.commit()
+
+
+def test_search_colis_keyset_pagination(db_session):
+    from datetime import datetime
+    from backend.app.models.colis import ColisFilter
+
+    # Pairs share a timestamp, so the id has to break ties
+    _add_colis(db_session, 7, lambda i: datetime(2024, 1, 1, i // 2))
+    service = ColisService(db_session)
+
+    seen, cursor = [], None
+    while True:
+        page = service.search_colis(ColisFilter(page_size=3, cursor=cursor, count="none"))
+        seen.extend(c.id for c in page.items)
+        assert page.total is None
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == ["C06", "C05", "C04", "C03", "C02", "C01", "C00"]
+
+    # The first keyset page is the same as the first offset page
+    offset = service.search_colis(ColisFilter(page=2, page_size=3))
+    assert [c.id for c in offset.items] == ["C03", "C02", "C01"]
+    assert offset.total == 7
+
+
+def test_search_colis_substring_uses_ngrams(db_session):
+    from datetime import datetime
+    from backend.app.models.colis import ColisFilter
+    from backend.app.models.database import ColisDB
+
+    _add_colis(db_session, 12, lambda i: datetime(2024, 1, 1))
+    service = ColisService(db_session)
+
+    page = service.search_colis(ColisFilter(reference="f-1", page_size=50))
+    assert sorted(c.id for c in page.items) == ["C10", "C11"]
+    # Terms shorter than a trigram fall back to a plain scan
+    assert service.search_colis(ColisFilter(tcn="1", page_size=50)).total == 3
+
+    colis = db_session.get(ColisDB, "C10")
+    colis.reference = "OTHER"
+    db_session.commit()
+    assert [c.id for c in service.search_colis(ColisFilter(reference="f-1")).items] == ["C11"]
+    db_session.delete(colis)
+    db_session.commit()
+    assert service.search_colis(ColisFilter(reference="other")).total == 0
+
+
+def test_search_colis_estimated_count_and_bad_cursor(db_session, monkeypatch):
+    from datetime import datetime
+    from backend.app.config import settings
+    from backend.app.models.colis import ColisFilter
+
+    _add_colis(db_session, 5, lambda i: datetime(2024, 1, 1, i))
+    monkeypatch.setattr(settings, "SEARCH_COUNT_ESTIMATE_CAP", 3)
+    resp = asyncio.run(colis_router.search_colis(ColisFilter(page_size=2, count="estimate"), db_session))
+    assert resp["total"] == 3
+    assert resp["total_is_estimate"] is True
+    assert resp["next_cursor"]
+
+    with pytest.raises(colis_router.HTTPException) as exc:
+        asyncio.run(colis_router.search_colis(ColisFilter(cursor="garbage"), db_session))
+    assert exc.value.status_code == 400
@@ -0,0 +1,123 @@
+import os
+import sys
+import copy
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.models.tracking import ServiceType, TrackingInfo
+from backend.app.services import fedex_parser
+
+ADDRESS = {
+    "city": "Memphis",
+    "stateOrProvinceCode": "TN",
+    "countryCode": "US",
+    "postalCode": "38116",
+}
+
+TRACK_RESULT = {
+    "trackingNumberInfo": {"trackingNumber": "123456789012", "trackingNumberUniqueId": "abc"},
+    "latestStatusDetail": {"code": "DL"},
+    "serviceDetail": {"type": "PRIORITY_OVERNIGHT", "description": "FedEx Priority Overnight"},
+    "shipperInformation": {"address": ADDRESS},
+    "recipientInformation": {"address": dict(ADDRESS, city="Paris", countryCode="FR")},
+    "packageDetails": {
+        "count": "2",
+        "packagingDescription": {"description": "BOX"},
+        "weightAndDimensions": {
+            "weight": [{"unit": "KG", "value": "2.5"}],
+            "dimensions": [{"units": "CM", "length": 10, "width": 20, "height": 30}],
+        },
+    },
+    "deliveryDetails": {
+        "deliveryAttempts": "1",
+        "actualDeliveryAddress": dict(ADDRESS, latitude=35.04, longitude=-89.98),
+        "receivedByName": "J. DOE",
+        "deliveryOptionEligibilityDetails": [
+            {"option": "REDIRECT_TO_HOLD_AT_LOCATION", "eligibility": "ELIGIBLE"},
+            {"option": "RESCHEDULE", "eligibility": "INELIGIBLE"},
+        ],
+    },
+    "scanEvents": [
+        {
+            "eventType": "DL",
+            "eventDescription": "Delivered",
+            "date": "2024-01-02T10:00:00Z",
+            "scanLocation": dict(ADDRESS, coordinates={"latitude": "35.04", "longitude": "-89.98"}),
+        },
+        {
+            "eventType": "DE",
+            "eventDescription": "Delivery exception",
+            "date": "2024-01-01T18:00:00Z",
+            "exceptionCode": "07",
+            "exceptionDescription": "Refused",
+            "scanLocation": ADDRESS,
+        },
+    ],
+    "dateAndTimes": [
+        {"type": "ACTUAL_DELIVERY", "dateTime": "2024-01-02T10:00:00Z"},
+        {"type": "SHIP", "dateTime": "2024-01-01T08:00:00Z"},
+        {"type": "COMMITMENT", "dateTime": "2024-01-02T12:00:00Z"},
+    ],
+    "standardTransitTimeWindow": {"window": {"ends": "2024-01-03T00:00:00Z"}},
+    "additionalTrackingInfo": {
+        "packageIdentifiers": [{"type": "CUSTOMER_REFERENCE", "values": ["A", "B"]}]
+    },
+    "availableNotifications": ["ON_DELIVERY"],
+}
+
+
+def test_fast_path_matches_validated_model():
+    info = fedex_parser.parse_tracking_info(TRACK_RESULT)
+    validated = TrackingInfo.model_validate(info.model_dump())
+
+    assert info.model_dump(mode="json") == validated.model_dump(mode="json")
+    assert info.service_type is ServiceType.PRIORITY_OVERNIGHT
+    assert info.package_details.package_count == 2
+    assert info.delivery_details.delivery_attempts == 1
+    assert info.delivery_details.delivery_option_eligibility == {
+        "REDIRECT_TO_HOLD_AT_LOCATION": True, "RESCHEDULE": False}
+    assert info.delivery_details.delivery_location.coordinates.latitude == 35.04
+    assert info.events[0].location.coordinates.longitude == -89.98
+    assert info.events[1].exception_code == "07"
+    assert info.key_dates.model_dump(exclude_unset=True) == {
+        "actual_delivery": "2024-01-02T10:00:00Z", "ship": "2024-01-01T08:00:00Z"}
+    assert info.commercial_info.package_identifiers == [
+        {"type": "CUSTOMER_REFERENCE", "value": "A"},
+        {"type": "CUSTOMER_REFERENCE", "value": "B"},
+    ]
+    assert info.tracking_url.endswith("123456789012")
+
+
+def test_sparse_result_uses_defaults():
+    info = fedex_parser.parse_tracking_info(
+        {"trackingNumberInfo": {"trackingNumber": "1"}, "serviceDetail": {"type": "BOGUS"}})
+
+    assert info.status == "UNKNOWN"
+    assert info.service_type is ServiceType.UNKNOWN
+    assert info.events == []
+    assert info.origin.city == ""
+    assert info.package_details.package_count == 1
+    TrackingInfo.model_validate(info.model_dump())
+
+
+def test_malformed_scan_event_is_skipped():
+    payload = copy.deepcopy(TRACK_RESULT)
+    payload["scanEvents"][0]["scanLocation"] = dict(ADDRESS, city=None)
+    payload["scanEvents"].append({"eventType": "PU", "eventDescription": None, "date": 20240101})
+
+    info = fedex_parser.parse_tracking_info(payload)
+
+    assert [e.event_type for e in info.events] == ["DL", "DE"]
+    # A null address field is read as unknown rather than as a bad event
+    assert info.events[0].location.city == ""
+
+
+def test_loads_accepts_bytes_and_str():
+    assert fedex_parser.loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    assert fedex_parser.loads('{"a": null}') == {"a": None}
@@ -18,6 +18,19 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from backend.app.services.fedex_service import FedExService
 import backend.app.services.fedex_service as fs
+import backend.app.services.upstream_guard as upstream_guard
+import backend.app.services.retry_policy as retry_policy
+from backend.app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def reset_upstream_guard():
+    # Failures in one test must not leave the circuit open for the next
+    upstream_guard._guards.clear()
+    retry_policy._policies.clear()
+    yield
+    upstream_guard._guards.clear()
+    retry_policy._policies.clear()
 
 
 def test_track_package_success(monkeypatch):
@@ -163,89 +176,381 @@ def test_track_package_http_error(monkeypatch):
     assert "FedEx API returned an error" in resp.error
 
 
-def test_token_cached_between_instances(monkeypatch):
-    fs._token_cache["token"] = None
-    fs._token_cache["expiry"] = None
+def test_track_package_retries_transient_errors(monkeypatch):
+    service = FedExService()
+
+    async def dummy_token(self):
+        return "token"
 
-    class DummyRedis:
-        def __init__(self):
-            self.store = {}
+    monkeypatch.setattr(FedExService, "_get_auth_token", dummy_token)
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection reset", request=request)
+        if len(calls) == 2:
+            response = httpx.Response(503, headers={"Retry-After": "0"}, request=request)
+        else:
+            response = httpx.Response(200, json={"output": {"completeTrackResults": [{
+                "trackingNumber": "123",
+                "trackResults": [{"latestStatusDetail": {"code": "DL"}}],
+            }]}}, request=request)
+        response.read()
+        response._elapsed = timedelta(seconds=0)
+        return response
 
-        def get(self, key):
-            return self.store.get(key)
+    transport = httpx.MockTransport(handler)
+    original_client = httpx.AsyncClient
 
-        def set(self, key, value, ex=None):
-            self.store[key] = value
+    class PatchedAsyncClient(original_client):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, transport=transport, **kw)
 
-    fs.redis_client = DummyRedis()
+    monkeypatch.setattr(httpx, "AsyncClient", PatchedAsyncClient)
+    monkeypatch.setattr(fs.settings, "FEDEX_RETRY_BASE_DELAY", 0.01)
 
-    call_count = 0
+    resp = asyncio.run(service.track_package("123"))
+
+    assert len(calls) == 3
+    assert resp.success is True
+    assert retry_policy.retry_policy_stats()["track"]["retries"] == 2
+
+
+def test_raw_payload_only_included_on_request(monkeypatch):
+    service = FedExService()
 
-    class DummyClient:
-        def __enter__(self):
-            return self
+    async def dummy_token(self):
+        return "token"
+
+    monkeypatch.setattr(FedExService, "_get_auth_token", dummy_token)
+    body = {"output": {"completeTrackResults": [{
+        "trackingNumber": "123",
+        "trackResults": [{"latestStatusDetail": {"code": "IT"}}],
+    }]}}
 
-        def __exit__(self, exc_type, exc, tb):
-            pass
+    def handler(request: httpx.Request):
+        response = httpx.Response(200, json=body, request=request)
+        response.read()
+        response._elapsed = timedelta(seconds=0)
+        return response
 
-        def post(self, url, data=None, headers=None):
-            nonlocal call_count
-            call_count += 1
-            request = httpx.Request("POST", url)
-            return httpx.Response(200, json={"access_token": "abc", "expires_in": 3600}, request=request)
+    transport = httpx.MockTransport(handler)
+    original_client = httpx.AsyncClient
 
-    monkeypatch.setattr(httpx, "Client", lambda: DummyClient())
+    class PatchedAsyncClient(original_client):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, transport=transport, **kw)
 
-    service1 = FedExService()
-    token1 = service1._get_auth_token()
-    service2 = FedExService()
-    token2 = service2._get_auth_token()
+    monkeypatch.setattr(httpx, "AsyncClient", PatchedAsyncClient)
 
-    assert token1 == "abc" and token2 == "abc"
+    lean = asyncio.run(service.track_package("123"))
+    [full] = asyncio.run(service.track_packages(["123"], include_raw=True))
+
+    assert lean.success and "raw_response" not in lean.metadata
+    assert full.metadata["raw_response"] == body
+
+
+class DummyRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+def patch_auth_transport(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+    original_client = httpx.AsyncClient
+
+    class PatchedAsyncClient(original_client):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, transport=transport, **kw)
+
+    monkeypatch.setattr(httpx, "AsyncClient", PatchedAsyncClient)
+
+
+def test_token_cached_between_instances(monkeypatch):
+    fs._token_managers.clear()
+    monkeypatch.setattr(fs, "redis_client", DummyRedis())
+
+    call_count = 0
+
+    def handler(request: httpx.Request):
+        nonlocal call_count
+        call_count += 1
+        return httpx.Response(200, json={"access_token": "abc", "expires_in": 3600}, request=request)
+
+    patch_auth_transport(monkeypatch, handler)
+
+    async def run():
+        service1 = FedExService()
+        service2 = FedExService()
+        return await asyncio.gather(
+            service1._get_auth_token(),
+            service2._get_auth_token(),
+            *(service1._get_auth_token() for _ in range(8)),
+        )
+
+    tokens = asyncio.run(run())
+
+    assert set(tokens) == {"abc"}
     assert call_count == 1
 
 
 def test_token_refresh_after_expiry(monkeypatch):
-    fs._token_cache["token"] = None
-    fs._token_cache["expiry"] = None
+    fs._token_managers.clear()
+    monkeypatch.setattr(fs, "redis_client", DummyRedis())
 
-    class DummyRedis:
-        def __init__(self):
-            self.store = {}
+    tokens = ["t1", "t2"]
 
-        def get(self, key):
-            return self.store.get(key)
+    def handler(request: httpx.Request):
+        return httpx.Response(200, json={"access_token": tokens.pop(0), "expires_in": 3600}, request=request)
 
-        def set(self, key, value, ex=None):
-            self.store[key] = value
+    patch_auth_transport(monkeypatch, handler)
+
+    service = FedExService()
 
-    fs.redis_client = DummyRedis()
+    async def run():
+        tok1 = await service._get_auth_token()
+        tok2 = await service._get_auth_token()
+
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        manager = service._token_manager
+        manager._expiry = expired
+        fs.redis_client.store[manager._redis_expiry_key] = expired.isoformat()
+
+        tok3 = await service._get_auth_token()
+        return tok1, tok2, tok3
+
+    assert asyncio.run(run()) == ("t1", "t1", "t2")
+
+
+def test_token_refreshed_in_background_before_expiry(monkeypatch):
+    fs._token_managers.clear()
+    monkeypatch.setattr(fs, "redis_client", DummyRedis())
 
     tokens = ["t1", "t2"]
 
-    class DummyClient:
-        def __enter__(self):
-            return self
+    def handler(request: httpx.Request):
+        return httpx.Response(200, json={"access_token": tokens.pop(0), "expires_in": 3600}, request=request)
+
+    patch_auth_transport(monkeypatch, handler)
+
+    service = FedExService()
+
+    async def run():
+        await service._get_auth_token()
+        manager = service._token_manager
+        manager._expiry = datetime.utcnow() + timedelta(seconds=10)
+        fs.redis_client.store[manager._redis_expiry_key] = manager._expiry.isoformat()
+
+        # Still valid, so the old token is returned while a refresh starts
+        stale = await service._get_auth_token()
+        await manager._refresh_task
+        fresh = await service._get_auth_token()
+        return stale, fresh
+
+    assert asyncio.run(run()) == ("t1", "t2")
+
+
+def test_revoked_token_is_replaced_and_request_retried(monkeypatch):
+    fs._token_managers.clear()
+    monkeypatch.setattr(fs, "redis_client", DummyRedis())
+
+    tokens = ["revoked", "fresh"]
+    seen = []
+
+    def handler(request: httpx.Request):
+        if "trackingnumbers" not in request.url.path:
+            return httpx.Response(
+                200, json={"access_token": tokens.pop(0), "expires_in": 3600}, request=request)
+        seen.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer revoked":
+            response = httpx.Response(401, json={"errors": []}, request=request)
+        else:
+            response = httpx.Response(200, json={"output": {"completeTrackResults": [{
+                "trackingNumber": "123",
+                "trackResults": [{"latestStatusDetail": {"code": "IT"}}],
+            }]}}, request=request)
+        response.read()
+        response._elapsed = timedelta(seconds=0)
+        return response
+
+    patch_auth_transport(monkeypatch, handler)
+    deadlines = []
+    run = retry_policy.RetryPolicy.run
+
+    async def recording_run(self, attempt, deadline=None):
+        deadlines.append(deadline)
+        return await run(self, attempt, deadline)
 
-        def __exit__(self, exc_type, exc, tb):
-            pass
+    monkeypatch.setattr(retry_policy.RetryPolicy, "run", recording_run)
 
-        def post(self, url, data=None, headers=None):
-            token = tokens.pop(0)
-            request = httpx.Request("POST", url)
-            return httpx.Response(200, json={"access_token": token, "expires_in": 1}, request=request)
+    [resp] = asyncio.run(FedExService().track_packages(["123"]))
+
+    assert resp.success is True
+    assert seen == ["Bearer revoked", "Bearer fresh"]
+    # The second request only gets what is left of the overall deadline
+    assert deadlines[0] is None and 0 < deadlines[1] < settings.FEDEX_REQUEST_DEADLINE
+    assert fs.redis_client.store["fedex_token:dummy"] == "fresh"
 
-    monkeypatch.setattr(httpx, "Client", lambda: DummyClient())
 
+def test_http_client_reused_across_calls(monkeypatch):
     service = FedExService()
-    tok1 = service._get_auth_token()
-    assert tok1 == "t1"
-    tok2 = service._get_auth_token()
-    assert tok2 == "t1"
 
-    expired = datetime.utcnow() - timedelta(seconds=1)
-    fs._token_cache["expiry"] = expired
-    fs.redis_client.set(fs._REDIS_EXPIRY_KEY, expired.isoformat())
+    async def dummy_token(self):
+        return "token"
+
+    monkeypatch.setattr(FedExService, "_get_auth_token", dummy_token)
+
+    created = []
+
+    def handler(request: httpx.Request):
+        response = httpx.Response(500, json={"error": "server"}, request=request)
+        response.read()
+        response._elapsed = timedelta(seconds=0)
+        return response
+
+    transport = httpx.MockTransport(handler)
+    original_client = httpx.AsyncClient
+
+    class PatchedAsyncClient(original_client):
+        def __init__(self, *a, **kw):
+            created.append(self)
+            super().__init__(*a, transport=transport, **kw)
+
+    monkeypatch.setattr(httpx, "AsyncClient", PatchedAsyncClient)
+
+    async def run():
+        await service.track_package("123")
+        await service.track_package("456")
+        client = fs.get_http_client(service._pool)
+        await fs.close_http_clients()
+        return client
+
+    client = asyncio.run(run())
+
+    assert len(created) == 1
+    assert client.is_closed
+
+
+def test_registry_reuses_service_and_config(monkeypatch):
+    fs._load_fedex_config.cache_clear()
+    fs._service_registry.clear()
+
+    loads = 0
+    original_load = fs.yaml.safe_load
+
+    def counting_load(stream):
+        nonlocal loads
+        loads += 1
+        return original_load(stream)
+
+    monkeypatch.setattr(fs.yaml, "safe_load", counting_load)
+
+    default = fs.get_fedex_service()
+    assert fs.get_fedex_service() is default
+    other = fs.get_fedex_service("ACCOUNT2")
+    assert other is not default
+    assert other.cdict["account_number"] == "ACCOUNT2"
+    assert fs.get_fedex_service("ACCOUNT2") is other
+    assert loads == 1
+
+
+def test_tokens_and_pools_are_per_account(monkeypatch):
+    fs._token_managers.clear()
+    monkeypatch.setattr(fs, "redis_client", DummyRedis())
+
+    config = dict(fs.load_fedex_config())
+    config["accounts"] = {"ACCT2": {"client_id": "other", "client_secret": "secret2"}}
+    monkeypatch.setattr(fs, "load_fedex_config", lambda path=None: config)
+
+    def handler(request: httpx.Request):
+        client_id = dict(httpx.QueryParams(request.content.decode()))["client_id"]
+        return httpx.Response(
+            200, json={"access_token": f"tok-{client_id}", "expires_in": 3600}, request=request)
+
+    patch_auth_transport(monkeypatch, handler)
+
+    default = FedExService()
+    shared = FedExService("ACCT3")
+    separate = FedExService("ACCT2")
+
+    async def run():
+        tokens = await asyncio.gather(
+            default._get_auth_token(), shared._get_auth_token(), separate._get_auth_token())
+        pools = {fs.get_http_client(s._pool) for s in (default, shared, separate)}
+        return tokens, pools
+
+    tokens, pools = asyncio.run(run())
+
+    assert tokens == ["tok-dummy", "tok-dummy", "tok-other"]
+    assert default._token_manager is shared._token_manager
+    assert separate._token_manager is not default._token_manager
+    assert set(fs.redis_client.store) >= {"fedex_token:dummy", "fedex_token:other"}
+    assert len(pools) == 3
+
+
+def test_track_packages_batches_and_maps_partial_failures(monkeypatch):
+    service = FedExService()
+
+    async def dummy_token(self):
+        return "token"
+
+    monkeypatch.setattr(FedExService, "_get_auth_token", dummy_token)
+    monkeypatch.setattr(fs.settings, "FEDEX_TRACK_BATCH_SIZE", 30)
+
+    requests_seen = []
+
+    def handler(request: httpx.Request):
+        import json
+        numbers = [
+            info["trackingNumberInfo"]["trackingNumber"]
+            for info in json.loads(request.content)["trackingInfo"]
+        ]
+        requests_seen.append(numbers)
+        results = []
+        for number in reversed(numbers):
+            if number.endswith("9"):
+                track_result = {
+                    "trackingNumberInfo": {"trackingNumber": number},
+                    "error": {"code": "TRACKING.TRACKINGNUMBER.NOTFOUND", "message": "Not found"},
+                }
+            else:
+                track_result = {
+                    "trackingNumberInfo": {"trackingNumber": number},
+                    "latestStatusDetail": {"code": "IN_TRANSIT"},
+                }
+            results.append({"trackingNumber": number, "trackResults": [track_result]})
+        response = httpx.Response(
+            200, json={"output": {"completeTrackResults": results}}, request=request)
+        response.read()
+        response._elapsed = timedelta(seconds=0)
+        return response
+
+    transport = httpx.MockTransport(handler)
+    original_client = httpx.AsyncClient
+
+    class PatchedAsyncClient(original_client):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, transport=transport, **kw)
+
+    monkeypatch.setattr(httpx, "AsyncClient", PatchedAsyncClient)
 
-    tok3 = service._get_auth_token()
-    assert tok3 == "t2"
+    numbers = [f"{i:012d}" for i in range(40)] + ["000000000001"]
+    responses = asyncio.run(service.track_packages(numbers))
+
+    assert len(requests_seen) == 2
+    assert sorted(len(chunk) for chunk in requests_seen) == [10, 30]
+    assert [r.metadata["tracking_number"] for r in responses] == numbers
+    for number, resp in zip(numbers, responses):
+        if number.endswith("9"):
+            assert resp.success is False
+            assert "Not found" in resp.error
+        else:
+            assert resp.success is True
+            assert resp.data.tracking_number == number
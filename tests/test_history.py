@@ -103,6 +103,14 @@ def test_log_search_stores_fields(db_session):
     assert record.note == "n"
 
 
+def test_log_search_drops_raw_fedex_payload(db_session):
+    service = TrackingHistoryService(db_session)
+    service.log_search(1, "123", meta_data={"a": 1, "raw_response": {"output": {}}})
+
+    record = db_session.query(TrackedShipmentDB).first()
+    assert record.meta_data == {"a": 1}
+
+
 def test_post_history_endpoint(db_session):
     user = create_user(db_session)
     payload = TrackedShipmentCreate(tracking_number="ABC", status="OK")
@@ -0,0 +1,37 @@
+import os
+import sys
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.api.v1.endpoints import metrics as metrics_router
+from backend.app.models.user import UserDB, UserRole
+
+
+def test_metrics_require_authentication():
+    app = FastAPI()
+    app.include_router(metrics_router.router, prefix="/metrics")
+
+    async def get_metrics():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics/")
+
+    assert asyncio.run(get_metrics()).status_code == 401
+
+
+def test_metrics_are_served_to_admins():
+    admin = UserDB(email="admin@example.com", role=UserRole.admin, is_active=True)
+    result = asyncio.run(metrics_router.get_metrics(current_user=admin))
+
+    assert result["success"] is True
+    assert {"coalescer", "rate_limits", "scheduler"} <= set(result["data"])
@@ -0,0 +1,119 @@
+import os
+import sys
+import asyncio
+import time
+import pytest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.services.rate_limiter import (
+    FedExRateLimiter, RateLimitTimeout, background_priority,
+)
+
+
+class DummyRedis:
+    """Runs the token-bucket script in Python against a local clock."""
+
+    def __init__(self, fail=False):
+        self.buckets = {}
+        self.calls = []
+        self.fail = fail
+
+    def register_script(self, script):
+        async def run(keys, args):
+            if self.fail:
+                raise ConnectionError("redis down")
+            key = keys[0]
+            rate, capacity, requested = float(args[0]), float(args[1]), float(args[2])
+            self.calls.append(key)
+            now = time.monotonic()
+            tokens, ts = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            wait = 0.0
+            if tokens >= requested:
+                tokens -= requested
+            else:
+                wait = (requested - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            return str(wait).encode()
+        return run
+
+
+def make_limiter(client, rate=20.0, burst=2):
+    return FedExRateLimiter(client, budgets={"track": (rate, burst), "proof": (rate, burst)})
+
+
+def test_callers_queue_instead_of_failing_when_bucket_is_empty():
+    limiter = make_limiter(DummyRedis(), rate=20.0, burst=2)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire("acct", "track") for _ in range(4)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    # Two tokens of burst, then two more at 20 tokens per second
+    assert elapsed >= 0.09
+    stats = limiter.stats()["acct:track"]
+    assert stats["granted"] == 4
+    assert stats["throttled"] >= 1
+    assert stats["queued"] == 0
+
+
+def test_interactive_calls_jump_ahead_of_background_traffic():
+    limiter = make_limiter(DummyRedis(), rate=50.0, burst=1)
+    order = []
+
+    async def call(name, background):
+        if background:
+            with background_priority():
+                await limiter.acquire("acct", "track")
+        else:
+            await limiter.acquire("acct", "track")
+        order.append(name)
+
+    async def run():
+        await limiter.acquire("acct", "track")
+        await asyncio.gather(
+            call("refresh-1", True), call("refresh-2", True), call("user", False))
+
+    asyncio.run(run())
+
+    assert order == ["user", "refresh-1", "refresh-2"]
+
+
+def test_budgets_are_separate_per_account_and_endpoint():
+    client = DummyRedis()
+    limiter = make_limiter(client, rate=1.0, burst=1)
+
+    async def run():
+        await limiter.acquire("a", "track")
+        await limiter.acquire("a", "proof")
+        await limiter.acquire("b", "track")
+        with pytest.raises(RateLimitTimeout):
+            await limiter.acquire("a", "track", timeout=0.05)
+
+    asyncio.run(run())
+
+    assert set(client.calls) == {
+        "fedex:ratelimit:a:track", "fedex:ratelimit:a:proof", "fedex:ratelimit:b:track"}
+    assert limiter.stats()["a:track"]["timeouts"] == 1
+
+
+def test_redis_failure_lets_calls_through():
+    limiter = make_limiter(DummyRedis(fail=True), rate=1.0, burst=1)
+
+    async def run():
+        await asyncio.wait_for(
+            asyncio.gather(*(limiter.acquire("acct", "track") for _ in range(5))), 1)
+
+    asyncio.run(run())
+
+    assert limiter.stats()["acct:track"]["granted"] == 5
@@ -0,0 +1,124 @@
+import os
+import sys
+import asyncio
+import time
+import httpx
+import pytest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.services.retry_policy import RetryPolicy, _retry_after
+from backend.app.services.upstream_guard import DeadlineExceeded
+
+REQUEST = httpx.Request("POST", "https://api.example.com/track/v1/trackingnumbers")
+
+
+def make_policy(**kwargs):
+    options = dict(max_attempts=3, base_delay=0.01, max_delay=0.05, deadline=2.0, hedge=False)
+    options.update(kwargs)
+    return RetryPolicy("test", **options)
+
+
+def scripted(outcomes, delays=None):
+    """Return an attempt function playing ``outcomes`` in order."""
+    calls = []
+
+    async def attempt(timeout):
+        index = len(calls)
+        calls.append(timeout)
+        if delays:
+            await asyncio.sleep(delays[index])
+        outcome = outcomes[index]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome[0], headers=outcome[1], request=REQUEST)
+
+    return attempt, calls
+
+
+def test_retries_transport_errors_and_retryable_statuses():
+    policy = make_policy()
+    attempt, calls = scripted([
+        httpx.ConnectError("reset", request=REQUEST),
+        (503, {}),
+        (200, {}),
+    ])
+
+    response = asyncio.run(policy.run(attempt))
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert policy.stats()["retries"] == 2
+
+
+def test_gives_up_after_max_attempts():
+    policy = make_policy(max_attempts=2)
+    attempt, calls = scripted([(502, {}), (502, {}), (200, {})])
+
+    assert asyncio.run(policy.run(attempt)).status_code == 502
+    assert len(calls) == 2
+
+    attempt, calls = scripted([httpx.ReadTimeout("slow", request=REQUEST)] * 2)
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(policy.run(attempt))
+
+
+def test_honours_retry_after_within_deadline():
+    policy = make_policy(deadline=1.0)
+    attempt, calls = scripted([(429, {"Retry-After": "0.1"}), (200, {})])
+
+    start = time.monotonic()
+    response = asyncio.run(policy.run(attempt))
+
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.1
+
+    # Waiting 30s would blow the deadline, so the 429 is returned right away
+    attempt, calls = scripted([(429, {"Retry-After": "30"}), (200, {})])
+    assert asyncio.run(policy.run(attempt)).status_code == 429
+    assert len(calls) == 1
+
+
+def test_deadline_bounds_every_attempt():
+    policy = make_policy(deadline=0.05)
+    attempt, calls = scripted([DeadlineExceeded("slow")] * 3)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(policy.run(attempt))
+    assert all(timeout <= 0.05 for timeout in calls)
+
+
+def test_backoff_is_capped_and_jittered():
+    policy = make_policy(base_delay=0.1, max_delay=0.5)
+    delays = [policy.backoff(n) for n in range(1, 10) for _ in range(20)]
+
+    assert all(0 <= d <= 0.5 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_accepts_http_dates():
+    response = httpx.Response(
+        503, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, request=REQUEST)
+    assert _retry_after(response) == 0.0
+    assert _retry_after(httpx.Response(503, request=REQUEST)) is None
+
+
+def test_hedged_request_wins_when_primary_stalls():
+    policy = make_policy(hedge=True, hedge_min_delay=0.02, hedge_min_samples=5)
+    policy._latencies.extend([0.01] * 10)
+    attempt, calls = scripted([(200, {"X-Attempt": "1"}), (200, {"X-Attempt": "2"})],
+                              delays=[1.0, 0.0])
+
+    start = time.monotonic()
+    response = asyncio.run(policy.run(attempt))
+
+    assert time.monotonic() - start < 0.5
+    assert response.headers["X-Attempt"] == "2"
+    assert policy.stats()["hedges"] == 1
+    assert policy.stats()["hedge_wins"] == 1
@@ -0,0 +1,149 @@
+import os
+import sys
+import asyncio
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.services import scheduler_leader
+from backend.app.services.scheduler_leader import LeaderElector, leader_only
+
+
+class DummyRedis:
+    """A single shared keyspace with expiry driven by the test."""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    async def set(self, key, value, nx=False, px=None):
+        if self.down:
+            raise ConnectionError("redis down")
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def expire_all(self):
+        self.data.clear()
+
+    def expire(self, key):
+        self.data.pop(key, None)
+
+    def register_script(self, source):
+        async def script(keys, args):
+            if self.down:
+                raise ConnectionError("redis down")
+            if self.data.get(keys[0]) != args[0]:
+                return 0
+            if "DEL" in source:
+                del self.data[keys[0]]
+            return 1
+        return script
+
+
+def test_one_leader_with_renewal_and_failover():
+    redis = DummyRedis()
+    a = LeaderElector(redis, key="leader", ttl=30, identity="a")
+    b = LeaderElector(redis, key="leader", ttl=30, identity="b")
+
+    async def scenario():
+        assert await a.campaign() is True
+        assert await b.campaign() is False
+        # Renewal keeps the lease with the leader
+        assert await a.campaign() is True
+        assert await b.campaign() is False
+        assert a.is_leader and not b.is_leader
+
+        # The leader dies: its lease expires and the next campaign takes over
+        redis.expire_all()
+        assert await b.campaign() is True
+        assert await a.campaign() is False
+        assert a.lost == 1 and b.elections == 1
+
+        # A clean shutdown hands over at once
+        await b.resign()
+        assert not b.is_leader
+        assert await a.campaign() is True
+
+    asyncio.run(scenario())
+
+
+def test_leader_steps_down_when_redis_is_unreachable():
+    redis = DummyRedis()
+    elector = LeaderElector(redis, key="leader", ttl=30, identity="a")
+
+    async def scenario():
+        assert await elector.campaign()
+        redis.down = True
+        assert await elector.campaign() is False
+
+    asyncio.run(scenario())
+    assert not elector.is_leader
+
+
+def test_scheduled_job_runs_once_across_workers(monkeypatch):
+    monkeypatch.setattr(scheduler_leader, "_job_stats", {})
+    redis = DummyRedis()
+    workers = [LeaderElector(redis, key="leader", ttl=30, identity=str(i)) for i in range(3)]
+    runs = []
+
+    def purge():
+        runs.append(1)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        for worker in workers:
+            await worker.campaign()
+        for worker in workers:
+            await leader_only(purge, 60, worker)()
+            await leader_only(failing, 60, worker)()
+
+    asyncio.run(scenario())
+
+    assert runs == [1]
+    stats = scheduler_leader.scheduler_stats()["jobs"]
+    assert stats["purge"]["runs"] == 1 and stats["purge"]["skipped"] == 2
+    assert stats["purge"]["last_duration"] >= 0
+    assert stats["failing"]["failures"] == 1
+    assert stats["failing"]["last_error"] == "boom"
+
+
+def test_failover_does_not_rerun_a_job_within_its_interval(monkeypatch):
+    monkeypatch.setattr(scheduler_leader, "_job_stats", {})
+    redis = DummyRedis()
+    old = LeaderElector(redis, key="leader", ttl=30, identity="old")
+    new = LeaderElector(redis, key="leader", ttl=30, identity="new")
+    runs = []
+
+    async def purge():
+        runs.append(1)
+
+    async def scenario():
+        await old.campaign()
+        await leader_only(purge, 3600, old)()
+
+        # The old leader dies right after the run; its lease expires and the
+        # new leader's timer fires within the same interval
+        redis.expire("leader")
+        assert await new.campaign()
+        await leader_only(purge, 3600, new)()
+        assert runs == [1]
+
+        # Once the interval has passed the new leader runs it
+        redis.expire("leader:job:purge")
+        await leader_only(purge, 3600, new)()
+
+    asyncio.run(scenario())
+
+    assert runs == [1, 1]
+    assert redis.data["leader:job:purge"] == "new"
+    stats = scheduler_leader.scheduler_stats()["jobs"]["purge"]
+    assert stats["runs"] == 2 and stats["skipped"] == 1
@@ -18,6 +18,7 @@ from backend.app.services.colis_service import ColisService
 from backend.app.models.colis import ColisCreate
 from backend.app.models.tracking import TrackingResponse
 from backend.app.api.v1.endpoints import tracking as tracking_router
+import backend.app.services.fedex_service as fedex_mod
 
 
 
@@ -39,7 +40,7 @@ class DummyFedExService:
 
 def test_track_package_by_id(db_session, monkeypatch):
     colis_id = setup_colis(db_session, monkeypatch)
-    monkeypatch.setattr(tracking_router, "FedExService", DummyFedExService)
+    monkeypatch.setattr(tracking_router, "get_fedex_service", DummyFedExService)
 
     scope = {
         "type": "http",
@@ -58,7 +59,7 @@ def test_track_package_by_id(db_session, monkeypatch):
 def test_update_tracking(db_session, monkeypatch):
     colis_id = setup_colis(db_session, monkeypatch)
     import backend.app.services.tracking_service as ts_mod
-    monkeypatch.setattr(ts_mod, "FedExService", DummyFedExService)
+    monkeypatch.setattr(ts_mod, "get_fedex_service", DummyFedExService)
 
     update_req = tracking_router.UpdateTrackingRequest(customer_name="Bob", note="hi")
     resp = asyncio.run(
@@ -75,7 +76,7 @@ def test_get_proof_of_delivery_success(db_session, monkeypatch):
         assert tracking_number == colis_id
         return sample_pdf
 
-    monkeypatch.setattr(tracking_router.FedExService, "get_proof_of_delivery", dummy_get_pod)
+    monkeypatch.setattr(fedex_mod.FedExService, "get_proof_of_delivery", dummy_get_pod)
 
     resp = asyncio.run(tracking_router.get_proof_of_delivery(colis_id, db_session))
 
@@ -98,7 +99,7 @@ def test_get_proof_of_delivery_not_found(db_session, monkeypatch):
     async def dummy_not_found(self, tracking_number: str):
         raise FileNotFoundError()
 
-    monkeypatch.setattr(tracking_router.FedExService, "get_proof_of_delivery", dummy_not_found)
+    monkeypatch.setattr(fedex_mod.FedExService, "get_proof_of_delivery", dummy_not_found)
 
     with pytest.raises(tracking_router.HTTPException) as exc:
         asyncio.run(tracking_router.get_proof_of_delivery(colis_id, db_session))
@@ -121,7 +122,7 @@ def test_track_single_package_returns_response(db_session, monkeypatch):
                 metadata={"tracking_number": tracking_number},
             )
 
-    monkeypatch.setattr(ts_mod, "FedExService", DummyFedExService)
+    monkeypatch.setattr(ts_mod, "get_fedex_service", DummyFedExService)
 
     service = ts_mod.TrackingService(db_session)
     resp = asyncio.run(service.track_single_package("123456789012"))
@@ -129,3 +130,326 @@ def test_track_single_package_returns_response(db_session, monkeypatch):
     assert isinstance(resp, TrackingResponse)
     assert resp.success is True
     assert resp.metadata["tracking_number"] == "123456789012"
+
+
+def test_track_multiple_packages_uses_batch_call(db_session, monkeypatch):
+    import backend.app.services.tracking_service as ts_mod
+
+    calls = []
+
+    class DummyFedExService:
+        def __init__(self, *a, **k):
+            pass
+
+        async def track_packages(self, tracking_numbers):
+            calls.append(list(tracking_numbers))
+            return [
+                TrackingResponse(success=True, data=None, error=None,
+                                 metadata={"tracking_number": n})
+                for n in tracking_numbers
+            ]
+
+    monkeypatch.setattr(ts_mod, "get_fedex_service", DummyFedExService)
+
+    service = ts_mod.TrackingService(db_session)
+    numbers = ["123456789012", "bad", "123456789013"]
+    resp = asyncio.run(service.track_multiple_packages(numbers))
+
+    assert calls == [["123456789012", "123456789013"]]
+    assert [r.success for r in resp] == [True, False, True]
+    assert resp[1].metadata["tracking_number"] == "bad"
+
+    # A full batch takes as few FedEx calls as the API allows
+    calls.clear()
+    monkeypatch.setattr(ts_mod.settings, "FEDEX_TRACK_BATCH_SIZE", 30)
+    numbers = [f"1234567890{i:02d}" for i in range(40)]
+    asyncio.run(service.track_multiple_packages(numbers))
+    assert [len(c) for c in calls] == [30, 10]
+
+
+def test_parse_fields_builds_include_tree():
+    from backend.app.api.v1.projection import parse_fields
+
+    assert parse_fields("status, events[-1].location.city,events[-1],delivery_details.estimated_delivery") == {
+        "status": True,
+        "events": {-1: True},
+        "delivery_details": {"estimated_delivery": True},
+    }
+    assert parse_fields("events[*].status") == {"events": {"__all__": {"status": True}}}
+    with pytest.raises(tracking_router.HTTPException):
+        parse_fields("events[last]")
+
+
+def test_track_package_sparse_fields(db_session, monkeypatch):
+    import json
+    from backend.app.services.fedex_parser import parse_tracking_info
+
+    colis_id = setup_colis(db_session, monkeypatch)
+    info = parse_tracking_info({
+        "trackingNumberInfo": {"trackingNumber": colis_id},
+        "latestStatusDetail": {"code": "IT"},
+        "standardTransitTimeWindow": {"window": {"ends": "2024-01-05"}},
+        "scanEvents": [
+            {"eventType": "IT", "eventDescription": "In transit", "date": "2024-01-02"},
+            {"eventType": "PU", "eventDescription": "Picked up", "date": "2024-01-01"},
+        ],
+    })
+
+    class FullFedExService(DummyFedExService):
+        async def track_package(self, tracking_number):
+            return TrackingResponse(success=True, data=info, metadata={})
+
+    monkeypatch.setattr(tracking_router, "get_fedex_service", FullFedExService)
+    req = Request({"type": "http", "headers": [], "query_string": b"", "path": "/"})
+
+    resp = asyncio.run(tracking_router.track_package(
+        colis_id, req, db_session,
+        fields="status,events[-1].description,delivery_details.estimated_delivery"))
+
+    body = json.loads(resp.body)
+    assert body["success"] is True
+    assert body["metadata"]["identifier"] == colis_id
+    assert body["data"] == {
+        "status": "IT",
+        "events": [{"description": "Picked up"}],
+        "delivery_details": {"estimated_delivery": "2024-01-05"},
+    }
+
+
+def test_raw_payload_is_not_served_from_the_cache(db_session, monkeypatch):
+    from backend.app.services.local_cache import LocalCache
+    from backend.app.services.tracking_cache import TrackingCache
+    from test_tracking_cache import DummyRedis, make_response
+
+    colis_id = setup_colis(db_session, monkeypatch)
+    calls = []
+
+    class RawFedExService(DummyFedExService):
+        async def track_package(self, tracking_number):
+            calls.append("lean")
+            response = make_response(tracking_number)
+            response.metadata.pop("raw_response")
+            return response
+
+        async def track_packages(self, tracking_numbers, include_raw=False):
+            calls.append("raw")
+            return [make_response(n) for n in tracking_numbers]
+
+    cache = TrackingCache(DummyRedis(), local=LocalCache(max_entries=10, max_bytes=10**6, ttl=60))
+    monkeypatch.setattr(tracking_router, "get_fedex_service", RawFedExService)
+    monkeypatch.setattr(tracking_router, "get_tracking_cache", lambda: cache)
+
+    raw = asyncio.run(tracking_router.track_package(colis_id, None, db_session, include_raw=True))
+    lean = asyncio.run(tracking_router.track_package(colis_id, None, db_session))
+    cached = asyncio.run(tracking_router.track_package(colis_id, None, db_session))
+
+    assert "raw_response" in raw.metadata
+    assert "raw_response" not in lean.metadata
+    assert "raw_response" not in cached.metadata and "cache_age" in cached.metadata
+    assert calls == ["raw", "lean"]
+
+
+class SlowBatchFedExService:
+    """Answers chunks after a delay that depends on their first number."""
+
+    def __init__(self, *a, **k):
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+
+    async def track_packages(self, tracking_numbers):
+        self.calls.append(list(tracking_numbers))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(int(tracking_numbers[0][-1]) / 100)
+        finally:
+            self.active -= 1
+        return [
+            TrackingResponse(success=True, data=None, error=None,
+                             metadata={"tracking_number": n})
+            for n in tracking_numbers
+        ]
+
+
+def test_track_multiple_packages_bounded_ordered_and_deduplicated(db_session, monkeypatch):
+    import backend.app.services.tracking_service as ts_mod
+
+    fedex = SlowBatchFedExService()
+    monkeypatch.setattr(ts_mod, "get_fedex_service", lambda account=None: fedex)
+    monkeypatch.setattr(ts_mod.settings, "TRACKING_BATCH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(ts_mod.settings, "TRACKING_BATCH_CONCURRENCY", 2)
+
+    numbers = [f"00000000000{i}" for i in (5, 4, 3, 2, 1, 5)]
+    resp = asyncio.run(ts_mod.TrackingService(db_session).track_multiple_packages(numbers))
+
+    assert [r.metadata["tracking_number"] for r in resp] == numbers
+    assert sorted(n for call in fedex.calls for n in call) == sorted(set(numbers))
+    assert fedex.max_active == 2
+
+    with pytest.raises(ValueError):
+        asyncio.run(ts_mod.TrackingService(db_session).track_multiple_packages(
+            ["000000000001"] * 41))
+
+
+def test_track_multiple_packages_times_out_per_chunk(db_session, monkeypatch):
+    import backend.app.services.tracking_service as ts_mod
+
+    fedex = SlowBatchFedExService()
+    monkeypatch.setattr(ts_mod, "get_fedex_service", lambda account=None: fedex)
+    monkeypatch.setattr(ts_mod.settings, "TRACKING_BATCH_CHUNK_SIZE", 1)
+    monkeypatch.setattr(ts_mod.settings, "TRACKING_BATCH_ITEM_TIMEOUT", 0.05)
+
+    resp = asyncio.run(ts_mod.TrackingService(db_session).track_multiple_packages(
+        ["000000000001", "000000000009"]))
+
+    assert resp[0].success is True
+    assert resp[1].success is False
+    assert "Timed out" in resp[1].error
+
+
+def test_stream_multiple_packages_emits_ndjson_as_completed(db_session, monkeypatch):
+    import json
+    import backend.app.services.tracking_service as ts_mod
+
+    fedex = SlowBatchFedExService()
+    monkeypatch.setattr(ts_mod, "get_fedex_service", lambda account=None: fedex)
+    monkeypatch.setattr(ts_mod.settings, "TRACKING_BATCH_CHUNK_SIZE", 1)
+
+    async def run():
+        resp = await tracking_router.stream_multiple_packages(
+            ["000000000003", "bad", "000000000001"], db_session, fields="status")
+        return resp.media_type, [line async for line in resp.body_iterator]
+
+    media_type, lines = asyncio.run(run())
+
+    assert media_type == "application/x-ndjson"
+    rows = [json.loads(line) for line in lines]
+    assert [row["index"] for row in rows] == [1, 2, 0]
+    assert rows[0]["result"]["success"] is False
+    assert rows[1]["result"] == {"success": True, "error": None, "metadata": {
+        "tracking_number": "000000000001"}, "data": None}
+
+
+def test_keyset_pagination_on_server_timestamps(db_session):
+    from backend.app.models.database import TrackingDB
+    from backend.app.services.search import keyset_page
+
+    # Rows inserted within the same second share created_at
+    db_session.add_all([
+        TrackingDB(tracking_number=f"12345678901{i}", carrier="FedEx") for i in range(5)
+    ])
+    db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(
+            db_session.query(TrackingDB), TrackingDB, "created_at", True, 2, cursor=cursor)
+        seen.extend(r.id for r in rows)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+def _ingest_trackings(db, count):
+    import copy
+    from backend.app.services.fedex_parser import parse_tracking_info
+    from backend.app.services.tracking_ingest_service import TrackingIngestService
+    from test_fedex_parser import TRACK_RESULT
+
+    service = TrackingIngestService(db)
+    for i in range(count):
+        payload = copy.deepcopy(TRACK_RESULT)
+        number = f"{100000000000 + i}"
+        payload["trackingNumberInfo"]["trackingNumber"] = number
+        payload["latestStatusDetail"] = {"code": "DELIVERED"}
+        service.ingest(number, parse_tracking_info(payload))
+
+
+def _count_statements(db, fn):
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+    return result, len(statements)
+
+
+def test_search_trackings_loads_a_page_in_constant_queries(db_session):
+    from backend.app.models.tracking import TrackingFilter
+    from backend.app.services.tracking_service import TrackingService
+
+    _ingest_trackings(db_session, 100)
+    db_session.expire_all()
+    service = TrackingService(db_session)
+
+    small, small_queries = _count_statements(
+        db_session, lambda: service.search_trackings(TrackingFilter(page_size=10)))
+    db_session.expire_all()
+    page, queries = _count_statements(
+        db_session, lambda: service.search_trackings(TrackingFilter(page_size=100)))
+
+    assert len(page.items) == 100
+    assert page.total == 100
+    # count, page with its details, events with their locations
+    assert queries == small_queries == 3
+
+    info = page.items[0]
+    assert info.status == "DELIVERED"
+    assert [e.event_type for e in info.events] == ["DL", "DE"]
+    assert info.events[0].location.city == "Memphis"
+    assert info.events[0].timestamp == "2024-01-02T10:00:00+00:00"
+    assert info.package_details.dimensions == {"CM": {"length": 10, "width": 20, "height": 30}}
+    assert info.delivery_details.actual_delivery == "2024-01-02T10:00:00+00:00"
+
+
+def test_search_trackings_endpoint_returns_results(db_session):
+    from backend.app.models.tracking import TrackingFilter
+
+    _ingest_trackings(db_session, 3)
+    resp = asyncio.run(tracking_router.search_trackings(TrackingFilter(page_size=2), db_session))
+    assert resp["total"] == 3
+    assert len(resp["data"]) == 2
+    assert resp["next_cursor"]
+
+
+def test_stats_endpoint_serves_counters(db_session, monkeypatch):
+    import httpx
+    from fastapi import FastAPI
+    from backend.app.database import get_db
+    from backend.app.services.fedex_parser import parse_tracking_info
+    from backend.app.services.tracking_ingest_service import TrackingIngestService
+    from test_fedex_parser import TRACK_RESULT
+
+    TrackingIngestService(db_session).ingest("123456789012", parse_tracking_info(TRACK_RESULT))
+    monkeypatch.setattr(tracking_router, "get_fedex_service", DummyFedExService)
+
+    app = FastAPI()
+    app.include_router(tracking_router.router, prefix="/track")
+
+    async def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    async def get_stats():
+        # In-process transport: the in-memory database stays on this thread
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/track/stats")
+
+    resp = asyncio.run(get_stats())
+
+    assert resp.status_code == 200
+    assert resp.json()["data"]["total_trackings"] == 1
+    assert resp.json()["data"]["delivered_trackings"] == 1
+    # The route was not mistaken for a tracking lookup
+    assert db_session.query(ColisDB).filter(ColisDB.id == "stats").count() == 0
@@ -0,0 +1,251 @@
+import os
+import sys
+import asyncio
+
+# Set required env vars before importing the app modules
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.models.tracking import (
+    TrackingResponse, TrackingInfo, Location, PackageDetails, DeliveryDetails,
+    KeyDates, CommercialInfo, TrackingEvent,
+)
+from backend.app.services import tracking_cache as tc
+from backend.app.services import cache_invalidation
+from backend.app.services.local_cache import LocalCache
+
+
+class DummyPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def hset(self, key, field, value):
+        self.ops.append(("hset", key, field, value))
+
+    def expire(self, key, ttl):
+        self.ops.append(("expire", key, ttl))
+
+    def hget(self, key, field):
+        self.ops.append(("hget", key, field))
+
+    def ttl(self, key):
+        self.ops.append(("ttl", key))
+
+    async def execute(self):
+        results = []
+        for op in self.ops:
+            if op[0] == "hset":
+                self.redis.hashes.setdefault(op[1], {})[op[2]] = op[3]
+            elif op[0] == "expire":
+                self.redis.ttls[op[1]] = op[2]
+            elif op[0] == "hget":
+                results.append(self.redis.hashes.get(op[1], {}).get(op[2]))
+            else:
+                results.append(self.redis.ttls.get(op[1], -2))
+        return results
+
+
+class DummyRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+        self.locks = set()
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+        self.locks.discard(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.locks:
+            return None
+        self.locks.add(key)
+        return True
+
+    def pipeline(self, transaction=True):
+        return DummyPipeline(self)
+
+
+def make_response(number="123456789012", status="IN_TRANSIT", events=1):
+    loc = Location(city="City", state="ST", country="US", postal_code="12345")
+    info = TrackingInfo(
+        tracking_number=number,
+        status=status,
+        carrier="FedEx",
+        origin=loc,
+        destination=loc,
+        package_details=PackageDetails(),
+        delivery_details=DeliveryDetails(),
+        events=[
+            TrackingEvent(status="IT", description=f"Scan {i}", location=loc)
+            for i in range(events)
+        ],
+        key_dates=KeyDates(),
+        commercial_info=CommercialInfo(),
+    )
+    return TrackingResponse(
+        success=True, data=info, error=None,
+        metadata={"tracking_number": number, "raw_response": {"big": "x" * 100}},
+    )
+
+
+def test_round_trip_drops_raw_payload_and_uses_status_ttl():
+    redis = DummyRedis()
+    writer = tc.TrackingCache(redis)
+    # A second worker with an empty local cache reads through Redis
+    reader = tc.TrackingCache(redis)
+
+    async def run():
+        await writer.set("123456789012", "acct", make_response(status="DL", events=50))
+        return await reader.get("123456789012", "acct")
+
+    cached = asyncio.run(run())
+
+    assert cached.data.status == "DL"
+    assert len(cached.data.events) == 50
+    assert "raw_response" not in cached.metadata
+    assert "cached_at" in cached.metadata
+    blob = redis.hashes["tracking:123456789012"]["acct"]
+    assert blob[:1] == b"z"
+    assert redis.ttls["tracking:123456789012"] == (
+        tc.settings.TRACKING_CACHE_TTL_DELIVERED + tc.settings.TRACKING_CACHE_MAX_STALE)
+
+
+def test_local_entry_drops_raw_payload():
+    cache = tc.TrackingCache(DummyRedis(), local=LocalCache(max_entries=10, max_bytes=10**6, ttl=60))
+
+    async def run():
+        await cache.set("123456789012", "acct", make_response())
+        return await cache.get("123456789012", "acct")
+
+    assert "raw_response" not in asyncio.run(run()).metadata
+
+
+def test_ttl_depends_on_status():
+    assert tc.ttl_for_status("DELIVERED") == tc.settings.TRACKING_CACHE_TTL_DELIVERED
+    assert tc.ttl_for_status("IT") == tc.settings.TRACKING_CACHE_TTL_IN_TRANSIT
+    assert tc.ttl_for_status("DE") == tc.settings.TRACKING_CACHE_TTL_EXCEPTION
+    assert tc.ttl_for_status("???") == tc.settings.TRACKING_CACHE_TTL_EXCEPTION
+
+
+def test_failures_are_not_cached_and_invalidate_drops_all_accounts(monkeypatch):
+    redis = DummyRedis()
+    cache = tc.TrackingCache(redis)
+    monkeypatch.setattr(tc, "_tracking_cache", cache)
+
+    async def run():
+        await cache.set("1", "a", TrackingResponse(success=False, error="boom"))
+        assert await cache.get("1", "a") is None
+        await cache.set("1", "a", make_response("1"))
+        await cache.set("1", "b", make_response("1"))
+        await cache.invalidate("1")
+        return await cache.get("1", "a"), await cache.get("1", "b")
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_local_cache_serves_copies_without_redis():
+    redis = DummyRedis()
+    cache = tc.TrackingCache(redis)
+
+    async def run():
+        await cache.set("1", "a", make_response("1"))
+        redis.hashes.clear()
+        first = await cache.get("1", "a")
+        first.metadata["identifier"] = "mutated"
+        return await cache.get("1", "a")
+
+    second = asyncio.run(run())
+
+    assert second is not None
+    assert "identifier" not in second.metadata
+    assert cache.local.stats()["hits"] == 2
+
+
+def test_invalidation_message_drops_local_entries_of_number(monkeypatch):
+    cache = tc.TrackingCache(DummyRedis())
+    monkeypatch.setattr(tc, "_tracking_cache", cache)
+    cache.local.set(("1", "a"), "x", group="1")
+    cache.local.set(("1", "b"), "y", group="1")
+    cache.local.set(("2", "a"), "z", group="2")
+
+    cache_invalidation._dispatch("tracking", "1")
+
+    assert cache.local.get(("1", "a")) is None
+    assert cache.local.get(("1", "b")) is None
+    assert cache.local.get(("2", "a")) == "z"
+
+
+def test_local_cache_bounds_entries_and_bytes():
+    cache = LocalCache(max_entries=3, ttl=60, max_bytes=100)
+    for i in range(4):
+        cache.set(i, i, size=10)
+    assert cache.get(0) is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.set("big", "v", size=90)
+    assert cache.stats()["bytes"] <= 100
+    assert cache.get("big") == "v"
+    cache.set("too-big", "v", size=101)
+    assert cache.get("too-big") is None
+
+
+def age_entry(cache, number, account, seconds):
+    from datetime import datetime, timedelta
+    response = cache.local.get((number, account))
+    response.metadata["cached_at"] = (datetime.now() - timedelta(seconds=seconds)).isoformat()
+
+
+def test_stale_entry_served_and_refreshed_once():
+    cache = tc.TrackingCache(DummyRedis())
+    fresh_ttl = tc.settings.TRACKING_CACHE_TTL_IN_TRANSIT
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0.01)
+        return make_response("1", status="DL")
+
+    async def run():
+        await cache.set("1", "a", make_response("1"))
+        assert (await cache.lookup("1", "a")).stale is False
+
+        age_entry(cache, "1", "a", fresh_ttl + 5)
+        cached = await cache.lookup("1", "a")
+        assert cached.stale is True and cached.age >= fresh_ttl
+        assert await cache.get("1", "a") is None
+
+        for _ in range(3):
+            cache.refresh_in_background("1", "a", fetch)
+        await asyncio.gather(*cache._refreshing.values())
+        return await cache.lookup("1", "a")
+
+    refreshed = asyncio.run(run())
+
+    assert fetches == 1
+    assert refreshed.stale is False
+    assert refreshed.response.data.status == "DL"
+
+
+def test_entry_beyond_max_staleness_is_a_miss():
+    cache = tc.TrackingCache(DummyRedis())
+
+    async def run():
+        await cache.set("1", "a", make_response("1"))
+        age_entry(cache, "1", "a", tc.settings.TRACKING_CACHE_TTL_IN_TRANSIT
+                  + tc.settings.TRACKING_CACHE_MAX_STALE + 1)
+        return await cache.lookup("1", "a")
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,119 @@
+import os
+import sys
+import asyncio
+
+# Set required env vars before importing the app modules
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.models.tracking import TrackingResponse
+from backend.app.services.rate_limiter import (
+    BACKGROUND, INTERACTIVE, background_priority, current_priority,
+)
+from backend.app.services.tracking_coalescer import TrackingCoalescer
+
+
+def make_loader(calls, delay=0.01):
+    async def loader(numbers):
+        calls.append(list(numbers))
+        await asyncio.sleep(delay)
+        return [
+            TrackingResponse(success=True, data=None, error=None,
+                             metadata={"tracking_number": n})
+            for n in numbers
+        ]
+    return loader
+
+
+def test_same_number_shares_one_upstream_call():
+    calls = []
+    coalescer = TrackingCoalescer(make_loader(calls), window=0.005, max_batch=30)
+
+    async def run():
+        return await asyncio.gather(*(coalescer.load("123456789012") for _ in range(5)))
+
+    responses = asyncio.run(run())
+
+    assert calls == [["123456789012"]]
+    assert all(r.metadata["tracking_number"] == "123456789012" for r in responses)
+    # Every caller receives its own metadata dict
+    responses[0].metadata["identifier"] = "x"
+    assert "identifier" not in responses[1].metadata
+    assert coalescer.stats()["coalesced"] == 4
+
+
+def test_distinct_numbers_merged_within_window():
+    calls = []
+    coalescer = TrackingCoalescer(make_loader(calls), window=0.01, max_batch=3)
+    numbers = [f"{i:012d}" for i in range(5)]
+
+    async def run():
+        return await asyncio.gather(*(coalescer.load(n) for n in numbers))
+
+    responses = asyncio.run(run())
+
+    assert [r.metadata["tracking_number"] for r in responses] == numbers
+    assert calls == [numbers[:3], numbers[3:]]
+    stats = coalescer.stats()
+    assert stats["batches"] == 2
+    assert stats["max_batch_size"] == 3
+    assert stats["coalesce_ratio"] == 2.5
+
+
+def test_loader_failure_propagates_to_all_waiters():
+    async def failing(numbers):
+        raise RuntimeError("boom")
+
+    coalescer = TrackingCoalescer(failing, window=0.001, max_batch=30)
+
+    async def run():
+        return await asyncio.gather(
+            coalescer.load("a"), coalescer.load("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert coalescer.stats()["inflight"] == 0
+
+
+def test_batches_are_kept_apart_per_priority():
+    calls = []
+    loader = make_loader(calls)
+
+    async def recording_loader(numbers):
+        calls.append(current_priority())
+        return await loader(numbers)
+
+    coalescer = TrackingCoalescer(recording_loader, window=0.01, max_batch=30)
+
+    async def refresh(number):
+        with background_priority():
+            return await coalescer.load(number)
+
+    async def run():
+        # The refresh opens the first batch; interactive lookups must not join it
+        first = asyncio.ensure_future(refresh("000000000001"))
+        await asyncio.sleep(0)
+        return await asyncio.gather(
+            first,
+            coalescer.load("000000000001"),
+            coalescer.load("000000000002"),
+            refresh("000000000002"),
+        )
+
+    responses = asyncio.run(run())
+
+    assert [r.metadata["tracking_number"] for r in responses] == [
+        "000000000001", "000000000001", "000000000002", "000000000002"]
+    batches = dict(zip(calls[::2], calls[1::2]))
+    assert batches == {
+        BACKGROUND: ["000000000001"],
+        # The refresh of 2 joined the interactive lookup instead
+        INTERACTIVE: ["000000000001", "000000000002"],
+    }
+    assert coalescer.stats()["coalesced"] == 1
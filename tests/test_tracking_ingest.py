@@ -0,0 +1,184 @@
+import os
+import sys
+import copy
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.models.database import LocationDB, TrackingDB, TrackingEventDB, TrackingStatsDB
+from backend.app.models.tracking import Location, PackageStatus
+from backend.app.services.fedex_parser import parse_tracking_info
+from backend.app.services.location_service import LocationService, location_cache_stats
+from backend.app.services.tracking_ingest_service import TrackingIngestService
+from backend.app.services.tracking_stats_service import TrackingStatsService
+
+from test_fedex_parser import TRACK_RESULT
+
+
+def test_ingest_persists_shipment_details_and_events(db_session):
+    payload = dict(TRACK_RESULT, latestStatusDetail={"code": "DL"})
+    record = TrackingIngestService(db_session).ingest(
+        "123456789012", parse_tracking_info(payload), meta_data={"note": "hi"})
+
+    assert record.status is PackageStatus.DELIVERED
+    assert record.meta_data == {"note": "hi"}
+    assert record.package_details.weight == 2.5
+    assert record.package_details.dimensions == {"CM": {"length": 10, "width": 20, "height": 30}}
+    assert record.delivery_details.actual_delivery.replace(tzinfo=None) == datetime(2024, 1, 2, 10)
+    assert record.delivery_details.delivery_location.city == "Memphis"
+
+    events = db_session.query(TrackingEventDB).order_by(TrackingEventDB.timestamp).all()
+    assert [(e.event_type, e.description) for e in events] == [
+        ("DE", "Delivery exception"), ("DL", "Delivered")]
+    # Both events and the delivery address share one location row
+    assert db_session.query(LocationDB).count() == 1
+
+
+def test_reingest_only_adds_new_events(db_session):
+    service = TrackingIngestService(db_session)
+    service.ingest("123456789012", parse_tracking_info(TRACK_RESULT))
+
+    payload = copy.deepcopy(TRACK_RESULT)
+    payload["scanEvents"].append({
+        "eventType": "PU",
+        "eventDescription": "Picked up",
+        "date": "2024-01-01T09:00:00+01:00",
+        "scanLocation": {"city": "Lyon", "countryCode": "FR"},
+    })
+    service.ingest("123456789012", parse_tracking_info(payload))
+    service.ingest("123456789012", parse_tracking_info(payload))
+
+    assert db_session.query(TrackingDB).count() == 1
+    events = db_session.query(TrackingEventDB).all()
+    assert sorted(e.event_type for e in events) == ["DE", "DL", "PU"]
+    assert db_session.query(LocationDB).count() == 2
+
+
+def test_ingest_without_data_keeps_metadata(db_session):
+    service = TrackingIngestService(db_session)
+    service.ingest("123456789012", None, meta_data={"customer_name": "Bob"})
+    record = service.ingest("123456789012", None, meta_data={"note": "hi"})
+
+    assert record.status is PackageStatus.UNKNOWN
+    assert record.meta_data == {"customer_name": "Bob", "note": "hi"}
+    assert db_session.query(TrackingEventDB).count() == 0
+
+
+def test_locations_are_interned_and_cached(db_session):
+    paris = Location(city="Paris", state="", country="FR", postal_code="75001")
+    lyon = Location(city="Lyon", state="", country="FR")
+    service = LocationService(db_session)
+    ids = service.get_or_create_many([paris, lyon, paris])
+    db_session.commit()
+
+    assert len(set(ids.values())) == 2
+    assert db_session.query(LocationDB).count() == 2
+
+    hits = location_cache_stats()["hits"]
+    again = LocationService(db_session).get_or_create_many([lyon, paris])
+    assert again == ids
+    assert location_cache_stats()["hits"] == hits + 2
+
+
+def test_rolled_back_locations_are_not_cached(db_session):
+    nice = Location(city="Nice", state="", country="FR")
+    first = LocationService(db_session).get_or_create(nice)
+    db_session.rollback()
+
+    second = LocationService(db_session).get_or_create(nice)
+    db_session.commit()
+    assert second != first
+    assert db_session.query(LocationDB).filter(LocationDB.id == second).count() == 1
+
+
+def test_stats_follow_status_transitions(db_session):
+    service = TrackingIngestService(db_session)
+    in_transit = dict(TRACK_RESULT, latestStatusDetail={"code": "IN_TRANSIT"})
+    delivered = dict(TRACK_RESULT, latestStatusDetail={"code": "DELIVERED"})
+    service.ingest("123456789012", parse_tracking_info(in_transit))
+    service.ingest("123456789013", parse_tracking_info(in_transit))
+    service.ingest("123456789012", parse_tracking_info(delivered))
+    service.ingest("123456789012", parse_tracking_info(delivered))
+
+    stats = TrackingStatsService(db_session).summary()
+    assert stats["total_trackings"] == 2
+    assert stats["delivered_trackings"] == 1
+    assert stats["in_transit_trackings"] == 1
+    assert stats["status_distribution"] == {"IN_TRANSIT": 1, "DELIVERED": 1}
+    assert stats["carrier_distribution"] == {"FedEx": 2}
+    assert stats["delivery_rate"] == 50
+    assert TrackingStatsService(db_session).aggregate() == {
+        ("IN_TRANSIT", "FedEx"): 1, ("DELIVERED", "FedEx"): 1}
+
+
+def test_stats_are_seeded_from_existing_trackings(db_session):
+    db_session.add_all([
+        TrackingDB(tracking_number="123456789012", carrier="FedEx", status=PackageStatus.DELIVERED),
+        TrackingDB(tracking_number="123456789013", carrier="UPS", status=PackageStatus.EXCEPTION),
+    ])
+    db_session.commit()
+
+    stats = TrackingStatsService(db_session).summary()
+    assert stats["total_trackings"] == 2
+    assert stats["exception_trackings"] == 1
+    assert stats["carrier_distribution"] == {"FedEx": 1, "UPS": 1}
+    assert db_session.query(TrackingStatsDB).count() == 2
+
+
+def test_ingest_keeps_last_known_state_on_tracking(db_session):
+    service = TrackingIngestService(db_session)
+    payload = copy.deepcopy(TRACK_RESULT)
+    payload["scanEvents"].append({
+        "eventType": "PU",
+        "eventDescription": "Picked up",
+        "date": "2023-12-31T09:00:00Z",
+        "scanLocation": {"city": "Lyon", "countryCode": "FR"},
+    })
+    record = service.ingest("123456789012", parse_tracking_info(payload),
+                            meta_data={"customer_name": "Alice Martin"})
+
+    assert record.last_event_at.replace(tzinfo=None) == datetime(2024, 1, 2, 10)
+    assert (record.last_city, record.last_state, record.last_country) == ("Memphis", "TN", "US")
+    assert record.estimated_delivery.replace(tzinfo=None) == datetime(2024, 1, 3)
+    assert record.customer_name == "Alice Martin"
+
+    # An older payload does not move the last known state back
+    older = copy.deepcopy(payload)
+    older["scanEvents"] = older["scanEvents"][-1:]
+    older["latestStatusDetail"] = {"code": "PU"}
+    older["standardTransitTimeWindow"] = {"window": {"ends": "2024-01-05T00:00:00Z"}}
+    record = service.ingest("123456789012", parse_tracking_info(older))
+    assert record.last_city == "Memphis"
+    assert record.status is PackageStatus.DELIVERED
+    assert record.estimated_delivery.replace(tzinfo=None) == datetime(2024, 1, 3)
+
+
+def test_search_filters_on_last_known_state(db_session):
+    from backend.app.models.tracking import TrackingFilter
+    from backend.app.services.tracking_service import TrackingService
+
+    service = TrackingIngestService(db_session)
+    service.ingest("123456789012", parse_tracking_info(TRACK_RESULT),
+                   meta_data={"customer_name": "Alice Martin"})
+    moved = copy.deepcopy(TRACK_RESULT)
+    moved["scanEvents"][0]["scanLocation"] = {"city": "Paris", "countryCode": "FR"}
+    moved["standardTransitTimeWindow"] = {"window": {"ends": "2024-02-01T00:00:00Z"}}
+    service.ingest("123456789013", parse_tracking_info(moved),
+                   meta_data={"customer_name": "Bob Durand"})
+
+    search = TrackingService(db_session).search_trackings
+
+    def numbers(**filters):
+        return sorted(i.tracking_number for i in search(TrackingFilter(**filters)).items)
+
+    assert numbers(location=Location(city="Paris", state="", country="FR")) == ["123456789013"]
+    assert numbers(customer_name="martin") == ["123456789012"]
+    assert numbers(customer_name="du") == ["123456789013"]
+    assert numbers(estimated_delivery_start=datetime(2024, 1, 15)) == ["123456789013"]
+    assert numbers(estimated_delivery_end=datetime(2024, 1, 15)) == ["123456789012"]
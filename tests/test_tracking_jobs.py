@@ -0,0 +1,266 @@
+import os
+import sys
+import asyncio
+import json
+import pytest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import HTTPException
+
+from backend.app.config import settings
+from backend.app.models.tracking import TrackingResponse
+from backend.app.services import tracking_jobs
+from backend.app.services.tracking_jobs import TrackingJobStore, run_once
+from backend.app.api.v1.endpoints import tracking as tracking_router
+
+
+def _b(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class DummyRedis:
+    """Hashes, lists and expiring strings, enough for the job store."""
+
+    def __init__(self):
+        self.data = {}
+        self.expired = set()
+
+    # keys
+    async def exists(self, key):
+        return int(key in self.data and key not in self.expired)
+
+    async def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    async def expire(self, key, seconds):
+        return int(key in self.data)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = _b(value)
+        self.expired.discard(key)
+        return True
+
+    # hashes
+    async def hset(self, key, field=None, value=None, mapping=None):
+        h = self.data.setdefault(key, {})
+        if field is not None:
+            h[_b(field)] = _b(value)
+        for k, v in (mapping or {}).items():
+            h[_b(k)] = _b(v)
+        return 1
+
+    async def hsetnx(self, key, field, value):
+        h = self.data.setdefault(key, {})
+        if _b(field) in h:
+            return 0
+        h[_b(field)] = _b(value)
+        return 1
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def hmget(self, key, fields):
+        h = self.data.get(key, {})
+        return [h.get(_b(f)) for f in fields]
+
+    async def hincrby(self, key, field, amount):
+        h = self.data.setdefault(key, {})
+        h[_b(field)] = _b(int(h.get(_b(field), 0)) + amount)
+        return int(h[_b(field)])
+
+    # lists
+    async def rpush(self, key, *values):
+        lst = self.data.setdefault(key, [])
+        lst.extend(_b(v) for v in values)
+        return len(lst)
+
+    async def lmove(self, src, dst, wherefrom, whereto):
+        lst = self.data.get(src)
+        if not lst:
+            return None
+        value = lst.pop(0)
+        self.data.setdefault(dst, []).append(value)
+        return value
+
+    async def lindex(self, key, index):
+        lst = self.data.get(key, [])
+        return lst[index] if -len(lst) <= index < len(lst) else None
+
+    async def lrange(self, key, start, end):
+        lst = self.data.get(key, [])
+        return list(lst[start:] if end == -1 else lst[start:end + 1])
+
+    async def llen(self, key):
+        return len(self.data.get(key, []))
+
+    async def lrem(self, key, count, value):
+        lst = self.data.get(key, [])
+        removed = 0
+        kept = []
+        for item in lst:
+            if item == _b(value) and (count == 0 or removed < count):
+                removed += 1
+            else:
+                kept.append(item)
+        if key in self.data:
+            self.data[key] = kept
+        return removed
+
+    def pipeline(self, transaction=True):
+        return DummyPipeline(self)
+
+    def register_script(self, source):
+        # The claim script: move the next chunk to processing and lease it
+        async def claim(keys, args):
+            pending, processing, meta = keys
+            lease_prefix, worker, _, status = args
+            chunk = await self.lmove(pending, processing, "LEFT", "RIGHT")
+            if chunk is not None:
+                await self.set(lease_prefix + chunk.decode(), worker)
+                await self.hset(meta, "status", status)
+            return chunk
+        return claim
+
+
+class DummyPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await method(*args, **kwargs) for method, args, kwargs in self.commands]
+
+
+class BatchFedExService:
+    calls = []
+
+    def __init__(self, account=None):
+        self.account = account
+
+    async def track_packages(self, numbers):
+        BatchFedExService.calls.append(list(numbers))
+        return [
+            TrackingResponse(success=True, data=None, error=None,
+                             metadata={"tracking_number": n})
+            for n in numbers
+        ]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TrackingJobStore(DummyRedis())
+    monkeypatch.setattr(tracking_jobs, "_store", store)
+    monkeypatch.setattr(tracking_jobs, "get_fedex_service", BatchFedExService)
+    monkeypatch.setattr(settings, "FEDEX_TRACK_BATCH_SIZE", 3)
+    BatchFedExService.calls = []
+    return store
+
+
+def drain(store):
+    async def run():
+        while await run_once(store, "w1"):
+            pass
+    asyncio.run(run())
+
+
+def test_job_is_processed_in_multi_number_chunks(store):
+    numbers = [f"1234567890{i:02d}" for i in range(7)] + ["123456789000", "bad"]
+    job = asyncio.run(tracking_router.create_tracking_job(numbers))
+    assert job["status"] == "queued"
+    assert job["total"] == 8  # the duplicate is tracked once
+
+    drain(store)
+
+    assert BatchFedExService.calls == [numbers[0:3], numbers[3:6], [numbers[6]]]
+    result = asyncio.run(tracking_router.get_tracking_job(job["id"], page=2, page_size=3))
+    assert result["status"] == "completed"
+    assert result["done"] == 8
+    assert result["succeeded"] == 7
+    assert result["failed"] == 1
+    assert result["total_pages"] == 3
+    assert [item["index"] for item in result["items"]] == [3, 4, 5]
+    assert result["items"][0]["result"]["metadata"]["tracking_number"] == numbers[3]
+
+    last = asyncio.run(tracking_router.get_tracking_job(job["id"], page=3, page_size=3))
+    assert last["items"][-1]["result"]["error"].startswith("Invalid tracking number format")
+
+
+def test_abandoned_chunk_is_resumed_after_lease_expires(store):
+    numbers = [f"1234567890{i:02d}" for i in range(4)]
+    job = asyncio.run(store.create(numbers))
+
+    # A worker claims the first chunk and dies without finishing it
+    claimed = asyncio.run(store.claim(job["id"], "dead-worker"))
+    assert claimed == (0, numbers[:3])
+    assert store.client.data[store.key(job["id"], "lease:0")] == b"dead-worker"
+    store.client.expired.add(store.key(job["id"], "lease:0"))
+
+    drain(store)
+
+    meta = asyncio.run(store.get(job["id"]))
+    assert meta["status"] == "completed"
+    assert meta["done"] == 4
+    assert sorted(map(tuple, BatchFedExService.calls)) == [tuple(numbers[:3]), (numbers[3],)]
+
+
+def test_chunk_completed_twice_is_counted_once(store):
+    numbers = [f"1234567890{i:02d}" for i in range(3)]
+    job = asyncio.run(store.create(numbers))
+    responses = [TrackingResponse(success=True, data=None, error=None, metadata={})] * 3
+
+    asyncio.run(store.complete(job["id"], 0, responses))
+    asyncio.run(store.complete(job["id"], 0, responses))
+
+    assert asyncio.run(store.get(job["id"]))["done"] == 3
+
+
+def test_csv_job_and_streamed_results(store):
+    class Upload:
+        async def read(self):
+            return b"reference,tracking_number\nA,123456789012\nB,123456789013\n"
+
+    job = asyncio.run(tracking_router.create_tracking_job_from_csv(Upload()))
+    assert job["total"] == 2
+    drain(store)
+
+    async def collect():
+        response = await tracking_router.stream_tracking_job_results(job["id"])
+        return [json.loads(line) async for line in response.body_iterator]
+
+    lines = asyncio.run(collect())
+    assert [line["index"] for line in lines] == [0, 1]
+    assert lines[1]["result"]["metadata"]["tracking_number"] == "123456789013"
+
+
+def test_csv_without_header_reads_first_column():
+    content = b"123456789012,x\n123456789013,y\n"
+    assert tracking_router._csv_tracking_numbers(content) == ["123456789012", "123456789013"]
+
+
+def test_unknown_job_returns_404(store):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(tracking_router.get_tracking_job("missing"))
+    assert exc.value.status_code == 404
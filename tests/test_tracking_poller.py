@@ -0,0 +1,158 @@
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.config import settings
+from backend.app.database import Base
+from backend.app.models.database import Base as ModelsBase, TrackingDB
+from backend.app.models.tracking import PackageStatus, TrackingResponse
+from backend.app.services import tracking_poller
+from backend.app.services.fedex_parser import parse_tracking_info
+from backend.app.services.poll_policy import poll_interval
+from backend.app.services.rate_limiter import BACKGROUND, _call_priority
+from backend.app.services.tracking_poller import due_trackings, poll_due_trackings
+
+from test_fedex_parser import TRACK_RESULT
+
+NOW = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db_session():
+    # The poller stores results from worker threads: share one connection
+    from backend.app.services.location_service import _location_ids
+
+    test_engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=test_engine)
+    ModelsBase.metadata.create_all(bind=test_engine)
+    _location_ids.clear()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        test_engine.dispose()
+
+
+def _sessions(db):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+
+def test_poll_interval_follows_status_and_eta():
+    hours = lambda n: NOW - timedelta(hours=n)  # noqa: E731
+
+    assert poll_interval(PackageStatus.DELIVERED, hours(1), None, NOW) is None
+    assert poll_interval(PackageStatus.EXCEPTION, hours(1), None, NOW) == timedelta(
+        seconds=settings.TRACKING_POLL_EXCEPTION)
+    # Out for delivery today, even after a long gap between scans
+    assert poll_interval(PackageStatus.IN_TRANSIT, hours(72), NOW + timedelta(hours=3), NOW) == timedelta(
+        seconds=settings.TRACKING_POLL_NEAR_ETA)
+    # Long-haul leg: no scan for days and the ETA still far away
+    assert poll_interval(PackageStatus.IN_TRANSIT, hours(72), NOW + timedelta(days=10), NOW) == timedelta(
+        seconds=settings.TRACKING_POLL_LONG_HAUL)
+    # Naive timestamps, as returned by SQLite, are UTC
+    assert poll_interval(PackageStatus.IN_TRANSIT, hours(2).replace(tzinfo=None), None, NOW) == timedelta(
+        seconds=settings.TRACKING_POLL_ACTIVE)
+
+
+def _tracking(number, status=PackageStatus.IN_TRANSIT, next_poll_at=None, estimated_delivery=None):
+    return TrackingDB(tracking_number=number, carrier="FedEx", status=status,
+                      next_poll_at=next_poll_at, estimated_delivery=estimated_delivery)
+
+
+def test_due_trackings_skip_delivered_and_future_polls(db_session):
+    db_session.add_all([
+        _tracking("100000000001", next_poll_at=NOW - timedelta(minutes=5)),
+        _tracking("100000000002", next_poll_at=NOW - timedelta(hours=2)),
+        _tracking("100000000003"),
+        _tracking("100000000004", next_poll_at=NOW + timedelta(minutes=5)),
+        _tracking("100000000005", status=PackageStatus.DELIVERED),
+    ])
+    db_session.commit()
+
+    due = [t.tracking_number for t in due_trackings(db_session, NOW, 10)]
+    assert due == ["100000000003", "100000000002", "100000000001"]
+    assert [t.tracking_number for t in due_trackings(db_session, NOW, 1)] == ["100000000003"]
+
+
+class FakeFedEx:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    async def track_packages(self, numbers):
+        self.calls.append((list(numbers), _call_priority.get()))
+        responses = []
+        for number in numbers:
+            if number in self.fail:
+                responses.append(TrackingResponse(success=False, error="not found"))
+                continue
+            payload = dict(TRACK_RESULT, latestStatusDetail={"code": "IT"},
+                           trackingNumberInfo={"trackingNumber": number})
+            responses.append(TrackingResponse(success=True, data=parse_tracking_info(payload)))
+        return responses
+
+
+class FakeCache:
+    def __init__(self):
+        self.invalidated = []
+
+    async def invalidate(self, number):
+        self.invalidated.append(number)
+
+
+def test_poll_batches_within_budget(db_session, monkeypatch):
+    fedex, cache = FakeFedEx(fail={"100000000002"}), FakeCache()
+    monkeypatch.setattr(tracking_poller, "get_fedex_service", lambda account=None: fedex)
+    monkeypatch.setattr(tracking_poller, "get_tracking_cache", lambda: cache)
+    monkeypatch.setattr(settings, "FEDEX_TRACK_BATCH_SIZE", 2)
+    db_session.add_all([_tracking(f"10000000000{i}") for i in range(1, 5)])
+    db_session.add(_tracking("100000000005", next_poll_at=NOW - timedelta(minutes=1)))
+    db_session.commit()
+
+    polled = asyncio.run(poll_due_trackings(_sessions(db_session), budget=4, now=NOW))
+
+    assert polled == 4
+    assert [len(numbers) for numbers, _ in fedex.calls] == [2, 2]
+    assert all(priority == BACKGROUND for _, priority in fedex.calls)
+    assert "100000000002" not in cache.invalidated and len(cache.invalidated) == 3
+
+    rows = {t.tracking_number: t for t in db_session.query(TrackingDB)}
+    assert rows["100000000001"].status is PackageStatus.IN_TRANSIT
+    # Polled trackings are scheduled again; the failure is retried later
+    assert rows["100000000001"].next_poll_at is not None
+    retry = rows["100000000002"].next_poll_at.replace(tzinfo=timezone.utc)
+    assert retry == NOW + timedelta(seconds=settings.TRACKING_POLL_RETRY)
+    # Over budget: still due at the next run
+    assert rows["100000000005"].next_poll_at.replace(tzinfo=timezone.utc) < NOW
+
+
+def test_poll_stops_when_fedex_is_down(db_session, monkeypatch):
+    class Down:
+        async def track_packages(self, numbers):
+            raise RuntimeError("upstream unavailable")
+
+    monkeypatch.setattr(tracking_poller, "get_fedex_service", lambda account=None: Down())
+    db_session.add(_tracking("100000000001"))
+    db_session.commit()
+
+    assert asyncio.run(poll_due_trackings(_sessions(db_session), now=NOW)) == 0
+    assert due_trackings(db_session, NOW, 10) == []
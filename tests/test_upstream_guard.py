@@ -0,0 +1,151 @@
+import os
+import sys
+import asyncio
+import httpx
+import pytest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('FEDEX_CLIENT_ID', 'dummy')
+os.environ.setdefault('FEDEX_CLIENT_SECRET', 'dummy')
+os.environ.setdefault('FEDEX_ACCOUNT_NUMBER', 'dummy')
+os.environ.setdefault('SECRET_KEY', 'testsecret')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.services.upstream_guard import (
+    AIMDLimiter, CircuitBreaker, CircuitOpenError, DeadlineExceeded,
+    QueueFullError, UpstreamGuard,
+)
+
+
+class StubServer:
+    """Minimal local HTTP server answering every request after ``delay`` seconds."""
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+
+    async def _handle(self, reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            body = b'{"ok": true}'
+            writer.write(
+                f"HTTP/1.1 {self.status} X\r\nContent-Length: {len(body)}\r\n"
+                "Content-Type: application/json\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+
+
+def make_guard(limit=2, max_queue=10, deadline=1.0, threshold=3, reset=60.0):
+    return UpstreamGuard(
+        "stub",
+        limiter=AIMDLimiter(initial=limit, minimum=1, maximum=limit,
+                            latency_threshold=0.5, backoff=0.5),
+        breaker=CircuitBreaker(failure_threshold=threshold, reset_timeout=reset),
+        max_queue=max_queue,
+        deadline=deadline,
+    )
+
+
+def test_guard_caps_concurrency_against_slow_upstream():
+    async def run():
+        guard = make_guard(limit=2)
+        async with StubServer(delay=0.05) as server, httpx.AsyncClient() as client:
+            responses = await asyncio.gather(
+                *(guard.call(lambda: client.get(server.url)) for _ in range(6)))
+        return guard, server, responses
+
+    guard, server, responses = asyncio.run(run())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert server.requests == 6
+    assert server.max_active == 2
+    assert guard.stats()['inflight'] == 0
+
+
+def test_breaker_opens_on_deadline_and_fails_fast():
+    async def run():
+        guard = make_guard(deadline=0.05, threshold=2)
+        async with StubServer(delay=0.5) as server, httpx.AsyncClient() as client:
+            for _ in range(2):
+                with pytest.raises(DeadlineExceeded):
+                    await guard.call(lambda: client.get(server.url))
+            with pytest.raises(CircuitOpenError):
+                await guard.call(lambda: client.get(server.url))
+        return guard, server
+
+    guard, server = asyncio.run(run())
+
+    stats = guard.stats()
+    assert stats['state'] == 'open'
+    assert stats['timeouts'] == 2
+    assert stats['short_circuited'] == 1
+    assert server.requests == 2
+    # Every timeout halves the concurrency limit, down to the minimum
+    assert stats['limit'] == 1
+
+
+def test_breaker_half_open_probe_closes_circuit():
+    async def run():
+        guard = make_guard(threshold=1, reset=0.05)
+        async with StubServer(status=503) as server, httpx.AsyncClient() as client:
+            response = await guard.call(lambda: client.get(server.url))
+            assert response.status_code == 503
+            assert guard.breaker.state == 'open'
+
+            await asyncio.sleep(0.06)
+            server.status = 200
+            response = await guard.call(lambda: client.get(server.url))
+        return guard, response
+
+    guard, response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert guard.breaker.state == 'closed'
+
+
+def test_queue_full_rejects_new_calls():
+    async def run():
+        guard = make_guard(limit=1, max_queue=1)
+        async with StubServer(delay=0.1) as server, httpx.AsyncClient() as client:
+            results = await asyncio.gather(
+                *(guard.call(lambda: client.get(server.url)) for _ in range(3)),
+                return_exceptions=True)
+        return guard, results
+
+    guard, results = asyncio.run(run())
+
+    assert [type(r) for r in results].count(QueueFullError) == 1
+    assert sum(isinstance(r, httpx.Response) for r in results) == 2
+    assert guard.stats()['rejected'] == 1
+
+
+def test_limiter_grows_on_fast_responses_and_shrinks_on_slow_ones():
+    limiter = AIMDLimiter(initial=4, minimum=1, maximum=10,
+                          latency_threshold=1.0, backoff=0.5)
+    for _ in range(8):
+        limiter.on_success(0.01)
+    assert 5 < limiter.limit < 7
+
+    limiter.on_success(2.0)
+    assert limiter.limit < 3.5